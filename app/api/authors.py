@@ -0,0 +1,30 @@
+"""
+API endpoints for the activity of users across scraping jobs
+"""
+import asyncio
+from fastapi import APIRouter, Query
+
+from app.models.responses import AuthorActivityResponse
+from app.core.job_manager import job_manager
+
+router = APIRouter(prefix="/authors", tags=["authors"])
+
+
+@router.get("/{author_id}/activity", response_model=AuthorActivityResponse)
+async def get_author_activity(author_id: str, offset: int = Query(0, ge=0),
+                              limit: int = Query(100, ge=1, le=1000)):
+    """
+    Get the reactions and comments of a user across completed jobs, newest first
+    
+    Each item gives the job and post, the reaction type or comment id, and
+    item_offset: the position of the item in its section of the job result
+    (/reactions/results/{job_id}?offset=<item_offset>&limit=1 reads it back,
+    /comments/results/... likewise and /posts/results/{job_id}/{section} for post jobs).
+    
+    - **author_id**: Facebook user id (reactions user.id or comments author_id)
+    - **offset**: Number of items to skip
+    - **limit**: Maximum number of items returned (1-1000)
+    """
+    total, items = await asyncio.to_thread(job_manager.get_author_activity, author_id, offset, limit)
+    
+    return AuthorActivityResponse(author_id=author_id, total=total, offset=offset, limit=limit, items=items)
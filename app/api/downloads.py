@@ -0,0 +1,114 @@
+"""
+Download and query responses for stored job results
+"""
+from typing import Optional
+
+import json
+import os
+
+from fastapi import HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+from app.core.columnar import get_parquet_path, is_parquet_enabled
+from app.core.compression import get_file_encoding, is_encoding_available, iter_decompressed
+from app.core.result_index import read_result_page
+
+# Values of the ?format= query parameter of the download endpoints
+DOWNLOAD_FORMAT_PATTERN = "^(json|parquet)$"
+
+
+def accepts_encoding(accept_encoding: Optional[str], encoding: str) -> bool:
+    """
+    Check whether an Accept-Encoding header allows an encoding
+
+    The q-value of the encoding itself wins over the one of '*'; q=0 refuses it.
+    """
+    qualities = {}
+    for part in (accept_encoding or "").split(","):
+        name, *params = part.split(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 1.0
+        qualities[name] = quality
+
+    quality = qualities.get(encoding, qualities.get("*", 0.0))
+    return quality > 0
+
+
+def result_file_response(request: Request, file_path: str, filename: str):
+    """
+    Serve a result document
+
+    Compressed documents are sent as stored with Content-Encoding when the
+    client accepts it, and decompressed on the fly otherwise.
+    """
+    encoding = get_file_encoding(file_path)
+    headers = {"Content-Disposition": f"attachment; filename={filename}"}
+
+    if encoding is None:
+        return FileResponse(path=file_path, filename=filename, media_type="application/json", headers=headers)
+
+    headers["Vary"] = "Accept-Encoding"
+    if accepts_encoding(request.headers.get("accept-encoding"), encoding):
+        headers["Content-Encoding"] = encoding
+        return FileResponse(path=file_path, media_type="application/json", headers=headers)
+
+    if not is_encoding_available(encoding):
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "error": "encoding_not_available",
+                "message": f"النتيجة مضغوطة بـ {encoding} وفك الضغط غير متاح على الخادم، أرسل Accept-Encoding: {encoding}"
+            }
+        )
+
+    return StreamingResponse(iter_decompressed(file_path), media_type="application/json", headers=headers)
+
+
+def parquet_file_response(job_id: str, section: str, filename: str):
+    """Serve the Parquet export of one section of a completed job"""
+    file_path = get_parquet_path(job_id, section)
+
+    if not os.path.exists(file_path):
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error": "format_not_available",
+                "message": "لا يوجد ملف Parquet لهذه المهمة" if is_parquet_enabled()
+                else "تصدير Parquet غير مفعل (يتطلب pyarrow)"
+            }
+        )
+
+    return FileResponse(path=file_path, filename=filename, media_type="application/vnd.apache.parquet")
+
+
+def results_page_response(job_id: str, section: str, offset: int, limit: int,
+                          field: Optional[str] = None, value: Optional[str] = None):
+    """
+    Serve one page of a section from its offset index
+
+    The items are copied from the spool as raw JSON lines, without parsing them.
+    """
+    page = read_result_page(job_id, section, offset, limit, field, value)
+
+    if page is None:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error": "results_not_available",
+                "message": "لا توجد نتائج قابلة للاستعلام لهذه المهمة، استخدم /download"
+            }
+        )
+
+    total, lines = page
+    envelope = json.dumps({"job_id": job_id, "total": total, "offset": offset, "limit": limit})
+    content = b"".join((envelope[:-1].encode("utf-8"), b', "items": [', b",".join(lines), b"]}"))
+    return Response(content=content, media_type="application/json")
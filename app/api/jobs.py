@@ -0,0 +1,72 @@
+"""
+Shared job submission helpers of the scrape endpoints
+"""
+from typing import Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.core.job_manager import job_manager
+from app.models.responses import JobResponse
+
+
+def cached_job_response(cache_key: str, max_age_seconds: Optional[int]) -> Optional[JobResponse]:
+    """Response for a recent completed job of the same post and parameters, if any"""
+    if max_age_seconds is None:
+        return None
+
+    cached_job = job_manager.get_cached_job_status(cache_key, max_age_seconds)
+    if not cached_job:
+        return None
+
+    return JobResponse(
+        job_id=cached_job["job_id"],
+        status=cached_job["status"],
+        message="توجد نتيجة حديثة لنفس المنشور، لم يتم السحب من جديد",
+        created_at=cached_job["created_at"],
+        cached=True
+    )
+
+
+def enqueue_job(job_id: str, worker: Callable, *args) -> Dict:
+    """
+    Submit a created job to the queue and return its status
+
+    A job that could not be queued is cancelled, so it never stays QUEUED
+    without a worker: 429 when the backlog is full, 500 otherwise.
+    """
+    try:
+        queued = job_manager.start_job(job_id, worker, *args)
+    except Exception as e:
+        job_manager.cancel_job(job_id)
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "error": "job_start_failed",
+                "message": f"فشل في بدء المهمة: {str(e)}",
+                "job_id": job_id
+            }
+        )
+
+    if not queued:
+        job_manager.cancel_job(job_id)
+        if job_manager.is_queue_full():
+            raise HTTPException(
+                status_code=429,
+                detail={
+                    "error": "queue_full",
+                    "message": "قائمة الانتظار ممتلئة، حاول لاحقاً",
+                    "max_queued_jobs": settings.MAX_QUEUED_JOBS,
+                    "retry_after": 60
+                }
+            )
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "error": "job_start_failed",
+                "message": "فشل في بدء المهمة",
+                "job_id": job_id
+            }
+        )
+
+    return job_manager.get_job_status(job_id)
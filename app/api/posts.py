@@ -0,0 +1,342 @@
+"""
+API endpoints for scraping the reactions and comments of a post in one job
+"""
+import asyncio
+import os
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from app.models.requests import PostRequest
+from app.models.responses import JobResponse, JobStatusResponse, ResultsPageResponse
+from app.core.job_manager import job_manager
+from app.api.jobs import cached_job_response, enqueue_job
+from app.api.downloads import (DOWNLOAD_FORMAT_PATTERN, parquet_file_response, result_file_response,
+                               results_page_response)
+from app.core.result_writer import follow_spool, has_spool
+from app.config import settings
+from app.scrapers.post_scraper import FacebookPostScraper
+from app.scrapers.async_scrapers import AsyncFacebookPostScraper
+
+router = APIRouter(prefix="/posts", tags=["posts"])
+
+POST_SECTIONS = ("reactions", "comments")
+
+
+def open_post_writer(job_id: str, progress_callback):
+    """Open the streaming writer (one section per stream) and report progress after every page"""
+    items_written = {section: 0 for section in POST_SECTIONS}
+
+    def on_write(section: str, section_items: int, pages_written: int):
+        items_written[section] = section_items
+        progress_callback(
+            job_id, 50,
+            f"تم سحب {items_written['reactions']} تفاعل و {items_written['comments']} كومنت",
+            reactions_scraped=items_written["reactions"],
+            comments_scraped=items_written["comments"]
+        )
+
+    return job_manager.create_result_writer(job_id, POST_SECTIONS, on_write=on_write)
+
+
+def post_worker(job_id: str, progress_callback, request_data: PostRequest):
+    """Worker function for post scraping (reactions and comments on one session)"""
+    try:
+        scraper = FacebookPostScraper()
+        cookies_array = [cookie.dict() for cookie in request_data.cookies]
+
+        progress_callback(job_id, 20, "جاري تحميل الكوكيز...")
+
+        writer = open_post_writer(job_id, progress_callback)
+        result = scraper.scrape_post_api(
+            post_url=request_data.post_url,
+            cookies_array=cookies_array,
+            limit=request_data.limit,
+            reactions_delay=request_data.reactions_delay,
+            comments_delay=request_data.comments_delay,
+            max_pages=request_data.max_pages,
+            result_writer=writer
+        )
+
+        progress_callback(job_id, 90, "جاري حفظ النتائج...")
+
+        if result.get("error"):
+            raise Exception(result["error"])
+
+        return result
+
+    except Exception as e:
+        raise Exception(f"فشل في سحب المنشور: {str(e)}")
+
+
+async def post_worker_async(job_id: str, progress_callback, request_data: PostRequest):
+    """Worker coroutine for post scraping on the async engine"""
+    try:
+        scraper = AsyncFacebookPostScraper()
+        cookies_array = [cookie.dict() for cookie in request_data.cookies]
+
+        progress_callback(job_id, 20, "جاري تحميل الكوكيز...")
+
+        writer = await asyncio.to_thread(open_post_writer, job_id, progress_callback)
+        result = await scraper.scrape_post_api_async(
+            post_url=request_data.post_url,
+            cookies_array=cookies_array,
+            limit=request_data.limit,
+            reactions_delay=request_data.reactions_delay,
+            comments_delay=request_data.comments_delay,
+            max_pages=request_data.max_pages,
+            result_writer=writer
+        )
+
+        progress_callback(job_id, 90, "جاري حفظ النتائج...")
+
+        if result.get("error"):
+            raise Exception(result["error"])
+
+        return result
+
+    except Exception as e:
+        raise Exception(f"فشل في سحب المنشور: {str(e)}")
+
+
+@router.post("/scrape", response_model=JobResponse)
+async def scrape_post(request: PostRequest):
+    """
+    Start a job that scrapes both the reactions and the comments of a post
+
+    Both streams run interleaved on one session and take a single slot;
+    the result document has a "reactions" and a "comments" section.
+
+    - **post_url**: Facebook post URL
+    - **limit**: Number of reactions to scrape (0 = all)
+    - **max_pages**: Maximum comment pages to scrape
+    - **reactions_delay**: Delay between reactions requests in seconds
+    - **comments_delay**: Delay between comments requests in seconds
+    - **priority**: Queue priority (higher runs first)
+    - **engine**: 'thread' or 'async' scraping engine
+    - **profile**: Profile the job (cProfile, thread engine); output at /jobs/{job_id}/profile
+    - **profile_memory**: Also record memory allocations (tracemalloc)
+    - **max_age_seconds**: Return a completed job of the same post and parameters finished within this window
+    - **cookies**: Array of Facebook cookies
+    """
+    try:
+        # Reuse a recent result of the same post and parameters
+        cache_key = job_manager.result_cache.make_key("posts", request.post_url, limit=request.limit,
+                                                       max_pages=request.max_pages)
+        cached_response = cached_job_response(cache_key, request.max_age_seconds)
+        if cached_response:
+            return cached_response
+
+        # Profiled jobs run on the thread engine (see app/core/profiler.py)
+        profile = request.profile or request.profile_memory
+        engine = "thread" if profile else (request.engine or settings.SCRAPER_ENGINE)
+        worker = post_worker_async if engine == "async" else post_worker
+        job_id = job_manager.create_job("posts", request.post_url, priority=request.priority,
+                                        engine=engine, debug=request.debug, cache_key=cache_key,
+                                        profile=profile, profile_memory=request.profile_memory)
+
+        job_status = enqueue_job(job_id, worker, request)
+        queued = job_status["status"] == "queued"
+
+        return JobResponse(
+            job_id=job_id,
+            status=job_status["status"],
+            message="تمت إضافة المهمة إلى قائمة الانتظار" if queued else "تم بدء سحب المنشور بنجاح",
+            estimated_time="3-10 دقائق",
+            created_at=job_status["created_at"],
+            queue_position=job_status.get("queue_position")
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "error": "internal_error",
+                "message": f"خطأ داخلي: {str(e)}"
+            }
+        )
+
+
+@router.get("/status/{job_id}", response_model=JobStatusResponse)
+async def get_post_status(job_id: str):
+    """
+    Get the status of a post scraping job
+
+    - **job_id**: The job ID returned from /scrape endpoint
+    """
+    job_status = job_manager.get_job_status(job_id)
+
+    if not job_status or job_status["job_type"] != "posts":
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error": "job_not_found",
+                "message": "المهمة غير موجودة أو منتهية الصلاحية",
+                "job_id": job_id
+            }
+        )
+
+    response_data = {
+        "job_id": job_status["job_id"],
+        "status": job_status["status"],
+        "started_at": job_status.get("started_at"),
+        "completed_at": job_status.get("completed_at"),
+        "error_message": job_status.get("error_message"),
+        "queue_position": job_status.get("queue_position"),
+        "profile": job_status.get("profile_summary")
+    }
+
+    if job_status.get("progress"):
+        progress = job_status["progress"]
+        response_data["progress"] = {
+            "percentage": progress.get("percentage", 0),
+            "message": progress.get("message", ""),
+            "updated_at": progress.get("updated_at")
+        }
+
+        if job_status["status"] == "running":
+            response_data["progress"]["items_scraped"] = (
+                (progress.get("reactions_scraped") or 0) + (progress.get("comments_scraped") or 0)
+            )
+
+    if job_status.get("result") and job_status["status"] == "completed":
+        result = job_status["result"]
+        response_data["result"] = {
+            "total_items": result.get("total_items", 0),
+            "file_size": result.get("file_size", "Unknown"),
+            "download_expires_at": result.get("download_expires_at", ""),
+            "resumable": result.get("resumable"),
+            "interruption_reason": result.get("interruption_reason"),
+            "unique_authors": result.get("unique_authors")
+        }
+
+    return JobStatusResponse(**response_data)
+
+
+@router.get("/stream/{job_id}/{section}")
+async def stream_post_section(job_id: str, section: str):
+    """
+    Stream one section ('reactions' or 'comments') of a post job as NDJSON
+
+    - **job_id**: The job ID returned from /scrape endpoint
+    - **section**: 'reactions' or 'comments'
+    """
+    job_status = job_manager.get_job_status(job_id)
+
+    if not job_status or job_status["job_type"] != "posts" or section not in POST_SECTIONS:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error": "job_not_found",
+                "message": "المهمة غير موجودة أو منتهية الصلاحية",
+                "job_id": job_id
+            }
+        )
+
+    if job_status["status"] == "completed" and not has_spool(job_id, section):
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error": "stream_not_available",
+                "message": "لا توجد بيانات قابلة للبث لهذه المهمة، استخدم /download"
+            }
+        )
+
+    return StreamingResponse(
+        follow_spool(job_id, section, lambda: job_manager.is_job_finished(job_id)),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Job-Id": job_id}
+    )
+
+
+@router.get("/results/{job_id}/{section}", response_model=ResultsPageResponse)
+async def get_post_results(job_id: str, section: str, offset: int = Query(0, ge=0),
+                           limit: int = Query(100, ge=1, le=1000), reaction_type: Optional[str] = None,
+                           author_id: Optional[str] = None):
+    """
+    Get one page of one section of a completed post job, without downloading the whole file
+
+    - **job_id**: The job ID returned from /scrape endpoint
+    - **section**: 'reactions' or 'comments'
+    - **offset**: Number of matching items to skip
+    - **limit**: Maximum number of items returned (1-1000)
+    - **reaction_type**: Only reactions of this type (reactions section)
+    - **author_id**: Only comments of this author (comments section)
+    """
+    job_status = job_manager.get_job_status(job_id)
+
+    if not job_status or job_status["job_type"] != "posts" or section not in POST_SECTIONS:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error": "job_not_found",
+                "message": "المهمة غير موجودة أو منتهية الصلاحية",
+                "job_id": job_id
+            }
+        )
+
+    if job_status["status"] != "completed":
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": "job_not_completed",
+                "message": f"المهمة لم تكتمل بعد. الحالة الحالية: {job_status['status']}",
+                "current_status": job_status["status"]
+            }
+        )
+
+    field, value = ("reaction_type", reaction_type) if section == "reactions" else ("author_id", author_id)
+    return await asyncio.to_thread(results_page_response, job_id, section, offset, limit,
+                                   field if value else None, value)
+
+
+@router.get("/download/{job_id}")
+async def download_post(job_id: str, request: Request,
+                        format: str = Query("json", pattern=DOWNLOAD_FORMAT_PATTERN),
+                        section: str = Query("reactions", pattern="^(reactions|comments)$")):
+    """
+    Download the result document (reactions and comments) of a completed post job
+
+    - **job_id**: The job ID returned from /scrape endpoint
+    - **format**: 'json' (default) or 'parquet' (flattened columns, needs pyarrow on the server)
+    - **section**: Section exported with format=parquet: 'reactions' or 'comments'
+    """
+    job_status = job_manager.get_job_status(job_id)
+
+    if not job_status or job_status["job_type"] != "posts":
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error": "job_not_found",
+                "message": "المهمة غير موجودة أو منتهية الصلاحية",
+                "job_id": job_id
+            }
+        )
+
+    if job_status["status"] != "completed":
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": "job_not_completed",
+                "message": f"المهمة لم تكتمل بعد. الحالة الحالية: {job_status['status']}",
+                "current_status": job_status["status"]
+            }
+        )
+
+    file_path = job_manager.get_job_result_file(job_id)
+
+    if not file_path or not os.path.exists(file_path):
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error": "file_not_found",
+                "message": "ملف النتائج غير موجود أو منتهي الصلاحية"
+            }
+        )
+
+    if format == "parquet":
+        return parquet_file_response(job_id, section, f"post_{job_id}_{section}.parquet")
+
+    return result_file_response(request, file_path, f"post_{job_id}.json")
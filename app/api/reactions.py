@@ -1,19 +1,71 @@
 """
 API endpoints for Facebook reactions scraping
 """
+import asyncio
 import os
-from fastapi import APIRouter, HTTPException, Response
-from fastapi.responses import FileResponse
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
-from app.models.requests import ReactionsRequest
-from app.models.responses import JobResponse, JobStatusResponse, ErrorResponse
+from app.models.requests import ReactionsRequest, BatchReactionsRequest, ResumeRequest
+from app.models.responses import (JobResponse, JobStatusResponse, BatchStatusResponse, ErrorResponse,
+                                  ResultsPageResponse)
 from app.core.job_manager import job_manager
+from app.api.jobs import cached_job_response, enqueue_job
+from app.api.downloads import (DOWNLOAD_FORMAT_PATTERN, parquet_file_response, result_file_response,
+                               results_page_response)
+from app.core.result_writer import follow_spool, has_spool
+from app.core.checkpoints import checkpoint_store
+from app.core.rate_limiter import rate_limiter
+from app.core.transport import transport_pool
+from app.config import settings
 from app.scrapers.reactions_scraper import FacebookReactionsScraper
+from app.scrapers.incremental import DeltaTracker, reaction_identity
+from app.scrapers.async_scrapers import AsyncFacebookReactionsScraper
 
 router = APIRouter(prefix="/reactions", tags=["reactions"])
 
 
-def reactions_worker(job_id: str, progress_callback, request_data: ReactionsRequest):
+def open_reactions_writer(job_id: str, progress_callback, request_data, resume_checkpoint=None,
+                          since_job_id: Optional[str] = None):
+    """
+    Open the streaming writer and report progress after every page
+    
+    request_data is a single or batch request; only single requests are
+    incremental, so since_job_id is passed by their workers.
+    """
+    def on_write(section: str, items_written: int, pages_written: int):
+        if section != "reactions":
+            return
+        if request_data.limit:
+            percentage = min(85, 20 + int(65 * items_written / request_data.limit))
+        else:
+            percentage = 50
+        progress_callback(
+            job_id, percentage, f"تم سحب {items_written} تفاعل",
+            current_page=pages_written,
+            reactions_scraped=items_written
+        )
+    
+    # Incremental jobs also keep the new or changed items in a "delta" section
+    sections = ("reactions", "delta") if since_job_id else ("reactions",)
+    return job_manager.create_result_writer(
+        job_id, sections, on_write=on_write,
+        checkpoint_params={"limit": request_data.limit, "delay": request_data.delay,
+                           "since_job_id": since_job_id},
+        resume_checkpoint=resume_checkpoint
+    )
+
+
+def open_delta_tracker(since_job_id: Optional[str]):
+    """Index the reactions of the previous job of an incremental request"""
+    if not since_job_id:
+        return None
+    
+    return DeltaTracker(since_job_id, lambda: job_manager.iter_job_items(since_job_id, "reactions"), reaction_identity)
+
+
+def reactions_worker(job_id: str, progress_callback, request_data: ReactionsRequest, resume_checkpoint=None):
     """Worker function for reactions scraping"""
     try:
         # Create scraper instance
@@ -25,12 +77,17 @@ def reactions_worker(job_id: str, progress_callback, request_data: ReactionsRequ
         # Update progress
         progress_callback(job_id, 20, "جاري تحميل الكوكيز...")
         
-        # Scrape reactions
+        # Scrape reactions (resumed jobs continue from their checkpoint)
+        writer = open_reactions_writer(job_id, progress_callback, request_data, resume_checkpoint,
+                                       request_data.since_job_id)
         result = scraper.scrape_reactions_api(
             post_url=request_data.post_url,
             cookies_array=cookies_array,
             limit=request_data.limit,
-            delay=request_data.delay
+            delay=request_data.delay,
+            result_writer=writer,
+            resume_state=writer.get_resume_state(),
+            delta_tracker=open_delta_tracker(request_data.since_job_id)
         )
         
         # Update progress
@@ -45,6 +102,142 @@ def reactions_worker(job_id: str, progress_callback, request_data: ReactionsRequ
         raise Exception(f"فشل في سحب التفاعلات: {str(e)}")
 
 
+async def reactions_worker_async(job_id: str, progress_callback, request_data: ReactionsRequest,
+                                 resume_checkpoint=None):
+    """Worker coroutine for reactions scraping on the async engine"""
+    try:
+        scraper = AsyncFacebookReactionsScraper()
+        cookies_array = [cookie.dict() for cookie in request_data.cookies]
+        
+        progress_callback(job_id, 20, "جاري تحميل الكوكيز...")
+        
+        # Resuming truncates and re-reads the spool: keep that I/O off the event loop
+        writer = await asyncio.to_thread(open_reactions_writer, job_id, progress_callback, request_data,
+                                         resume_checkpoint, request_data.since_job_id)
+        result = await scraper.scrape_reactions_api_async(
+            post_url=request_data.post_url,
+            cookies_array=cookies_array,
+            limit=request_data.limit,
+            delay=request_data.delay,
+            result_writer=writer,
+            resume_state=writer.get_resume_state(),
+            delta_tracker=await asyncio.to_thread(open_delta_tracker, request_data.since_job_id)
+        )
+        
+        progress_callback(job_id, 90, "جاري حفظ النتائج...")
+        
+        if result.get("error"):
+            raise Exception(result["error"])
+        
+        return result
+        
+    except Exception as e:
+        raise Exception(f"فشل في سحب التفاعلات: {str(e)}")
+
+
+def reactions_post_worker(job_id: str, progress_callback, scraper: FacebookReactionsScraper,
+                          request_data: BatchReactionsRequest):
+    """Worker function for one post of a reactions batch (the session is shared, tokens are per post)"""
+    try:
+        post_url = job_manager.get_job_status(job_id)["post_url"]
+        post_scraper = scraper.new_post_scraper()
+        if post_scraper is None:
+            raise Exception("فشل في استخراج التوكنز")
+        
+        writer = open_reactions_writer(job_id, progress_callback, request_data)
+        result = post_scraper.scrape_post_reactions(
+            post_url=post_url,
+            limit=request_data.limit,
+            delay=request_data.delay,
+            result_writer=writer
+        )
+        
+        if result.get("error"):
+            raise Exception(result["error"])
+        
+        return result
+        
+    except Exception as e:
+        raise Exception(f"فشل في سحب التفاعلات: {str(e)}")
+
+
+async def reactions_post_worker_async(job_id: str, progress_callback, scraper: AsyncFacebookReactionsScraper,
+                                      request_data: BatchReactionsRequest, client):
+    """Worker coroutine for one post of a reactions batch on the async engine (tokens are per post)"""
+    try:
+        post_url = job_manager.get_job_status(job_id)["post_url"]
+        post_scraper = await asyncio.to_thread(scraper.new_post_scraper)
+        if post_scraper is None:
+            raise Exception("فشل في استخراج التوكنز")
+        
+        writer = await asyncio.to_thread(open_reactions_writer, job_id, progress_callback, request_data)
+        result = await post_scraper.scrape_post_reactions_async(
+            post_url=post_url,
+            limit=request_data.limit,
+            delay=request_data.delay,
+            result_writer=writer,
+            client=client
+        )
+        
+        if result.get("error"):
+            raise Exception(result["error"])
+        
+        return result
+        
+    except Exception as e:
+        raise Exception(f"فشل في سحب التفاعلات: {str(e)}")
+
+
+def reactions_batch_worker(job_id: str, progress_callback, request_data: BatchReactionsRequest):
+    """Worker function for a reactions batch: cookies and tokens are loaded once for all posts"""
+    try:
+        scraper = FacebookReactionsScraper()
+        cookies_array = [cookie.dict() for cookie in request_data.cookies]
+        
+        progress_callback(job_id, 5, "جاري تحميل الكوكيز...")
+        
+        error = scraper.prepare_account(cookies_array)
+        if error:
+            raise Exception(error)
+        
+        # Posts share the account's rate budget: more at once would only wait on it
+        concurrency = rate_limiter.get_concurrency(scraper.user_id, request_data.delay, settings.BATCH_CONCURRENCY)
+        posts = job_manager.run_batch(job_id, reactions_post_worker, scraper, request_data,
+                                      concurrency=concurrency)
+        
+        result = job_manager.build_batch_result(posts)
+        result["total_reactions"] = sum(post.get("total_items") or 0 for post in posts)
+        return result
+        
+    except Exception as e:
+        raise Exception(f"فشل في سحب التفاعلات: {str(e)}")
+
+
+async def reactions_batch_worker_async(job_id: str, progress_callback, request_data: BatchReactionsRequest):
+    """Worker coroutine for a reactions batch on the async engine (one HTTP client for all posts)"""
+    try:
+        scraper = AsyncFacebookReactionsScraper()
+        cookies_array = [cookie.dict() for cookie in request_data.cookies]
+        
+        progress_callback(job_id, 5, "جاري تحميل الكوكيز...")
+        
+        error = await scraper.prepare_account_async(cookies_array)
+        if error:
+            raise Exception(error)
+        
+        concurrency = rate_limiter.get_concurrency(scraper.user_id, request_data.delay, settings.BATCH_CONCURRENCY)
+        async with transport_pool.async_client(scraper.account_key, scraper.session) as client:
+            posts = await job_manager.run_batch_async(job_id, reactions_post_worker_async, scraper,
+                                                      request_data, client, concurrency=concurrency)
+        
+        result = job_manager.build_batch_result(posts)
+        result["total_reactions"] = sum(post.get("total_items") or 0 for post in posts)
+        return result
+        
+    except Exception as e:
+        raise Exception(f"فشل في سحب التفاعلات: {str(e)}")
+
+
 @router.post("/scrape", response_model=JobResponse)
 async def scrape_reactions(request: ReactionsRequest):
     """
@@ -53,43 +246,227 @@ async def scrape_reactions(request: ReactionsRequest):
     - **post_url**: Facebook post URL
     - **limit**: Number of reactions to scrape (0 = all)
     - **delay**: Delay between requests in seconds
+    - **priority**: Queue priority (higher runs first)
+    - **engine**: 'thread' or 'async' scraping engine
+    - **profile**: Profile the job (cProfile, thread engine); output at /jobs/{job_id}/profile
+    - **profile_memory**: Also record memory allocations (tracemalloc)
+    - **incremental**: Stop at items already scraped by the latest completed job of this post
+    - **since_job_id**: Completed job to compare with instead of the latest one
+    - **max_age_seconds**: Return a completed job of the same post and parameters finished within this window
     - **cookies**: Array of Facebook cookies
     """
     try:
-        # Create job
-        job_id = job_manager.create_job("reactions", request.post_url)
-        
-        # Start job in background thread
-        success = job_manager.start_job(job_id, reactions_worker, request)
+        # Reuse a recent result of the same post and parameters
+        cache_key = job_manager.result_cache.make_key("reactions", request.post_url, limit=request.limit)
+        cached_response = cached_job_response(cache_key, request.max_age_seconds)
+        if cached_response:
+            return cached_response
         
-        if not success:
-            # Check if we hit the concurrent limit
-            active_count = job_manager.get_active_jobs_count()
-            if active_count >= 5:  # MAX_CONCURRENT_JOBS from settings
+        # Incremental: compare with the given job, or with the latest one of this post
+        if request.incremental or request.since_job_id:
+            since_job_id = job_manager.get_previous_job("reactions", request.post_url, request.since_job_id)
+            if request.since_job_id and not since_job_id:
                 raise HTTPException(
-                    status_code=429,
+                    status_code=404,
                     detail={
-                        "error": "too_many_requests",
-                        "message": "تم تجاوز الحد الأقصى من الطلبات المتزامنة",
-                        "active_jobs": active_count,
-                        "retry_after": 300
-                    }
-                )
-            else:
-                raise HTTPException(
-                    status_code=500,
-                    detail={
-                        "error": "job_start_failed",
-                        "message": "فشل في بدء المهمة"
+                        "error": "previous_job_not_found",
+                        "message": "المهمة السابقة غير موجودة أو لم تكتمل أو لمنشور آخر",
+                        "job_id": request.since_job_id
                     }
                 )
+            request.since_job_id = since_job_id
+        
+        # Create job
+        # Profiled jobs run on the thread engine (see app/core/profiler.py)
+        profile = request.profile or request.profile_memory
+        engine = "thread" if profile else (request.engine or settings.SCRAPER_ENGINE)
+        worker = reactions_worker_async if engine == "async" else reactions_worker
+        job_id = job_manager.create_job("reactions", request.post_url, priority=request.priority,
+                                        engine=engine, debug=request.debug, cache_key=cache_key,
+                                        profile=profile, profile_memory=request.profile_memory)
+        
+        # Submit job to the queue; the dispatcher runs it when a slot is free
+        job_status = enqueue_job(job_id, worker, request)
+        queued = job_status["status"] == "queued"
         
         return JobResponse(
             job_id=job_id,
-            status="running",
-            message="تم بدء سحب التفاعلات بنجاح",
+            status=job_status["status"],
+            message="تمت إضافة المهمة إلى قائمة الانتظار" if queued else "تم بدء سحب التفاعلات بنجاح",
             estimated_time="2-5 دقائق",
-            created_at=job_manager.get_job_status(job_id)["created_at"]
+            created_at=job_status["created_at"],
+            queue_position=job_status.get("queue_position")
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "error": "internal_error",
+                "message": f"خطأ داخلي: {str(e)}"
+            }
+        )
+
+
+@router.post("/batch", response_model=JobResponse)
+async def scrape_reactions_batch(request: BatchReactionsRequest):
+    """
+    Start one job that scrapes the reactions of many posts with the same account
+    
+    Cookies and tokens are loaded once; posts run concurrently within the
+    account's rate budget. Each post is a child job: its status, stream and
+    download are available under its own job ID as soon as it finishes.
+    
+    - **post_urls**: Facebook post URLs
+    - **limit**: Number of reactions to scrape per post (0 = all)
+    - **delay**: Delay between requests in seconds
+    - **priority**: Queue priority (higher runs first)
+    - **engine**: 'thread' or 'async' scraping engine
+    - **cookies**: Array of Facebook cookies
+    """
+    try:
+        engine = request.engine or settings.SCRAPER_ENGINE
+        worker = reactions_batch_worker_async if engine == "async" else reactions_batch_worker
+        job_id = job_manager.create_job("reactions_batch", "", priority=request.priority,
+                                        engine=engine, debug=request.debug)
+        child_job_ids = job_manager.create_child_jobs(job_id, "reactions", request.post_urls,
+                                                       limit=request.limit)
+        
+        job_status = enqueue_job(job_id, worker, request)
+        
+        return JobResponse(
+            job_id=job_id,
+            status=job_status["status"],
+            message=f"تم إنشاء دفعة من {len(child_job_ids)} منشور",
+            created_at=job_status["created_at"],
+            queue_position=job_status.get("queue_position"),
+            child_job_ids=child_job_ids
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "error": "internal_error",
+                "message": f"خطأ داخلي: {str(e)}"
+            }
+        )
+
+
+@router.get("/batch/{job_id}", response_model=BatchStatusResponse)
+async def get_reactions_batch_status(job_id: str):
+    """
+    Get the status of a reactions batch job and of each of its posts
+    
+    - **job_id**: The job ID returned from /batch endpoint
+    """
+    batch_status = job_manager.get_batch_status(job_id)
+    
+    if not batch_status or batch_status["job_type"] != "reactions_batch":
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error": "job_not_found",
+                "message": "المهمة غير موجودة أو منتهية الصلاحية",
+                "job_id": job_id
+            }
+        )
+    
+    posts = batch_status["posts"]
+    completed_posts = sum(1 for post in posts if post["status"] == "completed")
+    finished_posts = sum(1 for post in posts if post["status"] in ("completed", "failed", "cancelled", "expired"))
+    progress = batch_status.get("progress") or {}
+    
+    return BatchStatusResponse(
+        job_id=job_id,
+        status=batch_status["status"],
+        progress={
+            "percentage": progress.get("percentage", 0),
+            "message": progress.get("message", ""),
+            "updated_at": progress.get("updated_at")
+        } if progress else None,
+        queue_position=batch_status.get("queue_position"),
+        started_at=batch_status.get("started_at"),
+        completed_at=batch_status.get("completed_at"),
+        error_message=batch_status.get("error_message"),
+        total_posts=len(posts),
+        completed_posts=completed_posts,
+        failed_posts=finished_posts - completed_posts,
+        posts=posts
+    )
+
+
+@router.post("/resume/{job_id}", response_model=JobResponse)
+async def resume_reactions(job_id: str, request: ResumeRequest):
+    """
+    Resume an interrupted or failed reactions job from its last checkpoint
+    
+    Pages already scraped are kept; scraping continues from the saved cursor.
+    
+    - **job_id**: The job ID returned from /scrape endpoint
+    - **cookies**: Array of Facebook cookies (fresh cookies may be used)
+    - **delay**: Optional new delay between requests
+    """
+    try:
+        checkpoint = checkpoint_store.load(job_id)
+        
+        if not checkpoint or checkpoint.get("job_type") != "reactions":
+            raise HTTPException(
+                status_code=404,
+                detail={
+                    "error": "checkpoint_not_found",
+                    "message": "لا توجد نقطة حفظ لهذه المهمة",
+                    "job_id": job_id
+                }
+            )
+        
+        # Rebuild the original request with the new cookies
+        engine = request.engine or settings.SCRAPER_ENGINE
+        params = checkpoint.get("params", {})
+        try:
+            scrape_request = ReactionsRequest(
+                post_url=checkpoint["post_url"],
+                limit=params.get("limit", 0),
+                delay=request.delay or params.get("delay", settings.DEFAULT_DELAY),
+                priority=request.priority,
+                engine=engine,
+                debug=request.debug,
+                since_job_id=params.get("since_job_id"),
+                cookies=request.cookies
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=422,
+                detail={
+                    "error": "invalid_resume_request",
+                    "message": str(e)
+                }
+            )
+        
+        if not job_manager.prepare_resume(job_id, checkpoint, priority=request.priority,
+                                          engine=engine, debug=request.debug):
+            raise HTTPException(
+                status_code=409,
+                detail={
+                    "error": "job_not_resumable",
+                    "message": "المهمة قيد التنفيذ أو اكتملت بالفعل",
+                    "job_id": job_id
+                }
+            )
+        
+        worker = reactions_worker_async if engine == "async" else reactions_worker
+        job_status = enqueue_job(job_id, worker, scrape_request, checkpoint)
+        
+        return JobResponse(
+            job_id=job_id,
+            status=job_status["status"],
+            message="تم استئناف المهمة من آخر نقطة حفظ",
+            created_at=job_status["created_at"],
+            queue_position=job_status.get("queue_position")
         )
         
     except HTTPException:
@@ -130,7 +507,9 @@ async def get_reactions_status(job_id: str):
             "status": job_status["status"],
             "started_at": job_status.get("started_at"),
             "completed_at": job_status.get("completed_at"),
-            "error_message": job_status.get("error_message")
+            "error_message": job_status.get("error_message"),
+            "queue_position": job_status.get("queue_position"),
+            "profile": job_status.get("profile_summary")
         }
         
         # Add progress if available
@@ -155,7 +534,10 @@ async def get_reactions_status(job_id: str):
                 "total_items": result.get("total_items", 0),
                 "file_size": result.get("file_size", "Unknown"),
                 "download_expires_at": result.get("download_expires_at", ""),
-                "reaction_stats": result.get("reaction_stats")
+                "resumable": result.get("resumable"),
+                "interruption_reason": result.get("interruption_reason"),
+                "reaction_stats": result.get("reaction_stats"),
+                "unique_authors": result.get("unique_authors")
             }
         
         return JobStatusResponse(**response_data)
@@ -172,12 +554,92 @@ async def get_reactions_status(job_id: str):
         )
 
 
+@router.get("/stream/{job_id}")
+async def stream_reactions(job_id: str):
+    """
+    Stream reactions as NDJSON while the job is still running
+    
+    Items collected so far are replayed first, then new pages are sent
+    as they are scraped until the job finishes.
+    
+    - **job_id**: The job ID returned from /scrape endpoint
+    """
+    job_status = job_manager.get_job_status(job_id)
+    
+    if not job_status or job_status["job_type"] != "reactions":
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error": "job_not_found",
+                "message": "المهمة غير موجودة أو منتهية الصلاحية",
+                "job_id": job_id
+            }
+        )
+    
+    if job_status["status"] == "completed" and not has_spool(job_id, "reactions"):
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error": "stream_not_available",
+                "message": "لا توجد بيانات قابلة للبث لهذه المهمة، استخدم /download"
+            }
+        )
+    
+    return StreamingResponse(
+        follow_spool(job_id, "reactions", lambda: job_manager.is_job_finished(job_id)),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Job-Id": job_id}
+    )
+
+
+@router.get("/results/{job_id}", response_model=ResultsPageResponse)
+async def get_reactions_results(job_id: str, offset: int = Query(0, ge=0),
+                                limit: int = Query(100, ge=1, le=1000), reaction_type: Optional[str] = None):
+    """
+    Get one page of the reactions of a completed job, without downloading the whole file
+    
+    Pages are read through an offset index of the result built when the job
+    completed, so large jobs can be browsed page by page.
+    
+    - **job_id**: The job ID returned from /scrape endpoint
+    - **offset**: Number of matching reactions to skip
+    - **limit**: Maximum number of reactions returned (1-1000)
+    - **reaction_type**: Only reactions of this type (e.g. LIKE, LOVE, ANGRY)
+    """
+    job_status = job_manager.get_job_status(job_id)
+    
+    if not job_status or job_status["job_type"] != "reactions":
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error": "job_not_found",
+                "message": "المهمة غير موجودة أو منتهية الصلاحية",
+                "job_id": job_id
+            }
+        )
+    
+    if job_status["status"] != "completed":
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": "job_not_completed",
+                "message": f"المهمة لم تكتمل بعد. الحالة الحالية: {job_status['status']}",
+                "current_status": job_status["status"]
+            }
+        )
+    
+    return await asyncio.to_thread(results_page_response, job_id, "reactions", offset, limit,
+                                   "reaction_type" if reaction_type else None, reaction_type)
+
+
 @router.get("/download/{job_id}")
-async def download_reactions(job_id: str):
+async def download_reactions(job_id: str, request: Request,
+                     format: str = Query("json", pattern=DOWNLOAD_FORMAT_PATTERN)):
     """
     Download the results of a completed reactions scraping job
     
     - **job_id**: The job ID returned from /scrape endpoint
+    - **format**: 'json' (default) or 'parquet' (flattened columns, needs pyarrow on the server)
     """
     try:
         # Get job status first
@@ -215,16 +677,11 @@ async def download_reactions(job_id: str):
                 }
             )
         
-        # Return file
-        filename = f"reactions_{job_id}.json"
-        return FileResponse(
-            path=file_path,
-            filename=filename,
-            media_type="application/json",
-            headers={
-                "Content-Disposition": f"attachment; filename={filename}"
-            }
-        )
+        if format == "parquet":
+            return parquet_file_response(job_id, "reactions", f"reactions_{job_id}.parquet")
+        
+        # Return file (compressed files are passed through when the client accepts their encoding)
+        return result_file_response(request, file_path, f"reactions_{job_id}.json")
         
     except HTTPException:
         raise
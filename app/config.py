@@ -2,7 +2,7 @@
 Configuration settings for Facebook Scraper API
 """
 import os
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
 class Settings:
     """Application settings"""
@@ -12,23 +12,72 @@ class Settings:
     PORT: int = 8091
     DEBUG: bool = True
     
+    # Logging: level for all jobs (single jobs can enable debug with "debug": true)
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "text"  # 'text' or 'json'
+    
     # Threading settings
     MAX_CONCURRENT_JOBS: int = 5
+    MAX_QUEUED_JOBS: int = 500
     JOB_TIMEOUT_MINUTES: int = 30
     
+    # Scraping engine: 'thread' (one thread per job) or 'async' (shared event loop)
+    SCRAPER_ENGINE: str = "thread"
+    MAX_CONCURRENT_ASYNC_JOBS: int = 200
+    
+    # Batch jobs: posts per batch, and posts scraped at once (capped by the account rate budget)
+    BATCH_MAX_POSTS: int = 200
+    BATCH_CONCURRENCY: int = 5
+    
     # Storage settings
     RESULTS_DIR: str = "api_results"
+    # Result documents on disk: 'gzip', 'zstd' (needs zstandard, else gzip) or 'none'
+    RESULT_COMPRESSION: str = "gzip"
+    RESULT_COMPRESSION_LEVEL: int = 6
+    # Parquet copy of reactions/comments for /download?format=parquet (needs pyarrow)
+    RESULT_PARQUET: bool = True
     CLEANUP_AFTER_HOURS: int = 24
     
+    # Job registry (SQLite, survives restarts); progress is flushed in batches
+    JOB_STORE_PATH: str = "jobs.db"
+    JOB_STORE_FLUSH_SECONDS: float = 2.0
+    
     # API settings
     API_VERSION: str = "v1"
     API_PREFIX: str = f"/api/{API_VERSION}"
     
+    # Facebook endpoints used by the scrapers (point them at benchmarks/mock_facebook.py for offline runs)
+    FACEBOOK_BASE_URL: str = os.environ.get("FACEBOOK_BASE_URL", "https://www.facebook.com")
+    FACEBOOK_MOBILE_URL: str = os.environ.get("FACEBOOK_MOBILE_URL", "https://m.facebook.com")
+    
     # Rate limiting
     DEFAULT_DELAY: float = 2.0
     MIN_DELAY: float = 1.0
     MAX_DELAY: float = 10.0
     
+    # Reactions page size (adapted per post between MIN and MAX)
+    REACTIONS_PAGE_SIZE_START: int = 100
+    REACTIONS_PAGE_SIZE_MIN: int = 10
+    REACTIONS_PAGE_SIZE_MAX: int = 250
+
+    # Per-account GraphQL rate limit shared by all jobs of the same c_user
+    ACCOUNT_REQUESTS_PER_MINUTE: float = 30
+    ACCOUNT_BURST: int = 5
+    # Overrides per c_user: {"1000123": (requests_per_minute, burst)}
+    ACCOUNT_RATE_LIMITS: Dict[str, Tuple[float, int]] = {}
+
+    # Token cache (fb_dtsg/lsd shared between jobs of the same account)
+    TOKEN_CACHE_TTL_MINUTES: int = 60
+
+    # Keep-alive connection pool per account (HTTP/2 on the async engine when h2 is installed)
+    HTTP_POOL_SIZE: int = 10
+    HTTP_POOL_IDLE_MINUTES: int = 15
+    HTTP2_ENABLED: bool = True
+
+    # Worker processes for decoding large GraphQL responses off the GIL (0 = parse inline)
+    PARSE_WORKERS: int = 0
+    PARSE_POOL_MIN_BYTES: int = 64 * 1024
+
     def __init__(self):
         """Initialize settings"""
         # Create results directory if it doesn't exist
@@ -0,0 +1,142 @@
+"""
+Cross-job index of the users who reacted or commented, backed by SQLite
+"""
+import itertools
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.core.job_store import JobStore
+
+
+# Rows inserted per executemany() call while indexing a job
+INSERT_CHUNK_SIZE = 5000
+
+
+def reaction_author(reaction: Dict) -> Optional[str]:
+    """User id of a reaction"""
+    return (reaction.get("user") or {}).get("id")
+
+
+def comment_author(comment: Dict) -> Optional[str]:
+    """Author id of a comment"""
+    return comment.get("author_id")
+
+
+# section -> author id of an item
+SECTION_AUTHORS: Dict[str, Callable[[Dict], Optional[str]]] = {
+    "reactions": reaction_author,
+    "comments": comment_author,
+}
+
+
+class AuthorIndex:
+    """
+    Activity of every author across completed jobs
+
+    One row per reaction or comment: the author, the job and post it belongs
+    to, the reaction type or comment id, and the position of the item in its
+    section (the offset to pass to /results to read it back). Lookups by
+    author go through an index instead of scanning result files.
+
+    The table lives in the job store database and shares its connection and
+    lock: indexing a job waits for a registry flush (and the other way round)
+    instead of failing with "database is locked".
+    """
+
+    def __init__(self, store: JobStore):
+        """Create the schema in the job store database"""
+        self.connection = store.connection
+        self.lock = store.lock
+
+        with self.lock:
+            self.connection.executescript("""
+                CREATE TABLE IF NOT EXISTS author_activity (
+                    author_id TEXT NOT NULL,
+                    job_id TEXT NOT NULL,
+                    post_id TEXT NOT NULL,
+                    completed_at TEXT NOT NULL,
+                    section TEXT NOT NULL,
+                    item_offset INTEGER NOT NULL,
+                    reaction_type TEXT,
+                    comment_id TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_author_activity_author ON author_activity (author_id, completed_at);
+                CREATE INDEX IF NOT EXISTS idx_author_activity_job ON author_activity (job_id);
+            """)
+            self.connection.commit()
+
+    @staticmethod
+    def _iter_rows(job_id: str, post_id: str, completed_at: str, section: str,
+                   items: Iterable[Dict]) -> Iterator[Tuple]:
+        """Rows of the items of one section that have an author"""
+        get_author = SECTION_AUTHORS[section]
+        for item_offset, item in enumerate(items):
+            author_id = get_author(item)
+            if author_id:
+                yield (str(author_id), job_id, post_id, completed_at, section, item_offset,
+                       item.get("reaction_type"), item.get("comment_id"))
+
+    def index_job(self, job_id: str, post_id: str, sections: Dict[str, Iterable[Dict]]) -> int:
+        """
+        Replace the rows of a job with the items of its sections; returns its unique authors
+
+        sections maps a section name to its items (streamed, in result order).
+        Every chunk is its own transaction, so the registry is never held up
+        for the whole job; the job is not visible as completed until it returns.
+        """
+        completed_at = datetime.now().isoformat()
+
+        with self.lock:
+            with self.connection:
+                self.connection.execute("DELETE FROM author_activity WHERE job_id = ?", (job_id,))
+
+        for section, items in sections.items():
+            rows = self._iter_rows(job_id, post_id, completed_at, section, items)
+            while True:
+                # Items are read from disk outside the lock
+                chunk = list(itertools.islice(rows, INSERT_CHUNK_SIZE))
+                if not chunk:
+                    break
+                with self.lock:
+                    with self.connection:
+                        self.connection.executemany(
+                            "INSERT INTO author_activity (author_id, job_id, post_id, completed_at, "
+                            "section, item_offset, reaction_type, comment_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                            chunk
+                        )
+
+        with self.lock:
+            cursor = self.connection.execute(
+                "SELECT COUNT(DISTINCT author_id) FROM author_activity WHERE job_id = ?", (job_id,)
+            )
+            return cursor.fetchone()[0]
+
+    def get_activity(self, author_id: str, offset: int = 0, limit: int = 100) -> Tuple[int, List[Dict]]:
+        """Get the total activity count of an author and one page of it, newest jobs first"""
+        with self.lock:
+            total = self.connection.execute(
+                "SELECT COUNT(*) FROM author_activity WHERE author_id = ?", (author_id,)
+            ).fetchone()[0]
+            cursor = self.connection.execute(
+                "SELECT job_id, post_id, completed_at, section, item_offset, reaction_type, comment_id "
+                "FROM author_activity WHERE author_id = ? "
+                "ORDER BY completed_at DESC, job_id, section, item_offset LIMIT ? OFFSET ?",
+                (author_id, limit, offset)
+            )
+            rows = cursor.fetchall()
+
+        return total, [
+            {"job_id": job_id, "post_id": post_id, "completed_at": completed_at, "section": section,
+             "item_offset": item_offset, "reaction_type": reaction_type, "comment_id": comment_id}
+            for job_id, post_id, completed_at, section, item_offset, reaction_type, comment_id in rows
+        ]
+
+    def delete_jobs(self, job_ids: Iterable[str]):
+        """Delete the rows of several jobs"""
+        rows = [(job_id,) for job_id in job_ids]
+        if not rows:
+            return
+
+        with self.lock:
+            with self.connection:
+                self.connection.executemany("DELETE FROM author_activity WHERE job_id = ?", rows)
@@ -0,0 +1,63 @@
+"""
+Per-job pagination checkpoints for resumable scraping
+"""
+import json
+import os
+from datetime import datetime
+from typing import Dict, Optional
+
+from app.config import settings
+
+
+def new_pagination_state(cursor: Optional[str] = None, page_count: int = 0, items: int = 0) -> Dict:
+    """
+    Create the pagination state shared between a page generator and its consumer
+
+    The generator updates it before yielding each page, so a checkpoint saved
+    after the page is written always points at the next page to fetch.
+    """
+    return {
+        "cursor": cursor,
+        "page_count": page_count,
+        "items": items,
+        "exhausted": False,
+        "interrupted": None
+    }
+
+
+class CheckpointStore:
+    """Stores the last pagination state of every job next to its results"""
+
+    def get_path(self, job_id: str) -> str:
+        """Get checkpoint file path for a job"""
+        return os.path.join(settings.RESULTS_DIR, f"{job_id}.checkpoint.json")
+
+    def save(self, job_id: str, checkpoint: Dict):
+        """Atomically write a checkpoint"""
+        checkpoint["updated_at"] = datetime.now().isoformat()
+        path = self.get_path(job_id)
+        temp_path = f"{path}.tmp"
+
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f, ensure_ascii=False)
+
+        os.replace(temp_path, path)
+
+    def load(self, job_id: str) -> Optional[Dict]:
+        """Load a checkpoint, or None if the job has none"""
+        try:
+            with open(self.get_path(job_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def delete(self, job_id: str):
+        """Delete a checkpoint once it is no longer needed"""
+        try:
+            os.remove(self.get_path(job_id))
+        except OSError:
+            pass
+
+
+# Global checkpoint store instance
+checkpoint_store = CheckpointStore()
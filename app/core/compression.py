@@ -0,0 +1,105 @@
+"""
+Compressed storage of result documents (gzip, or zstd when zstandard is installed)
+"""
+import gzip
+import io
+import os
+from typing import IO, Iterator, Optional
+
+from app.config import settings
+from app.core.log import get_logger
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+
+log = get_logger("results")
+
+# Content-Encoding name -> file extension
+ENCODING_EXTENSIONS = {"gzip": ".gz", "zstd": ".zst"}
+
+DECOMPRESS_CHUNK_SIZE = 64 * 1024
+
+
+def get_result_encoding() -> Optional[str]:
+    """Encoding for new result documents (None = plain JSON)"""
+    encoding = settings.RESULT_COMPRESSION
+    if encoding == "zstd" and zstandard is None:
+        return "gzip"
+    return encoding if encoding in ENCODING_EXTENSIONS else None
+
+
+def is_encoding_available(encoding: Optional[str]) -> bool:
+    """Check whether documents of an encoding can be read and written here"""
+    return encoding != "zstd" or zstandard is not None
+
+
+def _require_zstandard(file_path: str):
+    """Fail clearly on a zstd document when zstandard is not installed (e.g. written by another host)"""
+    if zstandard is None:
+        raise RuntimeError(f"zstandard غير مثبت، لا يمكن قراءة أو كتابة {os.path.basename(file_path)}")
+
+
+def get_result_path(job_id: str) -> str:
+    """Path of the result document of a job, with the extension of the configured encoding"""
+    encoding = get_result_encoding()
+    extension = ENCODING_EXTENSIONS[encoding] if encoding else ""
+    return os.path.join(settings.RESULTS_DIR, f"{job_id}.json{extension}")
+
+
+def get_file_encoding(file_path: str) -> Optional[str]:
+    """Encoding of a result document, from its extension (files saved before compression are plain)"""
+    for encoding, extension in ENCODING_EXTENSIONS.items():
+        if file_path.endswith(extension):
+            return encoding
+    return None
+
+
+def open_result_file(file_path: str, mode: str = "r", encoding: Optional[str] = None) -> IO[str]:
+    """
+    Open a result document as text ('r' or 'w'), compressing or decompressing on the fly
+
+    The encoding is taken from the file extension unless given (e.g. for a temporary file).
+    """
+    encoding = encoding or get_file_encoding(file_path)
+
+    if encoding == "gzip":
+        return gzip.open(file_path, mode + "t", encoding="utf-8",
+                         compresslevel=settings.RESULT_COMPRESSION_LEVEL)
+
+    if encoding == "zstd":
+        _require_zstandard(file_path)
+        raw = open(file_path, mode + "b")
+        if mode == "w":
+            stream = zstandard.ZstdCompressor(level=settings.RESULT_COMPRESSION_LEVEL).stream_writer(raw)
+        else:
+            stream = zstandard.ZstdDecompressor().stream_reader(raw)
+        return io.TextIOWrapper(stream, encoding="utf-8")
+
+    return open(file_path, mode, encoding="utf-8")
+
+
+def iter_decompressed(file_path: str) -> Iterator[bytes]:
+    """Yield the plain JSON bytes of a result document, for clients that do not accept its encoding"""
+    encoding = get_file_encoding(file_path)
+
+    if encoding == "gzip":
+        stream = gzip.open(file_path, "rb")
+    elif encoding == "zstd":
+        _require_zstandard(file_path)
+        stream = zstandard.ZstdDecompressor().stream_reader(open(file_path, "rb"))
+    else:
+        stream = open(file_path, "rb")
+
+    with stream:
+        while True:
+            chunk = stream.read(DECOMPRESS_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+if settings.RESULT_COMPRESSION == "zstd" and zstandard is None:
+    log.warning("zstandard غير مثبت، سيتم ضغط النتائج بـ gzip")
@@ -1,17 +1,48 @@
 """
 Job Manager for handling concurrent scraping tasks
 """
+import asyncio
 import threading
 import time
 import uuid
 import json
 import os
+import heapq
+import itertools
+import glob
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Dict, Optional, Any, Callable
+from typing import Dict, List, Optional, Any, Callable, Tuple
 from enum import Enum
 from dataclasses import dataclass, asdict
 
 from app.config import settings
+from app.core.result_writer import ResultWriter, iter_result_items
+from app.core.checkpoints import checkpoint_store
+from app.core.job_store import JobStore
+from app.core.author_index import AuthorIndex
+from app.core.result_cache import ResultCache, normalize_post_id
+from app.core.compression import get_result_path, open_result_file
+from app.core.columnar import JOB_SECTIONS, export_job_parquet
+from app.core.result_index import build_job_index
+from app.core.log import get_logger, log_context
+from app.core.metrics import JOB_DURATION_SECONDS
+from app.core.profiler import JobProfiler
+
+
+log = get_logger("jobs")
+
+# Files the application writes for a job: "{job_type}_{YYYYmmdd_HHMMSS}_{hex}" followed by
+# the compressed result document, a section spool/index/parquet export, the checkpoint or
+# the profile, or the .tmp of an interrupted write. A plain "{job_id}.json" is not listed:
+# the sample documents in api_results/ (and results kept by users) share that name.
+JOB_ARTIFACT_PATTERN = re.compile(
+    r"^[a-z]+(?:_[a-z]+)*_\d{8}_\d{6}_[0-9a-f]{8}\."
+    r"(?:json\.(?:gz|zst)|json\.tmp|checkpoint\.json|profile\.prof|profile\.memory\.txt"
+    r"|[a-z]+\.(?:ndjson|ndjson\.gz|idx|idx\.json|parquet))(?:\.tmp)?$"
+)
 
 
 class JobStatus(Enum):
@@ -31,6 +62,15 @@ class JobInfo:
     status: JobStatus
     post_url: str
     created_at: datetime
+    priority: int = 0
+    engine: str = "thread"  # 'thread' or 'async'
+    debug: bool = False  # debug logging for this job only
+    profile: bool = False  # run the worker under cProfile (thread engine, one job at a time)
+    profile_memory: bool = False  # also compare tracemalloc snapshots
+    profile_summary: Optional[Dict[str, Any]] = None  # phases and top functions of the profile
+    parent_id: Optional[str] = None  # batch job this post belongs to
+    child_ids: Optional[List[str]] = None  # posts of a batch job
+    cache_key: Optional[str] = None  # post + parameters, for reusing the result
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
     progress: Dict[str, Any] = None
@@ -49,6 +89,18 @@ class JobInfo:
                 data[field] = data[field].isoformat()
         
         return data
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> "JobInfo":
+        """Rebuild a job from its to_dict() form"""
+        data = dict(data)
+        data['status'] = JobStatus(data['status'])
+        
+        for field in ['created_at', 'started_at', 'completed_at']:
+            if data.get(field):
+                data[field] = datetime.fromisoformat(data[field])
+        
+        return cls(**data)
 
 
 class JobManager:
@@ -58,16 +110,49 @@ class JobManager:
         """Initialize job manager"""
         self.jobs: Dict[str, JobInfo] = {}
         self.active_threads: Dict[str, threading.Thread] = {}
+        self.active_async_jobs: Dict[str, Any] = {}
+        self.result_writers: Dict[str, ResultWriter] = {}
         self.lock = threading.Lock()
         
+        # Backlog of queued jobs per engine: heap of (-priority, sequence, job_id)
+        self.pending_queues: Dict[str, list] = {"thread": [], "async": []}
+        self.pending_workers: Dict[str, tuple] = {}
+        self.queue_sequence = itertools.count()
+        self.dispatch_condition = threading.Condition(self.lock)
+        
         # Create results directory
         os.makedirs(settings.RESULTS_DIR, exist_ok=True)
         
+        # Durable registry; progress updates are flushed in batches
+        self.store = JobStore(settings.JOB_STORE_PATH)
+        self.dirty_jobs: set = set()
+        
+        # Completed jobs by post and parameters (rebuilt from the store)
+        self.result_cache = ResultCache()
+        
+        # Reactions and comments of completed jobs by author (same database)
+        self.author_index = AuthorIndex(self.store)
+        self._load_jobs_from_store()
+        
+        # Event loop for the async engine, started on first use
+        self.async_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.async_loop_thread: Optional[threading.Thread] = None
+        
+        # Start dispatcher thread
+        self.dispatcher_thread = threading.Thread(target=self._dispatch_jobs, daemon=True)
+        self.dispatcher_thread.start()
+        
+        # Start store flusher thread
+        self.flusher_thread = threading.Thread(target=self._flush_dirty_jobs, daemon=True)
+        self.flusher_thread.start()
+        
         # Start cleanup thread
         self.cleanup_thread = threading.Thread(target=self._cleanup_expired_jobs, daemon=True)
         self.cleanup_thread.start()
     
-    def create_job(self, job_type: str, post_url: str, **kwargs) -> str:
+    def create_job(self, job_type: str, post_url: str, priority: int = 0,
+                   engine: str = "thread", debug: bool = False, cache_key: Optional[str] = None,
+                   profile: bool = False, profile_memory: bool = False, **kwargs) -> str:
         """Create a new job and return job ID"""
         job_id = self._generate_job_id(job_type)
         
@@ -77,44 +162,121 @@ class JobManager:
             status=JobStatus.QUEUED,
             post_url=post_url,
             created_at=datetime.now(),
+            priority=priority,
+            engine=engine,
+            debug=debug,
+            profile=profile or profile_memory,
+            profile_memory=profile_memory,
+            cache_key=cache_key,
             progress={"percentage": 0, "message": "في قائمة الانتظار"}
         )
         
         with self.lock:
             self.jobs[job_id] = job_info
         
+        self._persist_jobs(job_id)
+        
         return job_id
     
-    def start_job(self, job_id: str, worker_function: Callable, *args, **kwargs) -> bool:
-        """Start a job in a separate thread"""
+    def create_child_jobs(self, parent_id: str, job_type: str, post_urls: List[str], **cache_params) -> List[str]:
+        """
+        Create one child job per post of a batch job
+        
+        Children are never queued on their own: the batch worker runs them
+        with run_batch(), inside the parent's slot. Each child gets its own
+        status, result file and checkpoint, and the cache key a single-post job
+        with the same cache_params would have, so both reuse each other's results.
+        """
         with self.lock:
+            parent = self.jobs[parent_id]
+            child_ids = []
+            for post_url in post_urls:
+                job_id = self._generate_job_id(job_type)
+                self.jobs[job_id] = JobInfo(
+                    job_id=job_id,
+                    job_type=job_type,
+                    status=JobStatus.QUEUED,
+                    post_url=post_url,
+                    created_at=datetime.now(),
+                    priority=parent.priority,
+                    engine=parent.engine,
+                    debug=parent.debug,
+                    parent_id=parent_id,
+                    cache_key=self.result_cache.make_key(job_type, post_url, **cache_params),
+                    progress={"percentage": 0, "message": "في انتظار دوره ضمن الدفعة"}
+                )
+                child_ids.append(job_id)
+            parent.child_ids = child_ids
+        
+        self._persist_jobs(parent_id, *child_ids)
+        
+        return child_ids
+    
+    def start_job(self, job_id: str, worker_function: Callable, *args, **kwargs) -> bool:
+        """
+        Submit a job to the queue; the dispatcher starts it when a slot frees up
+        
+        Jobs with engine 'async' must pass a coroutine function as worker_function.
+        """
+        with self.dispatch_condition:
             if job_id not in self.jobs:
                 return False
             
-            if len(self.active_threads) >= settings.MAX_CONCURRENT_JOBS:
+            if len(self.pending_workers) >= settings.MAX_QUEUED_JOBS:
                 return False
             
             job = self.jobs[job_id]
-            if job.status != JobStatus.QUEUED:
+            if job.status != JobStatus.QUEUED or job_id in self.pending_workers:
                 return False
             
-            # Update job status
-            job.status = JobStatus.RUNNING
-            job.started_at = datetime.now()
-            job.progress = {"percentage": 0, "message": "بدء المعالجة..."}
-            
-            # Create and start thread
-            thread = threading.Thread(
-                target=self._worker_wrapper,
-                args=(job_id, worker_function, args, kwargs),
-                daemon=True
-            )
-            
-            self.active_threads[job_id] = thread
-            thread.start()
+            heapq.heappush(self.pending_queues[job.engine], (-job.priority, next(self.queue_sequence), job_id))
+            self.pending_workers[job_id] = (worker_function, args, kwargs)
+            self.dispatch_condition.notify()
             
             return True
     
+    def is_queue_full(self) -> bool:
+        """Check whether the backlog has reached MAX_QUEUED_JOBS"""
+        with self.lock:
+            return len(self.pending_workers) >= settings.MAX_QUEUED_JOBS
+    
+    def get_queue_position(self, job_id: str) -> Optional[int]:
+        """Get 1-based position of a queued job in the backlog"""
+        with self.lock:
+            return self._get_queue_position_locked(job_id)
+    
+    def create_result_writer(self, job_id: str, sections: Tuple[str, ...],
+                             on_write: Optional[Callable[[str, int, int], None]] = None,
+                             checkpoint_params: Optional[Dict] = None,
+                             resume_checkpoint: Optional[Dict] = None) -> ResultWriter:
+        """
+        Open a streaming result writer; it is finalized when the job completes
+        
+        checkpoint_params enables checkpointing for a new job (the parameters
+        needed to restart it are stored with the checkpoint); resume_checkpoint
+        continues an existing one from its last saved page.
+        """
+        checkpoint = resume_checkpoint
+        
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if checkpoint is None and checkpoint_params is not None and job:
+                checkpoint = {
+                    "job_id": job_id,
+                    "job_type": job.job_type,
+                    "post_url": job.post_url,
+                    "created_at": job.created_at.isoformat(),
+                    "params": checkpoint_params,
+                    "sections": {}
+                }
+        
+        writer = ResultWriter(job_id, sections, on_write=on_write, checkpoint=checkpoint)
+        
+        with self.lock:
+            self.result_writers[job_id] = writer
+        
+        return writer
+    
     def get_job_status(self, job_id: str) -> Optional[Dict]:
         """Get job status and progress"""
         with self.lock:
@@ -122,7 +284,87 @@ class JobManager:
                 return None
             
             job = self.jobs[job_id]
-            return job.to_dict()
+            data = job.to_dict()
+            data["queue_position"] = self._get_queue_position_locked(job_id)
+            return data
+    
+    def get_cached_job_status(self, cache_key: str, max_age_seconds: int) -> Optional[Dict]:
+        """
+        Get a completed job of the same post and parameters finished within max_age_seconds
+        
+        Only jobs that scraped everything they were asked for are cached, and
+        the hit is ignored once its result file is gone.
+        """
+        job_id = self.result_cache.get(cache_key)
+        if not job_id:
+            return None
+        
+        cutoff_time = datetime.now() - timedelta(seconds=max_age_seconds)
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if (job is None or job.status != JobStatus.COMPLETED or not job.completed_at
+                    or job.completed_at < cutoff_time or not job.file_path or not os.path.exists(job.file_path)):
+                return None
+            
+            data = job.to_dict()
+            data["queue_position"] = None
+            return data
+    
+    def get_previous_job(self, job_type: str, post_url: str, job_id: Optional[str] = None) -> Optional[str]:
+        """
+        Get a fully completed job of the same type and post to scrape incrementally from
+        
+        When job_id is given it is only checked; otherwise the latest matching job is used.
+        """
+        post_id = normalize_post_id(post_url)
+        
+        with self.lock:
+            if job_id:
+                candidates = [self.jobs[job_id]] if job_id in self.jobs else []
+            else:
+                candidates = list(self.jobs.values())
+            matches = [
+                job for job in candidates
+                if job.job_type == job_type and job.status == JobStatus.COMPLETED and job.completed_at
+                and job.file_path and os.path.exists(job.file_path)
+                and not (job.result or {}).get("resumable")
+                and normalize_post_id(job.post_url) == post_id
+            ]
+        
+        if not matches:
+            return None
+        
+        return max(matches, key=lambda job: job.completed_at).job_id
+    
+    def iter_job_items(self, job_id: str, section: str):
+        """Iterate over the items of one section of a completed job"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            file_path = job.file_path if job else None
+        
+        return iter_result_items(job_id, section, file_path)
+    
+    def get_author_activity(self, author_id: str, offset: int = 0, limit: int = 100) -> Tuple[int, List[Dict]]:
+        """Get the reactions and comments of a user across the jobs still in the registry"""
+        return self.author_index.get_activity(author_id, offset, limit)
+    
+    def get_batch_status(self, job_id: str) -> Optional[Dict]:
+        """Get a batch job status together with the status of each of its posts"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.child_ids is None:
+                return None
+            
+            data = job.to_dict()
+            data["queue_position"] = self._get_queue_position_locked(job_id)
+            data["posts"] = [self._get_child_summary_locked(child_id) for child_id in job.child_ids]
+            return data
+    
+    def is_job_finished(self, job_id: str) -> bool:
+        """Check whether a job reached a final state (or no longer exists)"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return job is None or job.status in (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
     
     def get_job_result_file(self, job_id: str) -> Optional[str]:
         """Get the result file path for a completed job"""
@@ -140,6 +382,47 @@ class JobManager:
             
             return None
     
+    def prepare_resume(self, job_id: str, checkpoint: Dict, priority: int = 0,
+                       engine: str = "thread", debug: bool = False) -> bool:
+        """
+        Put a failed, cancelled or interrupted job back in QUEUED state
+        
+        Jobs no longer in memory (e.g. after a restart) are rebuilt from their
+        checkpoint. The caller then submits the worker with start_job().
+        """
+        with self.lock:
+            job = self.jobs.get(job_id)
+            
+            if job is None:
+                job = JobInfo(
+                    job_id=job_id,
+                    job_type=checkpoint["job_type"],
+                    status=JobStatus.FAILED,
+                    post_url=checkpoint["post_url"],
+                    created_at=datetime.fromisoformat(checkpoint["created_at"])
+                )
+                self.jobs[job_id] = job
+            
+            resumable = job.status in (JobStatus.FAILED, JobStatus.CANCELLED) or (
+                job.status == JobStatus.COMPLETED and job.result and job.result.get("resumable")
+            )
+            if not resumable:
+                return False
+            
+            job.status = JobStatus.QUEUED
+            job.priority = priority
+            job.engine = engine
+            job.debug = debug
+            job.profile = job.profile_memory = False
+            job.started_at = None
+            job.completed_at = None
+            job.error_message = None
+            job.progress = {"percentage": 0, "message": "في قائمة الانتظار (استئناف)"}
+        
+        self._persist_jobs(job_id)
+        
+        return True
+    
     def cancel_job(self, job_id: str) -> bool:
         """Cancel a job (only if queued)"""
         with self.lock:
@@ -147,24 +430,35 @@ class JobManager:
                 return False
             
             job = self.jobs[job_id]
-            if job.status == JobStatus.QUEUED:
-                job.status = JobStatus.CANCELLED
-                job.completed_at = datetime.now()
-                return True
+            if job.status != JobStatus.QUEUED:
+                return False
             
-            return False
+            job.status = JobStatus.CANCELLED
+            job.completed_at = datetime.now()
+            # The dispatcher skips heap entries without a pending worker
+            self.pending_workers.pop(job_id, None)
+            
+            # Posts of a batch that never started go with it
+            child_ids = self._finish_queued_children_locked(job, JobStatus.CANCELLED)
+        
+        self._persist_jobs(job_id, *child_ids)
+        
+        return True
     
     def get_active_jobs_count(self) -> int:
         """Get number of currently active jobs"""
         with self.lock:
-            return len(self.active_threads)
+            return len(self.active_threads) + len(self.active_async_jobs)
     
     def get_all_jobs_summary(self) -> Dict:
         """Get summary of all jobs"""
         with self.lock:
             summary = {
                 "total_jobs": len(self.jobs),
-                "active_jobs": len(self.active_threads),
+                "active_jobs": len(self.active_threads) + len(self.active_async_jobs),
+                "active_async_jobs": len(self.active_async_jobs),
+                "queued_jobs": len(self.pending_workers),
+                "max_queued_jobs": settings.MAX_QUEUED_JOBS,
                 "available_slots": settings.MAX_CONCURRENT_JOBS - len(self.active_threads),
                 "jobs_by_status": {}
             }
@@ -175,56 +469,394 @@ class JobManager:
             
             return summary
     
+    def _get_queue_position_locked(self, job_id: str) -> Optional[int]:
+        """Get queue position; caller must hold the lock"""
+        if job_id not in self.pending_workers:
+            return None
+        
+        engine = self.jobs[job_id].engine
+        position = 1
+        for entry in sorted(self.pending_queues[engine]):
+            if entry[2] == job_id:
+                return position
+            if entry[2] in self.pending_workers:
+                position += 1
+        
+        return None
+    
+    def _get_dispatchable_engine_locked(self) -> Optional[str]:
+        """Get an engine with both a queued job and a free slot; caller must hold the lock"""
+        if self.pending_queues["thread"] and len(self.active_threads) < settings.MAX_CONCURRENT_JOBS:
+            return "thread"
+        if self.pending_queues["async"] and len(self.active_async_jobs) < settings.MAX_CONCURRENT_ASYNC_JOBS:
+            return "async"
+        return None
+    
+    def _dispatch_jobs(self):
+        """Background thread that starts queued jobs as slots free up"""
+        while True:
+            with self.dispatch_condition:
+                engine = self._get_dispatchable_engine_locked()
+                while engine is None:
+                    self.dispatch_condition.wait()
+                    engine = self._get_dispatchable_engine_locked()
+                
+                _, _, job_id = heapq.heappop(self.pending_queues[engine])
+                pending = self.pending_workers.pop(job_id, None)
+                job = self.jobs.get(job_id)
+                
+                # Cancelled or removed while waiting in the queue
+                if pending is None or job is None or job.status != JobStatus.QUEUED:
+                    continue
+                
+                worker_function, args, kwargs = pending
+                
+                # Update job status
+                job.status = JobStatus.RUNNING
+                job.started_at = datetime.now()
+                job.progress = {"percentage": 0, "message": "بدء المعالجة..."}
+                self.dirty_jobs.add(job_id)
+                
+                if engine == "async":
+                    # Schedule the coroutine on the shared event loop
+                    future = asyncio.run_coroutine_threadsafe(
+                        self._async_worker_wrapper(job_id, worker_function, args, kwargs),
+                        self._get_async_loop()
+                    )
+                    self.active_async_jobs[job_id] = future
+                    continue
+                
+                # Create and start thread
+                thread = threading.Thread(
+                    target=self._worker_wrapper,
+                    args=(job_id, worker_function, args, kwargs),
+                    daemon=True
+                )
+                
+                self.active_threads[job_id] = thread
+                thread.start()
+    
     def _generate_job_id(self, job_type: str) -> str:
         """Generate unique job ID"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         unique_id = str(uuid.uuid4())[:8]
         return f"{job_type}_{timestamp}_{unique_id}"
     
+    def _get_async_loop(self) -> asyncio.AbstractEventLoop:
+        """Get the async engine event loop, starting it on first use"""
+        if self.async_loop is None:
+            self.async_loop = asyncio.new_event_loop()
+            self.async_loop_thread = threading.Thread(target=self.async_loop.run_forever, daemon=True)
+            self.async_loop_thread.start()
+        
+        return self.async_loop
+    
     def _worker_wrapper(self, job_id: str, worker_function: Callable, args: tuple, kwargs: dict):
         """Wrapper function for worker threads"""
+        with log_context(**self._get_log_fields(job_id)):
+            self._run_worker(job_id, worker_function, args, kwargs)
+    
+    def _run_worker(self, job_id: str, worker_function: Callable, args: tuple, kwargs: dict,
+                    release_slot: bool = True):
+        """Run a thread engine job inside its log context (batch children hold no slot)"""
+        started = time.monotonic()
         try:
             # Update progress
             self._update_job_progress(job_id, 10, "جاري بدء المعالجة...")
             
             # Call the actual worker function
-            result = worker_function(job_id, self._update_job_progress, *args, **kwargs)
+            with self._profile_job(job_id):
+                result = worker_function(job_id, self._update_job_progress, *args, **kwargs)
             
-            # Save result to file
-            file_path = self._save_result_to_file(job_id, result)
-            
-            # Update job as completed
-            with self.lock:
-                if job_id in self.jobs:
-                    job = self.jobs[job_id]
-                    job.status = JobStatus.COMPLETED
-                    job.completed_at = datetime.now()
-                    job.result = {
-                        "total_items": result.get("total_reactions", result.get("total_comments", 0)),
-                        "file_size": self._get_file_size(file_path) if file_path else 0,
-                        "download_expires_at": (datetime.now() + timedelta(hours=settings.CLEANUP_AFTER_HOURS)).isoformat()
-                    }
-                    job.file_path = file_path
-                    job.progress = {"percentage": 100, "message": "تم الانتهاء بنجاح"}
+            self._complete_job(job_id, result)
+            log.info("اكتملت المهمة", duration_s=round(time.monotonic() - started, 1))
         
         except Exception as e:
-            # Update job as failed
+            log.warning("فشلت المهمة", error=str(e), duration_s=round(time.monotonic() - started, 1))
+            self._fail_job(job_id, e)
+        
+        finally:
+            self._observe_job_duration(job_id, time.monotonic() - started)
+            if release_slot:
+                self._release_slot(job_id)
+    
+    @contextmanager
+    def _profile_job(self, job_id: str):
+        """Profile the worker of a job that asked for it (at most one job at a time)"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            profile, memory = (job.profile, job.profile_memory) if job else (False, False)
+        
+        if not profile:
+            yield
+            return
+        
+        profiler = JobProfiler(job_id, memory=memory)
+        try:
+            with profiler:
+                yield
+        finally:
             with self.lock:
                 if job_id in self.jobs:
-                    job = self.jobs[job_id]
-                    job.status = JobStatus.FAILED
-                    job.completed_at = datetime.now()
-                    job.error_message = str(e)
-                    job.progress = {"percentage": 0, "message": f"فشل: {str(e)}"}
+                    self.jobs[job_id].profile_summary = profiler.summary
+    
+    async def _async_worker_wrapper(self, job_id: str, worker_function: Callable, args: tuple, kwargs: dict):
+        """Wrapper coroutine for async engine jobs"""
+        # Each job runs in its own task, so the log context stays per job
+        with log_context(**self._get_log_fields(job_id)):
+            await self._run_async_worker(job_id, worker_function, args, kwargs)
+    
+    async def _run_async_worker(self, job_id: str, worker_function: Callable, args: tuple, kwargs: dict,
+                                release_slot: bool = True):
+        """Run an async engine job inside its log context (batch children hold no slot)"""
+        started = time.monotonic()
+        try:
+            # Update progress
+            self._update_job_progress(job_id, 10, "جاري بدء المعالجة...")
+            
+            # Await the actual worker coroutine
+            result = await worker_function(job_id, self._update_job_progress, *args, **kwargs)
+            
+            # Writing the result file is blocking I/O, keep it off the event loop
+            await asyncio.to_thread(self._complete_job, job_id, result)
+            log.info("اكتملت المهمة", duration_s=round(time.monotonic() - started, 1))
+        
+        except Exception as e:
+            log.warning("فشلت المهمة", error=str(e), duration_s=round(time.monotonic() - started, 1))
+            self._fail_job(job_id, e)
         
         finally:
-            # Remove from active threads
+            self._observe_job_duration(job_id, time.monotonic() - started)
+            if release_slot:
+                self._release_slot(job_id)
+    
+    def _observe_job_duration(self, job_id: str, duration: float):
+        """Record the duration of a finished job by type and final status"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+            job_type, status = job.job_type, job.status.value
+        
+        JOB_DURATION_SECONDS.labels(job_type, status).observe(duration)
+    
+    def run_batch(self, parent_id: str, child_worker: Callable, *args, concurrency: int = 1) -> List[Dict]:
+        """
+        Run the children of a batch job from its worker thread
+        
+        Up to `concurrency` posts run at once; each child is completed (and
+        downloadable) as soon as it finishes. Returns the per-post summaries.
+        """
+        with self.lock:
+            child_ids = list(self.jobs[parent_id].child_ids or [])
+        
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=parent_id) as pool:
+            futures = [pool.submit(self._run_child_job, child_id, child_worker, args) for child_id in child_ids]
+            for finished, _ in enumerate(as_completed(futures), start=1):
+                self._update_batch_progress(parent_id, finished, len(child_ids))
+        
+        with self.lock:
+            return [self._get_child_summary_locked(child_id) for child_id in child_ids]
+    
+    async def run_batch_async(self, parent_id: str, child_worker: Callable, *args,
+                              concurrency: int = 1) -> List[Dict]:
+        """Run the children of a batch job on the async engine (child_worker is a coroutine function)"""
+        with self.lock:
+            child_ids = list(self.jobs[parent_id].child_ids or [])
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def run_child(child_id: str):
+            async with semaphore:
+                await self._run_child_job_async(child_id, child_worker, args)
+        
+        tasks = [asyncio.ensure_future(run_child(child_id)) for child_id in child_ids]
+        for finished, task in enumerate(asyncio.as_completed(tasks), start=1):
+            await task
+            self._update_batch_progress(parent_id, finished, len(child_ids))
+        
+        with self.lock:
+            return [self._get_child_summary_locked(child_id) for child_id in child_ids]
+    
+    def build_batch_result(self, posts: List[Dict]) -> Dict:
+        """Build the result document of a batch job from its per-post summaries"""
+        completed = [post for post in posts if post["status"] == JobStatus.COMPLETED.value]
+        
+        return {
+            "success": True,
+            "total_posts": len(posts),
+            "completed_posts": len(completed),
+            "failed_posts": len(posts) - len(completed),
+            "posts": posts,
+            "scraped_at": datetime.now().isoformat()
+        }
+    
+    def _run_child_job(self, job_id: str, worker_function: Callable, args: tuple):
+        """Run one batch child in the calling thread, with its own log context"""
+        if not self._mark_child_running(job_id):
+            return
+        with log_context(**self._get_log_fields(job_id)):
+            self._run_worker(job_id, worker_function, args, {}, release_slot=False)
+    
+    async def _run_child_job_async(self, job_id: str, worker_function: Callable, args: tuple):
+        """Run one batch child as a task on the async engine loop"""
+        if not self._mark_child_running(job_id):
+            return
+        with log_context(**self._get_log_fields(job_id)):
+            await self._run_async_worker(job_id, worker_function, args, {}, release_slot=False)
+    
+    def _mark_child_running(self, job_id: str) -> bool:
+        """Move a queued batch child to RUNNING (False if it was cancelled meanwhile)"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.status != JobStatus.QUEUED:
+                return False
+            job.status = JobStatus.RUNNING
+            job.started_at = datetime.now()
+            job.progress = {"percentage": 0, "message": "بدء المعالجة..."}
+        
+        self._persist_jobs(job_id)
+        return True
+    
+    def _update_batch_progress(self, parent_id: str, finished: int, total: int):
+        """Report how many posts of a batch are done"""
+        self._update_job_progress(
+            parent_id, 10 + int(80 * finished / total) if total else 90,
+            f"اكتمل {finished} من {total} منشور",
+            posts_finished=finished,
+            posts_total=total
+        )
+    
+    def _get_log_fields(self, job_id: str) -> Dict:
+        """Get the log context fields of a job"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            fields = {
+                "job_id": job_id,
+                "engine": job.engine if job else None,
+                "debug": job.debug if job else False
+            }
+            if job and job.parent_id:
+                fields["parent_id"] = job.parent_id
+            return fields
+    
+    def _get_child_summary_locked(self, job_id: str) -> Dict:
+        """Get the per-post summary of a batch child; caller must hold the lock"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return {"job_id": job_id, "post_url": None, "status": "expired"}
+        
+        return {
+            "job_id": job_id,
+            "post_url": job.post_url,
+            "status": job.status.value,
+            "total_items": job.result.get("total_items") if job.result else None,
+            "error_message": job.error_message
+        }
+    
+    def _finish_queued_children_locked(self, job: JobInfo, status: JobStatus,
+                                       error_message: Optional[str] = None) -> List[str]:
+        """Give batch children that never started a final status; caller must hold the lock"""
+        finished = []
+        for child_id in job.child_ids or []:
+            child = self.jobs.get(child_id)
+            if child and child.status == JobStatus.QUEUED:
+                child.status = status
+                child.completed_at = datetime.now()
+                child.error_message = error_message
+                child.progress = {"percentage": 0, "message": f"فشل: {error_message}" if error_message else "أُلغيت"}
+                finished.append(child_id)
+        return finished
+    
+    def _complete_job(self, job_id: str, result: Dict):
+        """Save the result and mark a job as completed"""
+        # Save result to file
+        file_path = self._save_result_to_file(job_id, result)
+        
+        # Interrupted or failed jobs keep their checkpoint (and raw spools) so they can be resumed later
+        finished = bool(result) and not result.get("error") and not result.get("interrupted")
+        
+        # Columnar copy of the items (Parquet), author index and offset index of the
+        # spool for paginated queries, written before the job shows as completed;
+        # spools of finished jobs are compacted (gzip) by the offset index
+        unique_authors = None
+        if file_path:
             with self.lock:
-                if job_id in self.active_threads:
-                    del self.active_threads[job_id]
+                job = self.jobs.get(job_id)
+                job_type, post_url = (job.job_type, job.post_url) if job else (None, "")
+            export_job_parquet(job_id, job_type, lambda section: iter_result_items(job_id, section, file_path))
+            unique_authors = self._index_authors(job_id, job_type, post_url, file_path)
+            build_job_index(job_id, job_type, compact=finished)
+        
+        if finished:
+            checkpoint_store.delete(job_id)
+        resumable = not finished and os.path.exists(checkpoint_store.get_path(job_id))
+        
+        # Update job as completed
+        with self.lock:
+            if job_id in self.jobs:
+                job = self.jobs[job_id]
+                job.status = JobStatus.COMPLETED
+                job.completed_at = datetime.now()
+                job.result = {
+                    "total_items": result.get("total_items", result.get("total_reactions", result.get("total_comments", 0))),
+                    "file_size": self._get_file_size(file_path) if file_path else 0,
+                    "download_expires_at": (datetime.now() + timedelta(hours=settings.CLEANUP_AFTER_HOURS)).isoformat(),
+                    "resumable": resumable,
+                    "interruption_reason": result.get("interruption_reason", result.get("error")) if resumable else None,
+                    "unique_authors": unique_authors
+                }
+                job.file_path = file_path
+                job.progress = {"percentage": 100, "message": "تم الانتهاء بنجاح"}
+                if finished and file_path and job.cache_key:
+                    self.result_cache.put(job.cache_key, job_id)
+        
+        self._persist_jobs(job_id)
+    
+    def _index_authors(self, job_id: str, job_type: str, post_url: str, file_path: str) -> Optional[int]:
+        """Add the reactions and comments of a completed job to the author index; returns its unique authors"""
+        sections = {
+            section: iter_result_items(job_id, section, file_path)
+            for section in JOB_SECTIONS.get(job_type, ())
+        }
+        if not sections:
+            return None
+        
+        try:
+            return self.author_index.index_job(job_id, normalize_post_id(post_url), sections)
+        except Exception as e:
+            log.error("خطأ في فهرسة المستخدمين", job_id=job_id, error=str(e))
+            return None
     
-    def _update_job_progress(self, job_id: str, percentage: int, message: str):
-        """Update job progress"""
+    def _fail_job(self, job_id: str, error: Exception):
+        """Mark a job as failed"""
+        # Keep the spool on disk (it holds every page scraped so far)
+        with self.lock:
+            writer = self.result_writers.pop(job_id, None)
+        if writer:
+            writer.close()
+        
+        child_ids = []
+        with self.lock:
+            if job_id in self.jobs:
+                job = self.jobs[job_id]
+                job.status = JobStatus.FAILED
+                job.completed_at = datetime.now()
+                job.error_message = str(error)
+                job.progress = {"percentage": 0, "message": f"فشل: {str(error)}"}
+                child_ids = self._finish_queued_children_locked(job, JobStatus.FAILED, str(error))
+        
+        self._persist_jobs(job_id, *child_ids)
+    
+    def _release_slot(self, job_id: str):
+        """Remove a job from the active set and let the dispatcher start the next one"""
+        with self.dispatch_condition:
+            self.active_threads.pop(job_id, None)
+            self.active_async_jobs.pop(job_id, None)
+            self.dispatch_condition.notify()
+    
+    def _update_job_progress(self, job_id: str, percentage: int, message: str, **details):
+        """Update job progress (details such as current_page are stored alongside)"""
         with self.lock:
             if job_id in self.jobs:
                 job = self.jobs[job_id]
@@ -233,17 +865,23 @@ class JobManager:
                 job.progress.update({
                     "percentage": percentage,
                     "message": message,
-                    "updated_at": datetime.now().isoformat()
+                    "updated_at": datetime.now().isoformat(),
+                    **details
                 })
+                self.dirty_jobs.add(job_id)
     
     def _save_result_to_file(self, job_id: str, result: Dict) -> Optional[str]:
         """Save job result to file"""
+        with self.lock:
+            writer = self.result_writers.pop(job_id, None)
+        
         try:
             if not result or result.get("error"):
+                if writer:
+                    writer.close()
                 return None
             
-            file_name = f"{job_id}.json"
-            file_path = os.path.join(settings.RESULTS_DIR, file_name)
+            file_path = get_result_path(job_id)
             
             # Add metadata
             output_data = {
@@ -255,15 +893,87 @@ class JobManager:
                 **result
             }
             
-            with open(file_path, 'w', encoding='utf-8') as f:
+            # Streamed jobs already have their items on disk
+            if writer:
+                return writer.finalize(output_data)
+            
+            with open_result_file(file_path, 'w') as f:
                 json.dump(output_data, f, ensure_ascii=False, indent=2)
             
             return file_path
             
         except Exception as e:
-            print(f"❌ خطأ في حفظ النتائج: {e}")
+            log.error("خطأ في حفظ النتائج", job_id=job_id, error=str(e))
             return None
     
+    def _load_jobs_from_store(self):
+        """
+        Load the registry saved before the last restart
+        
+        Jobs that were queued or running when the service stopped are marked
+        as failed; those with a checkpoint can be resumed.
+        """
+        interrupted_jobs = []
+        
+        for data in self.store.load_all():
+            try:
+                job = JobInfo.from_dict(data)
+            except (KeyError, TypeError, ValueError) as e:
+                log.warning("تعذر تحميل مهمة محفوظة", error=str(e))
+                continue
+            
+            if job.status in (JobStatus.QUEUED, JobStatus.RUNNING):
+                job.status = JobStatus.FAILED
+                job.completed_at = datetime.now()
+                job.error_message = "انقطعت المهمة بسبب إعادة تشغيل الخدمة"
+                job.progress = {"percentage": 0, "message": f"فشل: {job.error_message}"}
+                interrupted_jobs.append(job.to_dict())
+            elif (job.status == JobStatus.COMPLETED and job.cache_key and job.file_path
+                  and not (job.result or {}).get("resumable")):
+                self.result_cache.put(job.cache_key, job.job_id)
+            
+            self.jobs[job.job_id] = job
+        
+        self.store.save_many(interrupted_jobs)
+    
+    def _persist_jobs(self, *job_ids: str):
+        """Write jobs to the store right away (used for status changes)"""
+        with self.lock:
+            snapshots = [self.jobs[job_id].to_dict() for job_id in job_ids if job_id in self.jobs]
+            self.dirty_jobs.difference_update(job_ids)
+        
+        try:
+            self.store.save_many(snapshots)
+        except Exception as e:
+            log.error("خطأ في حفظ سجل المهام", error=str(e))
+    
+    def _flush_dirty_jobs(self):
+        """Background thread that writes batched progress updates to the store"""
+        while True:
+            time.sleep(settings.JOB_STORE_FLUSH_SECONDS)
+            
+            with self.lock:
+                job_ids = list(self.dirty_jobs)
+            
+            if job_ids:
+                self._persist_jobs(*job_ids)
+    
+    def _cleanup_orphan_files(self, known_jobs: set, cutoff_time: datetime):
+        """Delete expired job artifacts (JOB_ARTIFACT_PATTERN) that no job in the registry refers to"""
+        for file_path in glob.glob(os.path.join(settings.RESULTS_DIR, "*")):
+            file_name = os.path.basename(file_path)
+            if not JOB_ARTIFACT_PATTERN.match(file_name):
+                continue
+            job_id = file_name.split(".", 1)[0]
+            if job_id in known_jobs:
+                continue
+            
+            try:
+                if datetime.fromtimestamp(os.path.getmtime(file_path)) < cutoff_time:
+                    os.remove(file_path)
+            except OSError:
+                pass
+    
     def _get_file_size(self, file_path: str) -> str:
         """Get human readable file size"""
         try:
@@ -296,21 +1006,33 @@ class JobManager:
                     for job_id in expired_jobs:
                         job = self.jobs[job_id]
                         
-                        # Delete file if exists
-                        if job.file_path and os.path.exists(job.file_path):
+                        # Delete result file and spools if they exist
+                        job_files = glob.glob(os.path.join(settings.RESULTS_DIR, f"{job_id}.*"))
+                        if job.file_path:
+                            job_files.append(job.file_path)
+                        for file_path in set(job_files):
                             try:
-                                os.remove(job.file_path)
+                                if os.path.exists(file_path):
+                                    os.remove(file_path)
                             except:
                                 pass
                         
                         # Remove from jobs dict
                         del self.jobs[job_id]
+                        self.dirty_jobs.discard(job_id)
+                    
+                    known_jobs = set(self.jobs)
+                
+                self.store.delete_many(expired_jobs)
+                self.result_cache.discard_jobs(expired_jobs)
+                self.author_index.delete_jobs(expired_jobs)
+                self._cleanup_orphan_files(known_jobs, cutoff_time)
                 
                 # Sleep for 1 hour before next cleanup
                 time.sleep(3600)
                 
             except Exception as e:
-                print(f"❌ خطأ في تنظيف المهام المنتهية الصلاحية: {e}")
+                log.error("خطأ في تنظيف المهام المنتهية الصلاحية", error=str(e))
                 time.sleep(3600)
 
 
@@ -0,0 +1,87 @@
+"""
+Persistent job registry backed by SQLite
+"""
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List
+
+
+# How long a write waits for the database lock before "database is locked"
+BUSY_TIMEOUT_SECONDS = 30
+
+
+class JobStore:
+    """
+    Durable copy of the job registry
+
+    JobManager keeps serving status lookups from memory; this store only
+    receives the writes, so jobs survive a service restart. The database runs
+    in WAL mode, which keeps commits cheap and lets readers run alongside them.
+    """
+
+    def __init__(self, db_path: str):
+        """Open the database and create the schema"""
+        self.db_path = db_path
+        self.lock = threading.Lock()
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        # Waits for a lock held by another process (e.g. a second API worker) instead of failing
+        self.connection = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                job_type TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                completed_at TEXT,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status);
+            CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs (created_at);
+        """)
+        self.connection.commit()
+
+    def save_many(self, jobs: Iterable[Dict]):
+        """Insert or update several jobs (as JobInfo.to_dict()) in one transaction"""
+        rows = [
+            (job["job_id"], job["job_type"], job["status"], job["created_at"],
+             job.get("completed_at"), json.dumps(job, ensure_ascii=False))
+            for job in jobs
+        ]
+        if not rows:
+            return
+
+        with self.lock:
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO jobs (job_id, job_type, status, created_at, completed_at, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+
+    def save(self, job: Dict):
+        """Insert or update one job"""
+        self.save_many([job])
+
+    def load_all(self) -> List[Dict]:
+        """Load every stored job, oldest first"""
+        with self.lock:
+            cursor = self.connection.execute("SELECT data FROM jobs ORDER BY created_at")
+            return [json.loads(row[0]) for row in cursor.fetchall()]
+
+    def delete_many(self, job_ids: Iterable[str]):
+        """Delete several jobs"""
+        rows = [(job_id,) for job_id in job_ids]
+        if not rows:
+            return
+
+        with self.lock:
+            with self.connection:
+                self.connection.executemany("DELETE FROM jobs WHERE job_id = ?", rows)
@@ -0,0 +1,135 @@
+"""
+Structured logging with per-job context
+"""
+import json
+import logging
+import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict
+
+from app.config import settings
+
+
+# Fields attached to every record logged by the current job (thread or asyncio task)
+_log_context: ContextVar[Dict[str, Any]] = ContextVar("log_context", default={})
+
+
+@contextmanager
+def log_context(**fields):
+    """
+    Attach fields (job_id, debug, ...) to every record logged inside the block
+
+    debug=True turns on debug records for this job only, whatever LOG_LEVEL is.
+    """
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+class StructuredFormatter(logging.Formatter):
+    """Format records as 'time level logger message key=value ...' or as JSON lines"""
+
+    def __init__(self, as_json: bool = False):
+        """Initialize formatter"""
+        super().__init__()
+        self.as_json = as_json
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Format a record with its structured fields"""
+        fields = getattr(record, "fields", {})
+        timestamp = datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds")
+
+        if self.as_json:
+            data = {
+                "time": timestamp,
+                "level": record.levelname,
+                "logger": record.name,
+                "message": record.getMessage(),
+                **fields
+            }
+            if record.exc_info:
+                data["exception"] = self.formatException(record.exc_info)
+            return json.dumps(data, ensure_ascii=False, default=str)
+
+        parts = [timestamp, record.levelname, record.name, record.getMessage()]
+        for key, value in fields.items():
+            if not isinstance(value, (int, float, bool)) and value is not None:
+                value = json.dumps(str(value), ensure_ascii=False)
+            parts.append(f"{key}={value}")
+
+        line = " ".join(parts)
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class StructuredLogger:
+    """
+    Logger whose records carry key/value fields plus the current job context
+
+    Messages are never formatted by the caller: pass variable data as keyword
+    fields, and wrap anything expensive to compute in is_debug_enabled().
+    """
+
+    def __init__(self, name: str):
+        """Initialize logger"""
+        self.logger = logging.getLogger(name)
+
+    def is_debug_enabled(self) -> bool:
+        """Check whether debug records are emitted (globally or for the current job)"""
+        return self.logger.isEnabledFor(logging.DEBUG) or _log_context.get().get("debug", False)
+
+    def debug(self, message: str, **fields):
+        """Log a debug record"""
+        if self.is_debug_enabled():
+            self._emit(logging.DEBUG, message, fields)
+
+    def info(self, message: str, **fields):
+        """Log an info record"""
+        if self.logger.isEnabledFor(logging.INFO):
+            self._emit(logging.INFO, message, fields)
+
+    def warning(self, message: str, **fields):
+        """Log a warning record"""
+        if self.logger.isEnabledFor(logging.WARNING):
+            self._emit(logging.WARNING, message, fields)
+
+    def error(self, message: str, exc_info: bool = False, **fields):
+        """Log an error record (exc_info=True adds the current traceback)"""
+        if self.logger.isEnabledFor(logging.ERROR):
+            self._emit(logging.ERROR, message, fields, exc_info)
+
+    def _emit(self, level: int, message: str, fields: Dict, exc_info: bool = False):
+        """Build the record and hand it to the handlers"""
+        context = _log_context.get()
+        fields = {key: value for key, value in {**context, **fields}.items() if key != "debug"}
+        record = self.logger.makeRecord(
+            self.logger.name, level, "(unknown file)", 0, message, None,
+            sys.exc_info() if exc_info else None, extra={"fields": fields}
+        )
+        # handle() skips the logger level check, so per-job debug records get through
+        self.logger.handle(record)
+
+
+def _configure_root_logger() -> logging.Logger:
+    """Attach the structured handler to the application root logger once"""
+    root = logging.getLogger("fbscraper")
+    if not root.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(StructuredFormatter(as_json=settings.LOG_FORMAT == "json"))
+        root.addHandler(handler)
+        root.setLevel(getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO))
+        root.propagate = False
+    return root
+
+
+_configure_root_logger()
+
+
+def get_logger(name: str) -> StructuredLogger:
+    """Get a structured logger under the application root logger"""
+    return StructuredLogger(f"fbscraper.{name}")
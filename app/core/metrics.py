@@ -0,0 +1,215 @@
+"""
+In-process metrics in the Prometheus text exposition format
+
+Counters, gauges and histograms are plain objects updated from the scraping
+hot paths: one lock and a few additions per observation, no I/O. /metrics
+renders them on demand.
+"""
+import bisect
+import math
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+# Default latency buckets (seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Job durations range from seconds (small posts) to the job timeout
+JOB_DURATION_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value the way Prometheus expects"""
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    """Escape a label value (backslash, double quote and newline)"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    """Render {name="value",...} (empty string without labels)"""
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + "}"
+
+
+class Metric:
+    """Base class: a named metric family with one child per label combination"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """Initialize metric and register it"""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.children: Dict[Tuple[str, ...], object] = {}
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _new_child(self):
+        """Create the value holder of one label combination"""
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """Get the child of a label combination (created on first use)"""
+        key = tuple(str(value) for value in values)
+        child = self.children.get(key)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(key, self._new_child())
+        return child
+
+    def _render_samples(self, lines: List[str]):
+        """Append the samples of every child"""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """Render the metric family"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        self._render_samples(lines)
+        return "\n".join(lines)
+
+
+class _Value:
+    """Single value of a counter or gauge child"""
+
+    def __init__(self):
+        """Initialize value"""
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        """Add to the value"""
+        with self.lock:
+            self.value += amount
+
+    def set(self, value: float):
+        """Replace the value"""
+        self.value = value
+
+
+class Counter(Metric):
+    """Monotonic counter"""
+
+    kind = "counter"
+
+    def _new_child(self):
+        """Create the value of one label combination"""
+        return _Value()
+
+    def inc(self, amount: float = 1):
+        """Increment the counter of a metric without labels"""
+        self.labels().inc(amount)
+
+    def _render_samples(self, lines: List[str]):
+        """Append one sample per label combination"""
+        for key, child in list(self.children.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}")
+
+
+class Gauge(Counter):
+    """Value that goes up and down"""
+
+    kind = "gauge"
+
+    def set(self, value: float):
+        """Set the value of a metric without labels"""
+        self.labels().set(value)
+
+
+class _HistogramValue:
+    """Bucket counts, sum and count of one histogram child"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        """Initialize histogram value"""
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float):
+        """Record one observation"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Histogram(Metric):
+    """Distribution of observations in cumulative buckets"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        """Initialize histogram"""
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        """Create the buckets of one label combination"""
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        """Record an observation of a metric without labels"""
+        self.labels().observe(value)
+
+    def _render_samples(self, lines: List[str]):
+        """Append the cumulative buckets, sum and count of every label combination"""
+        for key, child in list(self.children.items()):
+            with child.lock:
+                counts, total_sum = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total_sum)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+
+
+REGISTRY: List[Metric] = []
+
+
+def render_metrics() -> str:
+    """Render every registered metric"""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+def record_graphql_request(query: str, status_code: int, elapsed: float, size: int):
+    """Record the latency and size of one GraphQL response"""
+    GRAPHQL_REQUEST_SECONDS.labels(query, status_code).observe(elapsed)
+    GRAPHQL_RESPONSE_BYTES.labels(query).inc(size)
+
+
+# Scraping
+GRAPHQL_REQUEST_SECONDS = Histogram(
+    "fbscraper_graphql_request_seconds", "Latency of GraphQL requests", ("query", "status"))
+GRAPHQL_RESPONSE_BYTES = Counter(
+    "fbscraper_graphql_response_bytes_total", "Bytes received in GraphQL responses", ("query",))
+PAGES_SCRAPED = Counter(
+    "fbscraper_pages_total", "Result pages scraped and parsed", ("query",))
+PARSE_SECONDS = Histogram(
+    "fbscraper_parse_seconds", "Time to decode and extract a GraphQL response", ("parser", "mode"))
+TOKEN_EXTRACTION_SECONDS = Histogram(
+    "fbscraper_token_extraction_seconds", "Time to fetch the home page and extract fb_dtsg/lsd", ("result",))
+
+# Jobs
+JOB_DURATION_SECONDS = Histogram(
+    "fbscraper_job_duration_seconds", "Duration of finished jobs", ("job_type", "status"),
+    buckets=JOB_DURATION_BUCKETS)
+JOBS_ACTIVE = Gauge("fbscraper_jobs_active", "Jobs currently running")
+JOBS_QUEUED = Gauge("fbscraper_jobs_queued", "Jobs waiting for a free slot")
+JOBS_BY_STATUS = Gauge("fbscraper_jobs", "Jobs in the registry", ("status",))
+
+# Shared resources
+HTTP_POOL_ACCOUNTS = Gauge("fbscraper_http_pool_accounts", "Accounts with pooled connections")
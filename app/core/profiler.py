@@ -0,0 +1,212 @@
+"""
+Opt-in profiling of single jobs
+
+A job submitted with "profile": true runs its worker under cProfile and, with
+"profile_memory": true, between two tracemalloc snapshots. The output is kept
+next to the result file (and deleted with it):
+
+- {job_id}.profile.prof: pstats dump (python -m pstats, snakeviz)
+- {job_id}.profile.memory.txt: allocation growth by source line
+
+A summary (time per phase and the most expensive functions) is attached to
+the job status. Profiled jobs run on the thread engine: up to Python 3.11
+cProfile only follows the thread it is enabled in. From 3.12 it is built on
+sys.monitoring, which is process-wide: while a job is profiled every thread
+is instrumented (other jobs run slower and their calls show up in the
+profile) and a second profiler cannot be enabled. So only one job is
+profiled at a time; a profiled job that starts while another one is being
+profiled (or while a debugger/coverage tool holds the profiler) runs
+unprofiled, and its summary says why. Jobs without the option never enter
+this module.
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.core.log import get_logger
+
+
+log = get_logger("profiler")
+
+# phase -> (file suffix, function name) of the functions whose cumulative time it counts;
+# phases nest (tokens and network both include the home page request), so they do not add up
+PROFILE_PHASES: Dict[str, Tuple[Tuple[str, str], ...]] = {
+    "tokens": (("app/scrapers/reactions_scraper.py", "load_tokens"),
+               ("app/scrapers/comments_scraper.py", "load_tokens")),
+    "network": (("requests/sessions.py", "send"),),
+    "rate_limit": (("app/core/rate_limiter.py", "acquire"),),
+    "sleep": (("~", "<built-in method time.sleep>"),),
+    "parsing": (("app/scrapers/parse_pool.py", "run"),),
+    "progress_updates": (("app/core/job_manager.py", "_update_job_progress"),),
+    "result_writing": (("app/core/result_writer.py", "write_items"),),
+}
+
+# Functions listed in the status summary / allocation sites in the memory report
+SUMMARY_TOP_FUNCTIONS = 10
+MEMORY_TOP_LINES = 50
+
+PROFILE_SORT_KEYS = ("cumulative", "tottime", "calls", "ncalls")
+
+# Python 3.12+ profiles every thread of the process (sys.monitoring)
+PROFILES_ALL_THREADS = sys.version_info >= (3, 12)
+
+# Held by the job being profiled
+_profile_lock = threading.Lock()
+
+
+def get_profile_paths(job_id: str) -> Tuple[str, str]:
+    """Paths of the pstats dump and the memory report of a job"""
+    base = os.path.join(settings.RESULTS_DIR, f"{job_id}.profile")
+    return f"{base}.prof", f"{base}.memory.txt"
+
+
+def _take_snapshot() -> tracemalloc.Snapshot:
+    """Snapshot of the traced allocations, without tracemalloc's own"""
+    return tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+
+
+def get_phase_times(stats: pstats.Stats) -> Dict[str, float]:
+    """Cumulative seconds spent in each phase of PROFILE_PHASES"""
+    phases = {phase: 0.0 for phase in PROFILE_PHASES}
+    for (filename, _, function), (_, _, _, cumulative, _) in stats.stats.items():
+        filename = filename.replace(os.sep, "/")
+        for phase, functions in PROFILE_PHASES.items():
+            if any(function == name and filename.endswith(suffix) for suffix, name in functions):
+                phases[phase] += cumulative
+    return {phase: round(seconds, 3) for phase, seconds in phases.items()}
+
+
+def get_top_functions(stats: pstats.Stats, limit: int = SUMMARY_TOP_FUNCTIONS) -> List[Dict]:
+    """The functions with the most own time"""
+    entries = sorted(stats.stats.items(), key=lambda entry: entry[1][2], reverse=True)[:limit]
+    return [
+        {"function": pstats.func_std_string((os.path.basename(filename), line, function)),
+         "calls": calls, "own_seconds": round(own, 4), "cumulative_seconds": round(cumulative, 4)}
+        for (filename, line, function), (_, calls, own, cumulative, _) in entries
+    ]
+
+
+class JobProfiler:
+    """Context manager profiling the calling thread while a job runs"""
+
+    def __init__(self, job_id: str, memory: bool = False):
+        """Initialize profiler"""
+        self.job_id = job_id
+        self.memory = memory
+        self.profiler = cProfile.Profile()
+        self.snapshots: List[tracemalloc.Snapshot] = []
+        self.started_tracemalloc = False
+        self.active = False
+        self.started_at = 0.0
+        self.summary: Optional[Dict] = None
+
+    def _skip(self, reason: str):
+        """Run the job unprofiled, recording why in its summary"""
+        log.warning("المهمة ستعمل بدون تحليل", reason=reason)
+        self.summary = {"skipped": reason}
+
+    def __enter__(self) -> "JobProfiler":
+        """Start profiling (and tracing allocations), or skip it when the profiler is busy"""
+        if not _profile_lock.acquire(blocking=False):
+            self._skip("another job is being profiled")
+            return self
+
+        try:
+            if self.memory:
+                # tracemalloc قد يكون مفعلاً من خارج التطبيق (PYTHONTRACEMALLOC): لا نوقفه في هذه الحالة
+                self.started_tracemalloc = not tracemalloc.is_tracing()
+                if self.started_tracemalloc:
+                    tracemalloc.start()
+                self.snapshots.append(_take_snapshot())
+            self.started_at = time.monotonic()
+            self.profiler.enable()
+        except Exception as e:
+            # مثلاً ValueError على 3.12+ عندما تستخدم أداة أخرى sys.monitoring
+            self._stop_tracemalloc()
+            _profile_lock.release()
+            self._skip(str(e))
+            return self
+
+        self.active = True
+        return self
+
+    def _stop_tracemalloc(self):
+        """Stop tracing allocations if this profiler started it"""
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+            self.started_tracemalloc = False
+
+    def __exit__(self, exc_type, exc, traceback) -> bool:
+        """Stop profiling and save the output; never hides the job's own exception"""
+        if not self.active:
+            return False
+
+        self.profiler.disable()
+        wall_seconds = time.monotonic() - self.started_at
+        peak = 0
+        if self.memory:
+            # قبل حفظ الملفات: لا نريد حساب ذاكرة cProfile/pstats نفسها
+            _, peak = tracemalloc.get_traced_memory()
+            self.snapshots.append(_take_snapshot())
+        try:
+            self.summary = self._save(wall_seconds, peak)
+        except Exception as e:
+            log.error("خطأ في حفظ ملف التحليل", error=str(e))
+        finally:
+            self._stop_tracemalloc()
+            self.active = False
+            _profile_lock.release()
+        return False
+
+    def _save(self, wall_seconds: float, peak: int) -> Dict:
+        """Write the pstats dump and memory report; returns the summary"""
+        stats_path, memory_path = get_profile_paths(self.job_id)
+        self.profiler.dump_stats(stats_path)
+
+        stats = pstats.Stats(self.profiler)
+        summary = {
+            "url": f"/jobs/{self.job_id}/profile",
+            "wall_seconds": round(wall_seconds, 3),
+            "all_threads": PROFILES_ALL_THREADS,
+            "phases": get_phase_times(stats),
+            "top_functions": get_top_functions(stats)
+        }
+
+        if self.memory:
+            growth = self.snapshots[1].compare_to(self.snapshots[0], "lineno")
+            with open(memory_path, "w", encoding="utf-8") as f:
+                f.write(f"Traced memory peak (whole process): {peak / (1024 * 1024):.1f} MB\n")
+                f.write(f"Top {MEMORY_TOP_LINES} allocation sites by growth during the job:\n")
+                for stat in growth[:MEMORY_TOP_LINES]:
+                    f.write(f"{stat}\n")
+            summary["memory"] = {
+                "traced_peak_bytes": peak,
+                "top_allocations": [str(stat) for stat in growth[:5]]
+            }
+
+        log.info("تم حفظ ملف التحليل", path=stats_path, wall_s=round(wall_seconds, 1))
+        return summary
+
+
+def render_profile(job_id: str, sort: str = "cumulative", limit: int = 50) -> Optional[str]:
+    """Text report of a job profile (pstats table and memory report), or None without a profile"""
+    stats_path, memory_path = get_profile_paths(job_id)
+    if not os.path.exists(stats_path):
+        return None
+
+    output = io.StringIO()
+    stats = pstats.Stats(stats_path, stream=output)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+
+    if os.path.exists(memory_path):
+        with open(memory_path, "r", encoding="utf-8") as f:
+            output.write("\n" + f.read())
+
+    return output.getvalue()
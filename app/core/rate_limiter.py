@@ -0,0 +1,108 @@
+"""
+Per-account rate limiting for Facebook GraphQL requests
+"""
+import asyncio
+import math
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+
+
+class TokenBucket:
+    """Token bucket refilled at a fixed rate, with reservations"""
+
+    def __init__(self, requests_per_minute: float, burst: int):
+        """Initialize a full bucket"""
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take one token and return how long the caller must wait before using it
+
+        The balance may go negative: every waiting caller holds its own slot,
+        so concurrent callers are spaced out instead of waking up together.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= 1
+
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+
+class AccountRateLimiter:
+    """
+    Shared rate limiter keyed by account (c_user)
+
+    All jobs using the same account draw from one bucket, whichever engine
+    runs them; different accounts never wait on each other.
+    """
+
+    def __init__(self, requests_per_minute: float, burst: int,
+                 overrides: Optional[Dict[str, Tuple[float, int]]] = None):
+        """Initialize rate limiter"""
+        self.requests_per_minute = requests_per_minute
+        self.burst = burst
+        self.overrides = overrides or {}
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.lock = threading.Lock()
+
+    def get_bucket(self, account_id: str) -> TokenBucket:
+        """Get (or create) the bucket of an account"""
+        with self.lock:
+            bucket = self.buckets.get(account_id)
+            if bucket is None:
+                requests_per_minute, burst = self.overrides.get(
+                    account_id, (self.requests_per_minute, self.burst)
+                )
+                bucket = TokenBucket(requests_per_minute, burst)
+                self.buckets[account_id] = bucket
+            return bucket
+
+    def get_concurrency(self, account_id: Optional[str], delay: float, maximum: int) -> int:
+        """
+        Get how many posts of one account are worth scraping at once
+
+        A single post sends at most one request per delay; running more posts
+        than the account's rate covers only makes them queue on the bucket.
+        """
+        if not account_id:
+            return 1
+
+        bucket = self.get_bucket(account_id)
+        return max(1, min(maximum, math.ceil(bucket.rate * max(delay, 0.001))))
+
+    def acquire(self, account_id: Optional[str]):
+        """Block until the account may send one more request"""
+        if not account_id:
+            return
+
+        wait = self.get_bucket(account_id).reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, account_id: Optional[str]):
+        """Wait until the account may send one more request, without blocking the event loop"""
+        if not account_id:
+            return
+
+        wait = self.get_bucket(account_id).reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+# Global rate limiter instance
+rate_limiter = AccountRateLimiter(
+    requests_per_minute=settings.ACCOUNT_REQUESTS_PER_MINUTE,
+    burst=settings.ACCOUNT_BURST,
+    overrides=settings.ACCOUNT_RATE_LIMITS
+)
@@ -0,0 +1,71 @@
+"""
+Index of completed jobs by what they scraped, for reusing recent results
+"""
+import re
+import threading
+import urllib.parse
+from typing import Dict, Iterable, Optional
+
+
+# Post id in the path: /posts/<id>, /permalink/<id> (groups), /videos/<id>, /reel/<id>
+_PATH_POST_ID_PATTERN = re.compile(r'/(?:posts|permalink|videos|reel)/([^/?#]+)')
+
+# Post id in the query string, in order of preference
+_QUERY_POST_ID_PARAMS = ("story_fbid", "fbid", "v")
+
+
+def normalize_post_id(post_url: str) -> str:
+    """
+    Reduce the different URL forms of a post to one id
+
+    Falls back to the URL without scheme, "www."/"m." prefix, query and
+    trailing slash when no post id can be found.
+    """
+    parsed_url = urllib.parse.urlparse(post_url.strip())
+    query_params = urllib.parse.parse_qs(parsed_url.query)
+
+    for param in _QUERY_POST_ID_PARAMS:
+        if query_params.get(param):
+            return query_params[param][0]
+
+    match = _PATH_POST_ID_PATTERN.search(parsed_url.path)
+    if match:
+        return match.group(1)
+
+    host = re.sub(r'^(?:www|m|mbasic|web)\.', '', parsed_url.netloc.lower())
+    return f"{host}{parsed_url.path.rstrip('/')}"
+
+
+class ResultCache:
+    """Latest completed job per (job type, post id, scraping parameters)"""
+
+    def __init__(self):
+        """Initialize result cache"""
+        self.entries: Dict[str, str] = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def make_key(job_type: str, post_url: str, **params) -> str:
+        """Build the cache key of a job; parameters that change the result go in params"""
+        param_part = ",".join(f"{name}={params[name]}" for name in sorted(params))
+        return f"{job_type}:{normalize_post_id(post_url)}:{param_part}"
+
+    def get(self, key: str) -> Optional[str]:
+        """Get the job id cached for a key"""
+        with self.lock:
+            return self.entries.get(key)
+
+    def put(self, key: str, job_id: str):
+        """Cache a completed job (a newer job replaces the previous one)"""
+        with self.lock:
+            self.entries[key] = job_id
+
+    def discard_jobs(self, job_ids: Iterable[str]):
+        """Drop the entries pointing to the given jobs"""
+        job_ids = set(job_ids)
+        if not job_ids:
+            return
+
+        with self.lock:
+            for key in [key for key, job_id in self.entries.items() if job_id in job_ids]:
+                del self.entries[key]
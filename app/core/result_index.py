@@ -0,0 +1,235 @@
+"""
+Offset index of result spools for paginated and filtered result queries
+
+For every indexed section a job gets two sidecar files next to its spool:
+
+- {job_id}.{section}.idx: (offset, length) pairs of the spool lines as
+  unsigned 64-bit integers, first in spool order, then grouped by the value
+  of every indexed field
+- {job_id}.{section}.idx.json: item count and, per field and value, where
+  its group starts in the .idx file and how many entries it has
+
+A page is read with one seek into the .idx file and one read per line (or a
+single read for unfiltered pages), so the spool is never loaded or parsed.
+Once a job finished for good its spools are compacted into gzip blocks
+({job_id}.{section}.ndjson.gz, listed in the header) and the offsets point
+into the decompressed stream.
+"""
+import gzip
+import json
+import os
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.core.log import get_logger
+from app.core.columnar import JOB_SECTIONS
+from app.core.result_writer import get_compressed_spool_path, get_spool_path
+from app.scrapers.parsing import json_loads
+
+
+log = get_logger("results")
+
+# section -> fields that can be filtered on
+INDEX_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "reactions": ("reaction_type",),
+    "comments": ("author_id",),
+}
+
+# Uncompressed bytes per gzip block of a compacted spool (a page decompresses only its blocks)
+SPOOL_BLOCK_SIZE = 256 * 1024
+
+# Two uint64 per entry: spool offset and line length (without the newline)
+ENTRY_SIZE = 2 * array("Q").itemsize
+
+
+def get_index_paths(job_id: str, section: str) -> Tuple[str, str]:
+    """Paths of the entry file and the header of a section index"""
+    base = os.path.join(settings.RESULTS_DIR, f"{job_id}.{section}.idx")
+    return base, f"{base}.json"
+
+
+def build_result_index(job_id: str, section: str, compact: bool = False) -> Optional[Dict]:
+    """
+    Index the spool of a section; returns the header, or None when there is no spool
+
+    With compact, the raw spool is rewritten as a gzip spool of independent
+    blocks (SPOOL_BLOCK_SIZE bytes of whole lines each) and removed; the
+    header then lists the blocks so a page only decompresses the ones it needs.
+    A spool that is already compacted is re-compacted.
+    """
+    spool_path = get_spool_path(job_id, section)
+    compressed_path = get_compressed_spool_path(job_id, section)
+    if os.path.exists(spool_path):
+        source = open(spool_path, "rb")
+    elif os.path.exists(compressed_path):
+        source = gzip.open(compressed_path, "rb")
+        compact = True
+    else:
+        return None
+
+    fields = INDEX_FIELDS[section]
+    entries = array("Q")
+    groups: Dict[str, Dict[str, array]] = {field: {} for field in fields}
+    # [uncompressed start, compressed start, compressed length] per block
+    blocks: List[List[int]] = []
+    block = bytearray()
+    block_start = 0
+
+    def flush_block(target):
+        blocks.append([block_start, target.tell(), 0])
+        target.write(gzip.compress(bytes(block), settings.RESULT_COMPRESSION_LEVEL))
+        blocks[-1][2] = target.tell() - blocks[-1][1]
+
+    offset = 0
+    target = open(f"{compressed_path}.tmp", "wb") if compact else None
+    try:
+        with source:
+            for line in source:
+                # سطر بدون newline هو صفحة لم تكتمل كتابتها
+                if not line.endswith(b"\n"):
+                    continue
+                length = len(line) - 1
+                entries.extend((offset, length))
+                item = json_loads(line)
+                for field in fields:
+                    value = item.get(field)
+                    if value is not None:
+                        groups[field].setdefault(str(value), array("Q")).extend((offset, length))
+                offset += len(line)
+
+                if target:
+                    block += line
+                    if len(block) >= SPOOL_BLOCK_SIZE:
+                        flush_block(target)
+                        block_start, block = offset, bytearray()
+        if target and block:
+            flush_block(target)
+    finally:
+        if target:
+            target.close()
+
+    index_path, header_path = get_index_paths(job_id, section)
+    header = {"items": len(entries) // 2, "fields": {}}
+    if compact:
+        header["blocks"] = blocks
+
+    with open(f"{index_path}.tmp", "wb") as f:
+        entries.tofile(f)
+        start = len(entries) // 2
+        for field, values in groups.items():
+            header["fields"][field] = {}
+            for value, group in values.items():
+                header["fields"][field][value] = [start, len(group) // 2]
+                group.tofile(f)
+                start += len(group) // 2
+
+    with open(f"{header_path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(header, f, ensure_ascii=False)
+
+    if compact:
+        os.replace(f"{compressed_path}.tmp", compressed_path)
+    os.replace(f"{index_path}.tmp", index_path)
+    os.replace(f"{header_path}.tmp", header_path)
+    if compact and os.path.exists(spool_path):
+        # النسخة المضغوطة تكفي: لا نترك نسخة غير مضغوطة بجانب ملف النتيجة
+        os.remove(spool_path)
+    return header
+
+
+def build_job_index(job_id: str, job_type: str, compact: bool = False):
+    """Index every section of a completed job; compact its spools when it will not be resumed"""
+    for section in JOB_SECTIONS.get(job_type, ()):
+        try:
+            header = build_result_index(job_id, section, compact)
+        except Exception as e:
+            log.error("خطأ في فهرسة النتائج", job_id=job_id, section=section, error=str(e))
+            continue
+
+        if header:
+            log.debug("تم فهرسة النتائج", job_id=job_id, section=section, items=header["items"])
+
+
+@lru_cache(maxsize=64)
+def _load_header(header_path: str, mtime_ns: int) -> Dict:
+    """Read an index header (cached until the file changes)"""
+    with open(header_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_result_page(job_id: str, section: str, offset: int, limit: int,
+                     field: Optional[str] = None, value: Optional[str] = None) -> Optional[Tuple[int, List[bytes]]]:
+    """
+    Read one page of a section as raw JSON lines
+
+    With field and value, only the items whose field equals value are counted
+    and returned. The index is built on first use for jobs completed before it
+    existed. Returns (matching items, lines), or None when there is no spool.
+    """
+    index_path, header_path = get_index_paths(job_id, section)
+    if not os.path.exists(header_path) and build_result_index(job_id, section) is None:
+        return None
+
+    header = _load_header(header_path, os.stat(header_path).st_mtime_ns)
+    if field:
+        start, total = header["fields"].get(field, {}).get(value, (0, 0))
+    else:
+        start, total = 0, header["items"]
+
+    count = max(0, min(limit, total - offset))
+    if not count:
+        return total, []
+
+    entries = array("Q")
+    with open(index_path, "rb") as f:
+        f.seek((start + offset) * ENTRY_SIZE)
+        entries.frombytes(f.read(count * ENTRY_SIZE))
+
+    if "blocks" in header:
+        return total, _read_compacted_lines(job_id, section, header["blocks"], entries, contiguous=not field)
+
+    with open(get_spool_path(job_id, section), "rb") as spool:
+        if not field:
+            # صفحة بدون فلتر: الأسطر متتالية في الملف، قراءة واحدة تكفي
+            first, end = entries[0], entries[-2] + entries[-1]
+            spool.seek(first)
+            return total, spool.read(end - first).splitlines()
+
+        lines = []
+        for i in range(0, len(entries), 2):
+            spool.seek(entries[i])
+            lines.append(spool.read(entries[i + 1]))
+        return total, lines
+
+
+def _read_compacted_lines(job_id: str, section: str, blocks: List[List[int]],
+                          entries: array, contiguous: bool) -> List[bytes]:
+    """Read the lines of a page from a compacted spool, decompressing each block it touches once"""
+    block_starts = [block[0] for block in blocks]
+    decompressed: Dict[int, bytes] = {}
+
+    with open(get_compressed_spool_path(job_id, section), "rb") as spool:
+        def read_block(number: int) -> bytes:
+            if number not in decompressed:
+                _, compressed_start, compressed_length = blocks[number]
+                spool.seek(compressed_start)
+                decompressed[number] = gzip.decompress(spool.read(compressed_length))
+            return decompressed[number]
+
+        if contiguous:
+            # صفحة بدون فلتر: الأسطر متتالية، تكفي الكتل التي تغطي المدى
+            first, end = entries[0], entries[-2] + entries[-1]
+            first_block = bisect_right(block_starts, first) - 1
+            last_block = bisect_right(block_starts, end - 1) - 1
+            data = b"".join(read_block(number) for number in range(first_block, last_block + 1))
+            skip = first - block_starts[first_block]
+            return data[skip:skip + end - first].splitlines()
+
+        lines = []
+        for i in range(0, len(entries), 2):
+            number = bisect_right(block_starts, entries[i]) - 1
+            start = entries[i] - block_starts[number]
+            lines.append(read_block(number)[start:start + entries[i + 1]])
+        return lines
@@ -0,0 +1,272 @@
+"""
+Streaming result writer for scraping jobs
+"""
+import asyncio
+import gzip
+import json
+import os
+import threading
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import aiofiles
+
+from app.config import settings
+from app.core.checkpoints import checkpoint_store
+from app.core.compression import get_file_encoding, get_result_path, open_result_file
+
+
+# Bytes of compacted spool decompressed per step while replaying it on the event loop
+SPOOL_REPLAY_CHUNK = 256 * 1024
+
+
+def get_spool_path(job_id: str, section: str) -> str:
+    """Get the NDJSON spool path for one section of a job result"""
+    return os.path.join(settings.RESULTS_DIR, f"{job_id}.{section}.ndjson")
+
+
+def get_compressed_spool_path(job_id: str, section: str) -> str:
+    """Get the gzip spool a finished section is compacted into (see result_index.build_result_index)"""
+    return f"{get_spool_path(job_id, section)}.gz"
+
+
+def has_spool(job_id: str, section: str) -> bool:
+    """Check whether a section has a spool, raw or compacted"""
+    return (os.path.exists(get_spool_path(job_id, section))
+            or os.path.exists(get_compressed_spool_path(job_id, section)))
+
+
+def iter_spool_items(job_id: str, section: str) -> Iterator[Dict]:
+    """Iterate over the items already written to a job spool (raw, or compacted once the job finished)"""
+    try:
+        f = open(get_spool_path(job_id, section), 'r', encoding='utf-8')
+    except FileNotFoundError:
+        try:
+            # The compacted spool holds complete lines only (concatenated gzip members)
+            f = gzip.open(get_compressed_spool_path(job_id, section), 'rt', encoding='utf-8')
+        except FileNotFoundError:
+            return
+
+    with f:
+        for line in f:
+            # A line without newline is a page still being written
+            if line.endswith('\n'):
+                yield json.loads(line)
+
+
+def iter_result_items(job_id: str, section: str, file_path: Optional[str] = None) -> Iterator[Dict]:
+    """Iterate over a section of a finished job: its spool, or the result document of a non-streamed job"""
+    if has_spool(job_id, section):
+        yield from iter_spool_items(job_id, section)
+        return
+
+    if file_path and os.path.exists(file_path):
+        with open_result_file(file_path) as f:
+            yield from json.load(f).get(section) or []
+
+
+async def follow_spool(job_id: str, section: str, is_finished: Callable[[], bool],
+                       poll_interval: float = 0.5) -> AsyncIterator[str]:
+    """
+    Yield NDJSON lines from a job spool, then follow the live tail
+
+    Lines already written are replayed first; after that new lines are yielded
+    as pages are appended, until is_finished() reports the job is done.
+    A finished job whose spool was compacted is replayed from the gzip spool.
+    """
+    spool_path = get_spool_path(job_id, section)
+    compressed_path = get_compressed_spool_path(job_id, section)
+
+    # Queued jobs have no spool yet
+    while True:
+        try:
+            f = await aiofiles.open(spool_path, 'r', encoding='utf-8')
+            break
+        except FileNotFoundError:
+            pass
+        # Spools are compacted before the job shows as completed, so check in this order
+        finished = is_finished()
+        if os.path.exists(compressed_path):
+            async for line in _replay_compressed_spool(compressed_path):
+                yield line
+            return
+        if finished:
+            return
+        await asyncio.sleep(poll_interval)
+
+    # An open spool stays readable when it is compacted and removed meanwhile
+    pending = ''
+    async with f:
+        while True:
+            # Check before reading so nothing written before completion is missed
+            finished = is_finished()
+            chunk = await f.readline()
+
+            if chunk:
+                pending += chunk
+                if pending.endswith('\n'):
+                    yield pending
+                    pending = ''
+                continue
+
+            if finished:
+                return
+
+            await asyncio.sleep(poll_interval)
+
+
+async def _replay_compressed_spool(compressed_path: str) -> AsyncIterator[str]:
+    """Yield the lines of a compacted spool, decompressing off the event loop"""
+    with gzip.open(compressed_path, 'rt', encoding='utf-8') as f:
+        while True:
+            lines = await asyncio.to_thread(f.readlines, SPOOL_REPLAY_CHUNK)
+            if not lines:
+                return
+            for line in lines:
+                yield line
+
+
+class ResultWriter:
+    """
+    Writes scraped items to disk page by page
+
+    Each section (e.g. 'reactions', 'comments') is appended to an NDJSON spool
+    as pages arrive, so memory stays flat and a crash keeps what was scraped.
+    finalize() then assembles the downloadable JSON document from the spools.
+
+    When a checkpoint dict is given, the pagination state passed with every
+    page is saved into it together with the spool offset. Resuming from such a
+    checkpoint truncates each spool back to the last checkpointed page.
+    """
+
+    def __init__(self, job_id: str, sections: Tuple[str, ...],
+                 on_write: Optional[Callable[[str, int, int], None]] = None,
+                 checkpoint: Optional[Dict] = None):
+        """Initialize writer and open the section spools"""
+        self.job_id = job_id
+        self.sections = sections
+        self.on_write = on_write
+        self.checkpoint = checkpoint
+        self.items_written: Dict[str, int] = {section: 0 for section in sections}
+        self.pages_written: Dict[str, int] = {section: 0 for section in sections}
+        self.lock = threading.Lock()
+
+        os.makedirs(settings.RESULTS_DIR, exist_ok=True)
+        if checkpoint is not None:
+            checkpoint.setdefault("sections", {})
+            self._restore_from_checkpoint()
+
+        self.spools = {
+            section: open(get_spool_path(job_id, section), 'ab')
+            for section in sections
+        }
+
+    def _restore_from_checkpoint(self):
+        """Drop pages written after the last checkpoint and restore the counters"""
+        for section in self.sections:
+            spool_path = get_spool_path(self.job_id, section)
+            state = self.checkpoint["sections"].get(section)
+
+            if not state:
+                # Nothing was checkpointed for this section: start it over
+                if os.path.exists(spool_path):
+                    os.remove(spool_path)
+                continue
+
+            if os.path.exists(spool_path):
+                with open(spool_path, 'r+b') as f:
+                    f.truncate(state["spool_bytes"])
+
+            self.items_written[section] = state["items_written"]
+            self.pages_written[section] = state["pages_written"]
+
+    def get_resume_state(self, section: Optional[str] = None) -> Optional[Dict]:
+        """Get the checkpointed pagination state of a section, if any"""
+        if not self.checkpoint:
+            return None
+
+        state = self.checkpoint["sections"].get(section or self.sections[0])
+        if not state:
+            return None
+
+        return {key: value for key, value in state.items()
+                if key not in ("items_written", "pages_written", "spool_bytes")}
+
+    def iter_written_items(self, section: Optional[str] = None) -> Iterator[Dict]:
+        """Iterate over the items already written to a section"""
+        return iter_spool_items(self.job_id, section or self.sections[0])
+
+    def write_items(self, items: Iterable[Dict], section: Optional[str] = None,
+                    state: Optional[Dict] = None):
+        """Append one page of items to a section spool, then checkpoint the pagination state"""
+        section = section or self.sections[0]
+        lines = [json.dumps(item, ensure_ascii=False) + '\n' for item in items]
+
+        with self.lock:
+            spool = self.spools[section]
+            spool.write(''.join(lines).encode('utf-8'))
+            spool.flush()
+
+            self.items_written[section] += len(lines)
+            self.pages_written[section] += 1
+            items_written = self.items_written[section]
+            pages_written = self.pages_written[section]
+
+            if state is not None and self.checkpoint is not None:
+                self.checkpoint["sections"][section] = {
+                    **state,
+                    "items_written": items_written,
+                    "pages_written": pages_written,
+                    "spool_bytes": spool.tell()
+                }
+                checkpoint_store.save(self.job_id, self.checkpoint)
+
+        if self.on_write:
+            self.on_write(section, items_written, pages_written)
+
+    def close(self):
+        """Close the spools without building the final document"""
+        with self.lock:
+            for spool in self.spools.values():
+                if not spool.closed:
+                    spool.close()
+
+    def finalize(self, metadata: Dict) -> str:
+        """
+        Build the final JSON document and return its path
+
+        Summary fields from metadata are written first, then every section is
+        streamed from its spool (and compressed on the way, see RESULT_COMPRESSION),
+        so the items are never loaded all at once.
+        """
+        self.close()
+
+        file_path = get_result_path(self.job_id)
+        temp_path = f"{file_path}.tmp"
+
+        with open_result_file(temp_path, 'w', get_file_encoding(file_path)) as f:
+            f.write('{\n')
+
+            fields: List[str] = []
+            for key, value in metadata.items():
+                if key in self.sections:
+                    continue
+                encoded = json.dumps(value, ensure_ascii=False, indent=2).replace('\n', '\n  ')
+                fields.append(f'  {json.dumps(key)}: {encoded}')
+            f.write(',\n'.join(fields))
+
+            for section in self.sections:
+                f.write(f',\n  {json.dumps(section)}: [')
+                first = True
+                with open(get_spool_path(self.job_id, section), 'r', encoding='utf-8') as spool:
+                    for line in spool:
+                        if not line.endswith('\n'):
+                            continue
+                        f.write('\n    ' if first else ',\n    ')
+                        f.write(line[:-1])
+                        first = False
+                f.write('\n  ]' if not first else ']')
+
+            f.write('\n}\n')
+
+        os.replace(temp_path, file_path)
+        return file_path
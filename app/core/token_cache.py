@@ -0,0 +1,125 @@
+"""
+Shared fb_dtsg/lsd token cache for all scraping jobs
+"""
+import hashlib
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Union
+
+from app.config import settings
+
+
+# Facebook error codes returned by /api/graphql/ when fb_dtsg/lsd are no longer accepted
+STALE_TOKEN_ERROR_CODES = ("1357001", "1357004")
+
+_STALE_TOKEN_PATTERN = re.compile(r'"error"\s*:\s*(%s)\b' % "|".join(STALE_TOKEN_ERROR_CODES))
+
+
+def is_stale_token_response(body: Union[str, bytes]) -> bool:
+    """Check whether a GraphQL response body (text or raw bytes) reports stale tokens"""
+    if not body:
+        return False
+    # The error object is always at the start of the body, no need to scan (or decode) the whole page
+    head = body[:512]
+    if isinstance(head, bytes):
+        head = head.decode('utf-8', errors='ignore')
+    return bool(_STALE_TOKEN_PATTERN.search(head))
+
+
+class TokenCache:
+    """Process-wide token cache keyed by account (c_user + hash of xs)"""
+
+    def __init__(self, ttl_seconds: int):
+        """Initialize token cache"""
+        self.ttl_seconds = ttl_seconds
+        self.entries: Dict[str, Dict] = {}
+        # account -> [lock, callers using it]; dropped when its last caller is done
+        self.refresh_locks: Dict[str, List] = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def make_account_key(user_id: str, xs: Optional[str]) -> str:
+        """Build the cache key for an account"""
+        xs_hash = hashlib.sha256((xs or "").encode("utf-8")).hexdigest()[:16]
+        return f"{user_id}:{xs_hash}"
+
+    def get(self, account_key: str) -> Optional[Dict]:
+        """Get cached tokens if they are still fresh"""
+        with self.lock:
+            entry = self.entries.get(account_key)
+            if not entry:
+                return None
+
+            if entry["expires_at"] <= time.time():
+                del self.entries[account_key]
+                return None
+
+            return dict(entry["tokens"])
+
+    def put(self, account_key: str, tokens: Dict):
+        """Store tokens for an account (and drop the expired tokens of other accounts)"""
+        with self.lock:
+            now = time.time()
+            for expired_key in [key for key, entry in self.entries.items() if entry["expires_at"] <= now]:
+                del self.entries[expired_key]
+
+            self.entries[account_key] = {
+                "tokens": dict(tokens),
+                "expires_at": time.time() + self.ttl_seconds
+            }
+
+    def get_or_fetch(self, account_key: str, fetch_tokens: Callable[[], Optional[Dict]]) -> Optional[Dict]:
+        """
+        Get tokens from cache, or fetch them once for all concurrent callers
+
+        Only one caller per account runs fetch_tokens; the others wait and
+        reuse its result instead of downloading the homepage again.
+        """
+        tokens = self.get(account_key)
+        if tokens:
+            return tokens
+
+        with self.lock:
+            refresh = self.refresh_locks.setdefault(account_key, [threading.Lock(), 0])
+            refresh[1] += 1
+
+        try:
+            with refresh[0]:
+                # Another job may have refreshed the tokens while we were waiting
+                tokens = self.get(account_key)
+                if tokens:
+                    return tokens
+
+                tokens = fetch_tokens()
+                if not tokens or not tokens.get("fb_dtsg"):
+                    return None
+
+                self.put(account_key, tokens)
+                return dict(tokens)
+        finally:
+            with self.lock:
+                refresh[1] -= 1
+                if not refresh[1]:
+                    del self.refresh_locks[account_key]
+
+    def invalidate(self, account_key: str, stale_fb_dtsg: Optional[str] = None):
+        """
+        Drop cached tokens for an account
+
+        When stale_fb_dtsg is given, the entry is only dropped if it still holds
+        that token, so a job reporting an old token does not discard a fresh one.
+        """
+        with self.lock:
+            entry = self.entries.get(account_key)
+            if not entry:
+                return
+
+            if stale_fb_dtsg and entry["tokens"].get("fb_dtsg") != stale_fb_dtsg:
+                return
+
+            del self.entries[account_key]
+
+
+# Global token cache instance
+token_cache = TokenCache(ttl_seconds=settings.TOKEN_CACHE_TTL_MINUTES * 60)
@@ -0,0 +1,151 @@
+"""
+Pooled HTTP transport shared by all scraping jobs of the same account
+"""
+import asyncio
+import importlib.util
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.config import settings
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package (pip install httpx[http2])"""
+    return importlib.util.find_spec("h2") is not None
+
+
+class AccountTransport:
+    """Keep-alive connections of one account: a requests session and an httpx client"""
+
+    def __init__(self, session: requests.Session):
+        """Initialize account transport"""
+        self.session = session
+        self.async_client: Optional[httpx.AsyncClient] = None
+        self.async_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.async_users = 0
+        self.last_used = time.time()
+
+        # Thread jobs keep the session for their whole run: every response counts as use
+        session.hooks["response"].append(self.touch)
+
+    def touch(self, *args, **kwargs):
+        """Mark the transport as used (also the response hook of the session)"""
+        self.last_used = time.time()
+
+
+class TransportPool:
+    """
+    Process-wide connection pools keyed by account (same key as the token cache)
+
+    Every job of an account reuses the same TCP/TLS connections instead of
+    opening new ones per job; cookies stay isolated because accounts never
+    share a session. Pools idle for longer than idle_seconds (no session handed
+    out, no response received and no async lease) are closed.
+    """
+
+    def __init__(self, pool_size: int, idle_seconds: int, http2: bool):
+        """Initialize transport pool"""
+        self.pool_size = pool_size
+        self.idle_seconds = idle_seconds
+        self.http2 = http2 and http2_available()
+        self.entries: Dict[str, AccountTransport] = {}
+        self.lock = threading.Lock()
+
+    def new_session(self) -> requests.Session:
+        """Create a requests session whose adapter keeps up to pool_size connections per host"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def new_async_client(self) -> httpx.AsyncClient:
+        """Create an httpx client (HTTP/2 when h2 is installed) with the same pool size"""
+        limits = httpx.Limits(
+            max_connections=self.pool_size,
+            max_keepalive_connections=self.pool_size,
+            keepalive_expiry=self.idle_seconds
+        )
+        return httpx.AsyncClient(http2=self.http2, limits=limits, timeout=30, follow_redirects=True)
+
+    def _get_entry_locked(self, account_key: str, session: Optional[requests.Session] = None) -> AccountTransport:
+        """Get (or create) the transport of an account and mark it as used"""
+        self._evict_idle_locked()
+
+        entry = self.entries.get(account_key)
+        if entry is None:
+            entry = self.entries[account_key] = AccountTransport(session or self.new_session())
+
+        entry.touch()
+        return entry
+
+    def _evict_idle_locked(self):
+        """Close the pools of accounts that have not been used for idle_seconds"""
+        cutoff = time.time() - self.idle_seconds
+        for account_key, entry in list(self.entries.items()):
+            if entry.last_used > cutoff or entry.async_users:
+                continue
+
+            del self.entries[account_key]
+            # requests يعيد فتح الاتصالات إذا كانت مهمة ما زالت تستخدم الـ session
+            entry.session.close()
+            if entry.async_client and entry.async_loop and not entry.async_loop.is_closed():
+                asyncio.run_coroutine_threadsafe(entry.async_client.aclose(), entry.async_loop)
+
+    def get_session(self, account_key: str, cookies) -> requests.Session:
+        """Get the long-lived session of an account, updated with the job cookies"""
+        with self.lock:
+            entry = self._get_entry_locked(account_key)
+
+        entry.session.cookies.update(cookies)
+        return entry.session
+
+    @asynccontextmanager
+    async def async_client(self, account_key: str, session: requests.Session) -> AsyncIterator[httpx.AsyncClient]:
+        """
+        Lease the httpx client of an account for the duration of a job
+
+        The client belongs to the running event loop (the async engine loop) and
+        is not closed when the lease ends; a leased client is never evicted.
+        """
+        with self.lock:
+            entry = self._get_entry_locked(account_key, session)
+            if entry.async_client is None or entry.async_client.is_closed:
+                entry.async_client = self.new_async_client()
+                entry.async_loop = asyncio.get_running_loop()
+            entry.async_users += 1
+            client = entry.async_client
+
+        for cookie in session.cookies:
+            client.cookies.set(cookie.name, cookie.value, domain=cookie.domain)
+
+        try:
+            yield client
+        finally:
+            with self.lock:
+                entry.async_users -= 1
+                entry.touch()
+
+    def get_stats(self) -> Dict:
+        """Get pool statistics"""
+        with self.lock:
+            return {
+                "accounts": len(self.entries),
+                "async_clients": sum(1 for entry in self.entries.values() if entry.async_client),
+                "pool_size": self.pool_size,
+                "http2": self.http2
+            }
+
+
+# Global transport pool instance
+transport_pool = TransportPool(
+    pool_size=settings.HTTP_POOL_SIZE,
+    idle_seconds=settings.HTTP_POOL_IDLE_MINUTES * 60,
+    http2=settings.HTTP2_ENABLED
+)
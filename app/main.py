@@ -2,16 +2,25 @@
 Facebook Scraper API - Main Application
 Threading-based FastAPI application for Facebook reactions and comments scraping
 """
+import asyncio
+import os
 import time
 from datetime import datetime, timedelta
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
 
 from app.config import settings
 from app.api.reactions import router as reactions_router
 from app.api.comments import router as comments_router
-from app.core.job_manager import job_manager
+from app.api.posts import router as posts_router
+from app.api.authors import router as authors_router
+from app.core.job_manager import JobStatus, job_manager
+from app.core.metrics import (HTTP_POOL_ACCOUNTS, JOBS_ACTIVE, JOBS_BY_STATUS, JOBS_QUEUED,
+                              render_metrics)
+from app.core.profiler import PROFILE_SORT_KEYS, get_profile_paths, render_profile
+from app.core.transport import transport_pool
+from app.scrapers.parse_pool import parse_pool
 from app.models.responses import HealthResponse, JobsSummaryResponse
 
 # Application start time for uptime calculation
@@ -38,6 +47,8 @@ app.add_middleware(
 # Include API routers
 app.include_router(reactions_router, prefix=settings.API_PREFIX)
 app.include_router(comments_router, prefix=settings.API_PREFIX)
+app.include_router(posts_router, prefix=settings.API_PREFIX)
+app.include_router(authors_router, prefix=settings.API_PREFIX)
 
 
 @app.get("/", response_class=JSONResponse)
@@ -50,23 +61,46 @@ async def root():
         "endpoints": {
             "reactions": {
                 "scrape": f"{settings.API_PREFIX}/reactions/scrape",
+                "batch": f"{settings.API_PREFIX}/reactions/batch",
                 "status": f"{settings.API_PREFIX}/reactions/status/{{job_id}}",
+                "stream": f"{settings.API_PREFIX}/reactions/stream/{{job_id}}",
+                "resume": f"{settings.API_PREFIX}/reactions/resume/{{job_id}}",
+                "results": f"{settings.API_PREFIX}/reactions/results/{{job_id}}",
                 "download": f"{settings.API_PREFIX}/reactions/download/{{job_id}}"
             },
             "comments": {
                 "scrape": f"{settings.API_PREFIX}/comments/scrape",
+                "batch": f"{settings.API_PREFIX}/comments/batch",
                 "status": f"{settings.API_PREFIX}/comments/status/{{job_id}}",
+                "stream": f"{settings.API_PREFIX}/comments/stream/{{job_id}}",
+                "resume": f"{settings.API_PREFIX}/comments/resume/{{job_id}}",
+                "results": f"{settings.API_PREFIX}/comments/results/{{job_id}}",
                 "download": f"{settings.API_PREFIX}/comments/download/{{job_id}}"
             },
+            "posts": {
+                "scrape": f"{settings.API_PREFIX}/posts/scrape",
+                "status": f"{settings.API_PREFIX}/posts/status/{{job_id}}",
+                "stream": f"{settings.API_PREFIX}/posts/stream/{{job_id}}/{{section}}",
+                "download": f"{settings.API_PREFIX}/posts/download/{{job_id}}"
+            },
+            "authors": {
+                "activity": f"{settings.API_PREFIX}/authors/{{author_id}}/activity"
+            },
             "system": {
                 "health": "/health",
                 "jobs": "/jobs",
+                "job_profile": "/jobs/{job_id}/profile",
+                "metrics": "/metrics",
                 "docs": "/docs"
             }
         },
         "features": [
             "Concurrent job processing",
             "Real-time progress tracking",
+            "Live NDJSON result streaming",
+            "Checkpointed, resumable pagination",
+            "Batch jobs sharing one session per account",
+            "Combined reactions and comments jobs",
             "Automatic file cleanup",
             "Comprehensive error handling",
             "Arabic language support"
@@ -104,6 +138,7 @@ async def health_check():
             status="healthy",
             active_jobs=active_jobs,
             available_slots=summary["available_slots"],
+            queued_jobs=summary["queued_jobs"],
             system_load=system_load,
             uptime=uptime
         )
@@ -128,6 +163,8 @@ async def jobs_summary():
             total_jobs=summary["total_jobs"],
             active_jobs=summary["active_jobs"],
             available_slots=summary["available_slots"],
+            queued_jobs=summary["queued_jobs"],
+            max_queued_jobs=summary["max_queued_jobs"],
             jobs_by_status=summary["jobs_by_status"]
         )
         
@@ -141,6 +178,64 @@ async def jobs_summary():
         )
 
 
+@app.get("/jobs/{job_id}/profile", response_class=PlainTextResponse)
+async def job_profile(job_id: str, format: str = Query("text", pattern="^(text|pstats)$"),
+                      sort: str = Query("cumulative", pattern=f"^({'|'.join(PROFILE_SORT_KEYS)})$"),
+                      limit: int = Query(50, ge=1, le=1000)):
+    """
+    Get the profile of a job submitted with "profile": true
+    
+    The time per phase and the top functions are also in the job status.
+    
+    - **format**: 'text' (pstats table, plus the memory report when recorded) or 'pstats' (dump for pstats/snakeviz)
+    - **sort**: 'cumulative', 'tottime', 'calls' or 'ncalls'
+    - **limit**: Number of functions listed (1-1000)
+    """
+    if not job_manager.get_job_status(job_id):
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error": "job_not_found",
+                "message": "المهمة غير موجودة أو منتهية الصلاحية",
+                "job_id": job_id
+            }
+        )
+    
+    stats_path, _ = get_profile_paths(job_id)
+    if not os.path.exists(stats_path):
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error": "profile_not_found",
+                "message": "لا يوجد تحليل لهذه المهمة (أرسل \"profile\": true وانتظر انتهاءها)",
+                "job_id": job_id
+            }
+        )
+    
+    if format == "pstats":
+        return FileResponse(stats_path, media_type="application/octet-stream", filename=f"{job_id}.prof")
+    
+    return PlainTextResponse(await asyncio.to_thread(render_profile, job_id, sort, limit))
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Metrics in the Prometheus text format
+    
+    GraphQL latency and bytes by query, pages scraped, parse and token
+    extraction time, job durations by status, and current queue depth.
+    """
+    summary = job_manager.get_all_jobs_summary()
+    JOBS_ACTIVE.set(summary["active_jobs"])
+    JOBS_QUEUED.set(summary["queued_jobs"])
+    for status in JobStatus:
+        JOBS_BY_STATUS.labels(status.value).set(summary["jobs_by_status"].get(status.value, 0))
+    HTTP_POOL_ACCOUNTS.set(transport_pool.get_stats()["accounts"])
+    
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 @app.exception_handler(404)
 async def not_found_handler(request, exc):
     """Custom 404 handler"""
@@ -181,9 +276,11 @@ async def startup_event():
     print("🚀 Facebook Scraper API - Starting Up")
     print("=" * 80)
     print(f"📊 Max concurrent jobs: {settings.MAX_CONCURRENT_JOBS}")
+    print(f"📥 Max queued jobs: {settings.MAX_QUEUED_JOBS}")
     print(f"📁 Results directory: {settings.RESULTS_DIR}")
     print(f"🕐 File cleanup after: {settings.CLEANUP_AFTER_HOURS} hours")
     print(f"🌐 API prefix: {settings.API_PREFIX}")
+    print(f"🧮 Parse workers: {settings.PARSE_WORKERS or 'inline'}")
     print("=" * 80)
     print("✅ Application started successfully!")
     print(f"📖 Documentation: http://localhost:{settings.PORT}/docs")
@@ -208,6 +305,9 @@ async def shutdown_event():
     except:
         pass
     
+    # إيقاف عمليات التحليل
+    parse_pool.shutdown()
+    
     print("✅ Application shutdown complete!")
     print("=" * 80)
 
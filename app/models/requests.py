@@ -5,6 +5,8 @@ from typing import List, Dict, Optional, Any
 from pydantic import BaseModel, Field, validator
 import re
 
+from app.config import settings
+
 
 class FacebookCookie(BaseModel):
     """Facebook cookie model"""
@@ -21,58 +23,101 @@ class FacebookCookie(BaseModel):
     storeId: str = "0"
 
 
+def validate_facebook_post_url(v):
+    """Validate Facebook post URL"""
+    if not v or not isinstance(v, str):
+        raise ValueError("post_url is required")
+    
+    v = v.strip()
+    
+    # Check if it's a Facebook URL
+    if not ('facebook.com' in v or 'fb.com' in v):
+        raise ValueError("Must be a Facebook URL")
+    
+    # Check for common Facebook post patterns
+    valid_patterns = [
+        r'/posts/',
+        r'permalink\.php',
+        r'/story\.php',
+        r'fbid='
+    ]
+    
+    if not any(re.search(pattern, v) for pattern in valid_patterns):
+        raise ValueError("Invalid Facebook post URL format")
+    
+    return v
+
+
+def validate_facebook_cookies(v):
+    """Validate cookies array"""
+    if not v or not isinstance(v, list):
+        raise ValueError("cookies array is required")
+    
+    # Check for required cookies
+    required_cookies = {'c_user', 'xs'}
+    cookie_names = {cookie.name for cookie in v}
+    
+    missing_cookies = required_cookies - cookie_names
+    if missing_cookies:
+        raise ValueError(f"Missing required cookies: {missing_cookies}")
+    
+    # Validate Facebook domain
+    facebook_cookies = [cookie for cookie in v if cookie.domain == '.facebook.com']
+    if len(facebook_cookies) < 2:
+        raise ValueError("Not enough valid Facebook cookies")
+    
+    return v
+
+
+def validate_facebook_post_urls(v):
+    """Validate the post URLs of a batch (duplicates are dropped, order is kept)"""
+    if not v or not isinstance(v, list):
+        raise ValueError("post_urls must be a non-empty list")
+    
+    post_urls = list(dict.fromkeys(validate_facebook_post_url(url) for url in v))
+    if len(post_urls) > settings.BATCH_MAX_POSTS:
+        raise ValueError(f"A batch may contain at most {settings.BATCH_MAX_POSTS} posts")
+    
+    return post_urls
+
+
+def validate_engine_name(v):
+    """Validate scraping engine name"""
+    if v is not None and v not in ('thread', 'async'):
+        raise ValueError("engine must be 'thread' or 'async'")
+    
+    return v
+
+
 class ReactionsRequest(BaseModel):
     """Request model for reactions scraping"""
     post_url: str = Field(..., description="Facebook post URL")
     limit: int = Field(default=0, ge=0, le=10000, description="Number of reactions to scrape (0 = all)")
     delay: float = Field(default=2.0, ge=1.0, le=10.0, description="Delay between requests in seconds")
+    priority: int = Field(default=0, ge=0, le=10, description="Job priority in the queue (higher runs first)")
+    engine: Optional[str] = Field(default=None, description="Scraping engine: 'thread' or 'async' (default from settings)")
+    debug: bool = Field(default=False, description="Enable debug logging for this job only")
+    profile: bool = Field(default=False, description="Profile this job with cProfile (runs on the thread engine, see /jobs/{job_id}/profile)")
+    profile_memory: bool = Field(default=False, description="Also record memory allocations with tracemalloc (implies profile)")
+    incremental: bool = Field(default=False, description="Only scrape what changed since the latest completed job of this post")
+    since_job_id: Optional[str] = Field(default=None, description="Completed job to scrape incrementally from (implies incremental)")
+    max_age_seconds: Optional[int] = Field(default=None, ge=0, description="Reuse a completed job of the same post and parameters finished within this many seconds")
     cookies: List[FacebookCookie] = Field(..., description="Facebook cookies array")
     
     @validator('post_url')
     def validate_post_url(cls, v):
         """Validate Facebook post URL"""
-        if not v or not isinstance(v, str):
-            raise ValueError("post_url is required")
-        
-        v = v.strip()
-        
-        # Check if it's a Facebook URL
-        if not ('facebook.com' in v or 'fb.com' in v):
-            raise ValueError("Must be a Facebook URL")
-        
-        # Check for common Facebook post patterns
-        valid_patterns = [
-            r'/posts/',
-            r'permalink\.php',
-            r'/story\.php',
-            r'fbid='
-        ]
-        
-        if not any(re.search(pattern, v) for pattern in valid_patterns):
-            raise ValueError("Invalid Facebook post URL format")
-        
-        return v
+        return validate_facebook_post_url(v)
+    
+    @validator('engine')
+    def validate_engine(cls, v):
+        """Validate scraping engine name"""
+        return validate_engine_name(v)
     
     @validator('cookies')
     def validate_cookies(cls, v):
         """Validate cookies array"""
-        if not v or not isinstance(v, list):
-            raise ValueError("cookies array is required")
-        
-        # Check for required cookies
-        required_cookies = {'c_user', 'xs'}
-        cookie_names = {cookie.name for cookie in v}
-        
-        missing_cookies = required_cookies - cookie_names
-        if missing_cookies:
-            raise ValueError(f"Missing required cookies: {missing_cookies}")
-        
-        # Validate Facebook domain
-        facebook_cookies = [cookie for cookie in v if cookie.domain == '.facebook.com']
-        if len(facebook_cookies) < 2:
-            raise ValueError("Not enough valid Facebook cookies")
-        
-        return v
+        return validate_facebook_cookies(v)
 
 
 class CommentsRequest(BaseModel):
@@ -80,52 +125,132 @@ class CommentsRequest(BaseModel):
     post_url: str = Field(..., description="Facebook post URL")
     max_pages: Optional[int] = Field(default=None, ge=1, le=100, description="Maximum pages to scrape")
     delay: int = Field(default=10, ge=5, le=60, description="Delay between requests in seconds")
+    priority: int = Field(default=0, ge=0, le=10, description="Job priority in the queue (higher runs first)")
+    engine: Optional[str] = Field(default=None, description="Scraping engine: 'thread' or 'async' (default from settings)")
+    debug: bool = Field(default=False, description="Enable debug logging for this job only")
+    profile: bool = Field(default=False, description="Profile this job with cProfile (runs on the thread engine, see /jobs/{job_id}/profile)")
+    profile_memory: bool = Field(default=False, description="Also record memory allocations with tracemalloc (implies profile)")
+    incremental: bool = Field(default=False, description="Only scrape what changed since the latest completed job of this post")
+    since_job_id: Optional[str] = Field(default=None, description="Completed job to scrape incrementally from (implies incremental)")
+    max_age_seconds: Optional[int] = Field(default=None, ge=0, description="Reuse a completed job of the same post and parameters finished within this many seconds")
+    cookies: List[FacebookCookie] = Field(..., description="Facebook cookies array")
+    
+    @validator('post_url')
+    def validate_post_url(cls, v):
+        """Validate Facebook post URL"""
+        return validate_facebook_post_url(v)
+    
+    @validator('engine')
+    def validate_engine(cls, v):
+        """Validate scraping engine name"""
+        return validate_engine_name(v)
+    
+    @validator('cookies')
+    def validate_cookies(cls, v):
+        """Validate cookies array"""
+        return validate_facebook_cookies(v)
+
+
+class PostRequest(BaseModel):
+    """Request model for scraping the reactions and comments of a post in one job"""
+    post_url: str = Field(..., description="Facebook post URL")
+    limit: int = Field(default=0, ge=0, le=10000, description="Number of reactions to scrape (0 = all)")
+    max_pages: Optional[int] = Field(default=None, ge=1, le=100, description="Maximum comment pages to scrape")
+    reactions_delay: float = Field(default=2.0, ge=1.0, le=10.0, description="Delay between reactions requests in seconds")
+    comments_delay: int = Field(default=10, ge=5, le=60, description="Delay between comments requests in seconds")
+    priority: int = Field(default=0, ge=0, le=10, description="Job priority in the queue (higher runs first)")
+    engine: Optional[str] = Field(default=None, description="Scraping engine: 'thread' or 'async' (default from settings)")
+    debug: bool = Field(default=False, description="Enable debug logging for this job only")
+    profile: bool = Field(default=False, description="Profile this job with cProfile (runs on the thread engine, see /jobs/{job_id}/profile)")
+    profile_memory: bool = Field(default=False, description="Also record memory allocations with tracemalloc (implies profile)")
+    max_age_seconds: Optional[int] = Field(default=None, ge=0, description="Reuse a completed job of the same post and parameters finished within this many seconds")
     cookies: List[FacebookCookie] = Field(..., description="Facebook cookies array")
     
     @validator('post_url')
     def validate_post_url(cls, v):
         """Validate Facebook post URL"""
-        if not v or not isinstance(v, str):
-            raise ValueError("post_url is required")
-        
-        v = v.strip()
-        
-        # Check if it's a Facebook URL
-        if not ('facebook.com' in v or 'fb.com' in v):
-            raise ValueError("Must be a Facebook URL")
-        
-        # Check for common Facebook post patterns
-        valid_patterns = [
-            r'/posts/',
-            r'permalink\.php',
-            r'/story\.php',
-            r'fbid='
-        ]
-        
-        if not any(re.search(pattern, v) for pattern in valid_patterns):
-            raise ValueError("Invalid Facebook post URL format")
-        
-        return v
+        return validate_facebook_post_url(v)
+    
+    @validator('engine')
+    def validate_engine(cls, v):
+        """Validate scraping engine name"""
+        return validate_engine_name(v)
+    
+    @validator('cookies')
+    def validate_cookies(cls, v):
+        """Validate cookies array"""
+        return validate_facebook_cookies(v)
+
+
+class BatchReactionsRequest(BaseModel):
+    """Request model for scraping the reactions of many posts with one account"""
+    post_urls: List[str] = Field(..., description="Facebook post URLs")
+    limit: int = Field(default=0, ge=0, le=10000, description="Number of reactions to scrape per post (0 = all)")
+    delay: float = Field(default=2.0, ge=1.0, le=10.0, description="Delay between requests in seconds")
+    priority: int = Field(default=0, ge=0, le=10, description="Job priority in the queue (higher runs first)")
+    engine: Optional[str] = Field(default=None, description="Scraping engine: 'thread' or 'async' (default from settings)")
+    debug: bool = Field(default=False, description="Enable debug logging for this job only")
+    cookies: List[FacebookCookie] = Field(..., description="Facebook cookies array")
+    
+    @validator('post_urls')
+    def validate_post_urls(cls, v):
+        """Validate post URLs"""
+        return validate_facebook_post_urls(v)
+    
+    @validator('engine')
+    def validate_engine(cls, v):
+        """Validate scraping engine name"""
+        return validate_engine_name(v)
+    
+    @validator('cookies')
+    def validate_cookies(cls, v):
+        """Validate cookies array"""
+        return validate_facebook_cookies(v)
+
+
+class BatchCommentsRequest(BaseModel):
+    """Request model for scraping the comments of many posts with one account"""
+    post_urls: List[str] = Field(..., description="Facebook post URLs")
+    max_pages: Optional[int] = Field(default=None, ge=1, le=100, description="Maximum pages to scrape per post")
+    delay: int = Field(default=10, ge=5, le=60, description="Delay between requests in seconds")
+    priority: int = Field(default=0, ge=0, le=10, description="Job priority in the queue (higher runs first)")
+    engine: Optional[str] = Field(default=None, description="Scraping engine: 'thread' or 'async' (default from settings)")
+    debug: bool = Field(default=False, description="Enable debug logging for this job only")
+    cookies: List[FacebookCookie] = Field(..., description="Facebook cookies array")
+    
+    @validator('post_urls')
+    def validate_post_urls(cls, v):
+        """Validate post URLs"""
+        return validate_facebook_post_urls(v)
+    
+    @validator('engine')
+    def validate_engine(cls, v):
+        """Validate scraping engine name"""
+        return validate_engine_name(v)
     
     @validator('cookies')
     def validate_cookies(cls, v):
         """Validate cookies array"""
-        if not v or not isinstance(v, list):
-            raise ValueError("cookies array is required")
-        
-        # Check for required cookies
-        required_cookies = {'c_user', 'xs'}
-        cookie_names = {cookie.name for cookie in v}
-        
-        missing_cookies = required_cookies - cookie_names
-        if missing_cookies:
-            raise ValueError(f"Missing required cookies: {missing_cookies}")
-        
-        # Validate Facebook domain
-        facebook_cookies = [cookie for cookie in v if cookie.domain == '.facebook.com']
-        if len(facebook_cookies) < 2:
-            raise ValueError("Not enough valid Facebook cookies")
-        
-        return v
+        return validate_facebook_cookies(v)
+
 
+class ResumeRequest(BaseModel):
+    """Request model for resuming a job from its checkpoint"""
+    # Checked against the limits of the resumed job's type when its request is rebuilt
+    delay: Optional[float] = Field(default=None, description="Override the delay between requests "
+                                   "(limits of the job type; default: the job's original delay)")
+    priority: int = Field(default=0, ge=0, le=10, description="Job priority in the queue (higher runs first)")
+    engine: Optional[str] = Field(default=None, description="Scraping engine: 'thread' or 'async' (default from settings)")
+    debug: bool = Field(default=False, description="Enable debug logging for this job only")
+    cookies: List[FacebookCookie] = Field(..., description="Facebook cookies array")
+    
+    @validator('engine')
+    def validate_engine(cls, v):
+        """Validate scraping engine name"""
+        return validate_engine_name(v)
+    
+    @validator('cookies')
+    def validate_cookies(cls, v):
+        """Validate cookies array"""
+        return validate_facebook_cookies(v)
 
@@ -13,6 +13,9 @@ class JobResponse(BaseModel):
     message: str
     estimated_time: Optional[str] = None
     created_at: str
+    queue_position: Optional[int] = None
+    child_job_ids: Optional[List[str]] = None
+    cached: Optional[bool] = None
 
 
 class ProgressInfo(BaseModel):
@@ -33,6 +36,8 @@ class ResultInfo(BaseModel):
     pages_scraped: Optional[int] = None
     reaction_stats: Optional[Dict[str, int]] = None
     unique_authors: Optional[int] = None
+    resumable: Optional[bool] = None
+    interruption_reason: Optional[str] = None
 
 
 class JobStatusResponse(BaseModel):
@@ -41,9 +46,64 @@ class JobStatusResponse(BaseModel):
     status: str
     progress: Optional[ProgressInfo] = None
     result: Optional[ResultInfo] = None
+    queue_position: Optional[int] = None
     started_at: Optional[str] = None
     completed_at: Optional[str] = None
     error_message: Optional[str] = None
+    profile: Optional[Dict[str, Any]] = None
+
+
+class BatchPostStatus(BaseModel):
+    """Status of one post of a batch job"""
+    job_id: str
+    post_url: Optional[str] = None
+    status: str
+    total_items: Optional[int] = None
+    error_message: Optional[str] = None
+
+
+class BatchStatusResponse(BaseModel):
+    """Response model for batch job status"""
+    job_id: str
+    status: str
+    progress: Optional[ProgressInfo] = None
+    queue_position: Optional[int] = None
+    started_at: Optional[str] = None
+    completed_at: Optional[str] = None
+    error_message: Optional[str] = None
+    total_posts: int
+    completed_posts: int
+    failed_posts: int
+    posts: List[BatchPostStatus]
+
+
+class ResultsPageResponse(BaseModel):
+    """Response model for one page of a completed job's results"""
+    job_id: str
+    total: int
+    offset: int
+    limit: int
+    items: List[Dict[str, Any]]
+
+
+class AuthorActivityItem(BaseModel):
+    """One reaction or comment of an author"""
+    job_id: str
+    post_id: str
+    completed_at: str
+    section: str
+    item_offset: int
+    reaction_type: Optional[str] = None
+    comment_id: Optional[str] = None
+
+
+class AuthorActivityResponse(BaseModel):
+    """Response model for the activity of an author across jobs"""
+    author_id: str
+    total: int
+    offset: int
+    limit: int
+    items: List[AuthorActivityItem]
 
 
 class ErrorResponse(BaseModel):
@@ -59,6 +119,7 @@ class HealthResponse(BaseModel):
     status: str
     active_jobs: int
     available_slots: int
+    queued_jobs: int = 0
     system_load: str
     uptime: str
 
@@ -68,6 +129,8 @@ class JobsSummaryResponse(BaseModel):
     total_jobs: int
     active_jobs: int
     available_slots: int
+    queued_jobs: int = 0
+    max_queued_jobs: Optional[int] = None
     jobs_by_status: Dict[str, int]
 
 
@@ -0,0 +1,393 @@
+"""
+Facebook Scrapers - Async Engine
+asyncio versions of the reactions/comments pagination loops.
+
+Request building and response parsing are inherited from the thread engine
+scrapers; only the network calls and the delays are replaced by httpx and
+asyncio.sleep, so hundreds of mostly idle jobs can share one event loop.
+"""
+
+import asyncio
+import time
+from contextlib import nullcontext
+from typing import Optional, Dict, List, Any, AsyncIterator
+
+import httpx
+
+from app.config import settings
+from app.core.token_cache import is_stale_token_response
+from app.core.checkpoints import new_pagination_state
+from app.core.rate_limiter import rate_limiter
+from app.core.transport import transport_pool
+from app.scrapers.page_sizer import PageSizer
+from app.scrapers.parse_pool import parse_pool
+from app.scrapers.parsing import parse_comments_body, parse_reactions_body
+from app.core.log import get_logger
+from app.core.metrics import PAGES_SCRAPED, record_graphql_request
+from app.scrapers.reactions_scraper import FacebookReactionsScraper
+from app.scrapers.comments_scraper import FacebookCommentsScraper
+from app.scrapers.post_scraper import FacebookPostScraper, merge_post_results
+
+
+log = get_logger("async_scrapers")
+
+
+class AsyncFacebookReactionsScraper(FacebookReactionsScraper):
+    """سحب التفاعلات باستخدام asyncio - نسخة المحرك غير المتزامن"""
+
+    async def iter_reaction_pages_async(self, client: httpx.AsyncClient, feedback_id: str,
+                                        limit: int = 0, delay: float = 2.0,
+                                        state: Optional[Dict] = None,
+                                        page_sizer: Optional[PageSizer] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+        """جلب التفاعلات صفحة بصفحة بدون حجز thread"""
+        if state is None:
+            state = new_pagination_state()
+        if page_sizer is None:
+            page_sizer = PageSizer(state.get("page_size"))
+
+        try:
+            fetched_count = state["items"]
+            cursor = state["cursor"]
+            page_count = state["page_count"]
+            tokens_refreshed = False
+
+            while True:
+                page_count += 1
+
+                # تحديد عدد التفاعلات لهذا الطلب (حجم متكيف)
+                count_per_request = page_sizer.next_size(limit - fetched_count if limit > 0 else None)
+
+                payload, headers = self.build_reactions_request(feedback_id, cursor, count_per_request, page_count)
+
+                await rate_limiter.acquire_async(self.user_id)
+                started_at = time.monotonic()
+                response = await client.post(
+                    f'{settings.FACEBOOK_BASE_URL}/api/graphql/',
+                    data=payload,
+                    headers=headers
+                )
+                elapsed = time.monotonic() - started_at
+                record_graphql_request("reactions", response.status_code, elapsed, len(response.content))
+
+                if response.status_code != 200:
+                    log.warning("فشل طلب GraphQL", page=page_count, status=response.status_code,
+                                latency_ms=round(elapsed * 1000, 1))
+                    # إعادة نفس الصفحة بحجم أصغر قبل الاستسلام
+                    if page_sizer.record_failure(page_count, count_per_request, elapsed, f"http_{response.status_code}"):
+                        page_count -= 1
+                        await asyncio.sleep(delay)
+                        continue
+                    state["interrupted"] = f"http_{response.status_code}"
+                    break
+
+                # التوكنز منتهية الصلاحية: تحديثها مرة واحدة وإعادة نفس الصفحة
+                if is_stale_token_response(response.content):
+                    if tokens_refreshed or not await asyncio.to_thread(self.load_tokens, True):
+                        log.warning("فيسبوك رفض التوكنز حتى بعد التحديث", page=page_count)
+                        state["interrupted"] = "stale_tokens"
+                        break
+                    tokens_refreshed = True
+                    page_count -= 1
+                    continue
+
+                reactions_data = await self.process_response_async(response)
+                if not reactions_data:
+                    if page_sizer.record_failure(page_count, count_per_request, elapsed, "invalid_response"):
+                        page_count -= 1
+                        await asyncio.sleep(delay)
+                        continue
+                    state["interrupted"] = "invalid_response"
+                    break
+
+                tokens_refreshed = False
+                new_reactions = reactions_data.get('reactions', [])
+                page_info = reactions_data.get('page_info', {})
+                has_next_page = page_info.get('has_next_page', False)
+                page_sizer.record_success(page_count, count_per_request, len(new_reactions), has_next_page, elapsed)
+                PAGES_SCRAPED.labels("reactions").inc()
+
+                # قطع الصفحة للحد المطلوب (فقط إذا كان هناك حد محدد)
+                if limit > 0 and fetched_count + len(new_reactions) > limit:
+                    new_reactions = new_reactions[:limit - fetched_count]
+
+                fetched_count += len(new_reactions)
+
+                # التحقق من وجود صفحات أخرى
+                cursor = page_info.get('end_cursor')
+
+                # تحديث حالة الترقيم قبل تسليم الصفحة (نقطة الاستئناف هي الصفحة التالية)
+                state.update(cursor=cursor, page_count=page_count, items=fetched_count,
+                             exhausted=not has_next_page or not cursor, page_size=page_sizer.size)
+                yield new_reactions
+
+                if state["exhausted"]:
+                    break
+
+                if limit > 0 and fetched_count >= limit:
+                    break
+
+                # تأخير قبل الطلب التالي
+                await asyncio.sleep(delay)
+
+        except Exception as e:
+            log.error("خطأ في جلب التفاعلات", error=str(e))
+            state["interrupted"] = str(e)
+
+    async def process_response_async(self, response) -> Optional[Dict]:
+        """مثل process_response بدون حجز الـ event loop أثناء تحليل الاستجابات الكبيرة"""
+        try:
+            self.log_response(response)
+            reactions_data = await parse_pool.run_async(parse_reactions_body, response.content,
+                                                        response.headers.get('content-encoding', '').lower(),
+                                                        self.reaction_types)
+            return self.check_reactions_data(reactions_data)
+        except ValueError as e:
+            log.warning("خطأ في معالجة JSON", error=str(e))
+            return None
+        except Exception as e:
+            log.warning("خطأ في معالجة الاستجابة", error=str(e))
+            return None
+
+    async def prepare_account_async(self, cookies_array: List[Dict]) -> Optional[str]:
+        """تحميل الكوكيز والتوكنز مرة واحدة للحساب (يُرجع رسالة الخطأ أو None)"""
+        if not self.load_cookies_from_array(cookies_array):
+            return "فشل في تحميل الكوكيز"
+
+        # استخراج التوكنز يتم مرة واحدة لكل حساب (كاش مشترك)، لذا يكفي تشغيله في thread
+        if not await asyncio.to_thread(self.load_tokens):
+            return "فشل في استخراج التوكنز"
+
+        return None
+
+    async def scrape_reactions_api_async(self, post_url: str, cookies_array: List[Dict],
+                                         limit: int = 0, delay: float = 2.0, result_writer=None,
+                                         resume_state: Optional[Dict] = None, delta_tracker=None) -> Dict:
+        """الدالة الرئيسية لسحب التفاعلات - نسخة async"""
+        try:
+            error = await self.prepare_account_async(cookies_array)
+            if error:
+                return {"error": error, "reactions": []}
+
+            return await self.scrape_post_reactions_async(post_url, limit, delay, result_writer, resume_state,
+                                                          delta_tracker=delta_tracker)
+
+        except Exception as e:
+            return {"error": f"خطأ عام في السكربت: {str(e)}", "reactions": []}
+
+    async def scrape_post_reactions_async(self, post_url: str, limit: int = 0, delay: float = 2.0,
+                                          result_writer=None, resume_state: Optional[Dict] = None,
+                                          client: Optional[httpx.AsyncClient] = None,
+                                          delta_tracker=None) -> Dict:
+        """سحب تفاعلات بوست واحد بعد prepare_account_async (client مشترك بين بوستات الدفعة إن مُرر)"""
+        try:
+            post_id = self.extract_post_id_from_url(post_url)
+            if not post_id:
+                return {"error": "فشل في استخراج معرف البوست", "reactions": []}
+
+            feedback_id = self.smart_feedback_id_extractor(post_id, post_url)
+            if not feedback_id:
+                return {"error": "فشل في إنشاء feedback_id", "reactions": []}
+
+            summary = self.new_reactions_summary(keep_items=result_writer is None)
+            # الاستئناف يعيد قراءة الـ spool كاملاً: خارج الـ event loop
+            state = await asyncio.to_thread(self.prepare_pagination, summary, result_writer, resume_state)
+            page_sizer = PageSizer(state.get("page_size"))
+            if not state["exhausted"]:
+                lease = nullcontext(client) if client else transport_pool.async_client(self.account_key, self.session)
+                async with lease as client:
+                    async for page in self.iter_reaction_pages_async(client, feedback_id, limit, delay,
+                                                                     state, page_sizer):
+                        # الكتابة على القرص (والـ checkpoint) خارج الـ event loop حتى لا توقف باقي المهام
+                        await asyncio.to_thread(self.add_reactions_page, summary, page, result_writer, state)
+                        if delta_tracker and delta_tracker.check_page(page):
+                            break
+
+            if delta_tracker:
+                await asyncio.to_thread(self.merge_reactions_delta, summary, delta_tracker, result_writer, state)
+
+            result = self.build_reactions_result(post_url, post_id, summary, state, page_sizer)
+            if delta_tracker:
+                result["incremental"] = delta_tracker.get_summary()
+            return result
+
+        except Exception as e:
+            return {"error": f"خطأ عام في السكربت: {str(e)}", "reactions": []}
+
+
+class AsyncFacebookCommentsScraper(FacebookCommentsScraper):
+    """جلب الكومنتات باستخدام asyncio - نسخة المحرك غير المتزامن"""
+
+    async def fetch_comments_page_async(self, client: httpx.AsyncClient, post_id,
+                                        cursor=None, retry_on_stale_tokens=True):
+        """جلب صفحة واحدة من الكومنتات بدون حجز thread"""
+        try:
+            data, headers = self.build_comments_request(post_id, cursor)
+
+            await rate_limiter.acquire_async(self.user_id)
+            started_at = time.monotonic()
+            response = await client.post(
+                f'{settings.FACEBOOK_BASE_URL}/api/graphql/',
+                data=data,
+                headers=headers
+            )
+            record_graphql_request("comments", response.status_code, time.monotonic() - started_at,
+                                   len(response.content))
+
+            if response.status_code != 200:
+                return None, None
+
+            # التوكنز منتهية الصلاحية: تحديثها مرة واحدة وإعادة نفس الطلب
+            if is_stale_token_response(response.content):
+                if retry_on_stale_tokens and await asyncio.to_thread(self.load_tokens, True):
+                    return await self.fetch_comments_page_async(client, post_id, cursor, retry_on_stale_tokens=False)
+                return None, None
+
+            try:
+                page = await parse_pool.run_async(parse_comments_body, response.content,
+                                                  response.headers.get('content-encoding', '').lower())
+            except ValueError:
+                return None, None
+            if page is None:
+                return None, None
+            PAGES_SCRAPED.labels("comments").inc()
+            return page
+
+        except Exception as e:
+            log.error("خطأ في جلب الكومنتات", error=str(e))
+            return None, None
+
+    async def iter_comment_pages_async(self, client: httpx.AsyncClient, post_id, delay: int = 10,
+                                       max_pages: Optional[int] = None,
+                                       state: Optional[Dict] = None) -> AsyncIterator[List[Dict]]:
+        """جلب الكومنتات صفحة بصفحة بدون حجز thread"""
+        if state is None:
+            state = new_pagination_state()
+
+        cursor = state["cursor"]
+        page_count = state["page_count"]
+
+        while True:
+            page_count += 1
+
+            if max_pages and page_count > max_pages:
+                break
+
+            comments, next_cursor = await self.fetch_comments_page_async(client, post_id, cursor)
+
+            if comments is None:
+                state["interrupted"] = "request_failed"
+                break
+
+            if not comments:
+                state["exhausted"] = True
+                break
+
+            # تحديث حالة الترقيم قبل تسليم الصفحة (نقطة الاستئناف هي الصفحة التالية)
+            state.update(cursor=next_cursor, page_count=page_count,
+                         items=state["items"] + len(comments), exhausted=not next_cursor)
+            yield comments
+
+            if not next_cursor:
+                break
+
+            cursor = next_cursor
+
+            # فارق زمني بين الطلبات
+            await asyncio.sleep(delay)
+
+    async def prepare_account_async(self, cookies_array: List[Dict]) -> Optional[str]:
+        """تحميل الكوكيز والتوكنز مرة واحدة للحساب (يُرجع رسالة الخطأ أو None)"""
+        if not self.load_cookies_from_array(cookies_array):
+            return "فشل في تحميل الكوكيز"
+
+        if not await asyncio.to_thread(self.load_tokens):
+            return "فشل في استخراج التوكنز"
+
+        return None
+
+    async def scrape_all_comments_api_async(self, post_url: str, cookies_array: List[Dict],
+                                            delay: int = 10, max_pages: Optional[int] = None,
+                                            result_writer=None, resume_state: Optional[Dict] = None,
+                                            delta_tracker=None) -> Dict:
+        """جلب جميع الكومنتات - نسخة async"""
+        try:
+            error = await self.prepare_account_async(cookies_array)
+            if error:
+                return {"error": error, "comments": []}
+
+            return await self.scrape_post_comments_async(post_url, delay, max_pages, result_writer, resume_state,
+                                                         delta_tracker=delta_tracker)
+
+        except Exception as e:
+            return {"error": f"خطأ عام في السكربت: {str(e)}", "comments": []}
+
+    async def scrape_post_comments_async(self, post_url: str, delay: int = 10, max_pages: Optional[int] = None,
+                                         result_writer=None, resume_state: Optional[Dict] = None,
+                                         client: Optional[httpx.AsyncClient] = None,
+                                         delta_tracker=None) -> Dict:
+        """جلب كومنتات بوست واحد بعد prepare_account_async (client مشترك بين بوستات الدفعة إن مُرر)"""
+        try:
+            post_id = self.extract_post_id(post_url)
+            if not post_id:
+                return {"error": "فشل في استخراج معرف البوست", "comments": []}
+
+            summary = self.new_comments_summary(keep_items=result_writer is None)
+            # الاستئناف يعيد قراءة الـ spool كاملاً: خارج الـ event loop
+            state = await asyncio.to_thread(self.prepare_pagination, summary, result_writer, resume_state)
+            if not state["exhausted"]:
+                lease = nullcontext(client) if client else transport_pool.async_client(self.account_key, self.session)
+                async with lease as client:
+                    async for page in self.iter_comment_pages_async(client, post_id, delay, max_pages, state):
+                        # الكتابة على القرص (والـ checkpoint) خارج الـ event loop حتى لا توقف باقي المهام
+                        await asyncio.to_thread(self.add_comments_page, summary, page, result_writer, state)
+                        if delta_tracker and delta_tracker.check_page(page):
+                            break
+
+            if delta_tracker:
+                await asyncio.to_thread(self.merge_comments_delta, summary, delta_tracker, result_writer, state)
+
+            result = self.build_comments_result(post_url, summary, state)
+            if delta_tracker:
+                result["incremental"] = delta_tracker.get_summary()
+            return result
+
+        except Exception as e:
+            return {"error": f"خطأ عام في السكربت: {str(e)}", "comments": []}
+
+
+class AsyncFacebookPostScraper(FacebookPostScraper):
+    """سحب التفاعلات والكومنتات لبوست واحد معاً - نسخة async (تدفقان متداخلان على client واحد)"""
+
+    def __init__(self):
+        """تهيئة الفئة"""
+        self.reactions_scraper = AsyncFacebookReactionsScraper()
+        self.comments_scraper = AsyncFacebookCommentsScraper()
+
+    async def scrape_post_api_async(self, post_url: str, cookies_array: List[Dict], limit: int = 0,
+                                    reactions_delay: float = 2.0, comments_delay: int = 10,
+                                    max_pages: Optional[int] = None, result_writer=None) -> Dict:
+        """سحب التفاعلات والكومنتات لبوست واحد - نسخة async"""
+        try:
+            error = await asyncio.to_thread(self.prepare_account, cookies_array)
+            if error:
+                return {"error": error}
+
+            async with transport_pool.async_client(self.reactions_scraper.account_key,
+                                                   self.reactions_scraper.session) as client:
+                reactions_result, comments_result = await asyncio.gather(
+                    self.reactions_scraper.scrape_post_reactions_async(
+                        post_url, limit, reactions_delay, result_writer, client=client
+                    ),
+                    self.comments_scraper.scrape_post_comments_async(
+                        post_url, comments_delay, max_pages, result_writer, client=client
+                    )
+                )
+
+            for section_result in (reactions_result, comments_result):
+                if section_result.get("error"):
+                    return {"error": section_result["error"]}
+
+            return merge_post_results(reactions_result, comments_result)
+
+        except Exception as e:
+            return {"error": f"خطأ عام في السكربت: {str(e)}"}
@@ -10,7 +10,21 @@ import time
 import urllib.parse
 import base64
 from datetime import datetime
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Iterator
+
+from app.config import settings
+from app.core.token_cache import token_cache, is_stale_token_response
+from app.core.checkpoints import new_pagination_state
+from app.core.rate_limiter import rate_limiter
+from app.core.transport import transport_pool
+from app.core.log import get_logger
+from app.core.metrics import PAGES_SCRAPED, TOKEN_EXTRACTION_SECONDS, record_graphql_request
+from app.scrapers.parse_pool import parse_pool
+from app.scrapers.parsing import parse_comments_body
+from app.scrapers.token_scanner import scan_tokens
+
+
+log = get_logger("comments")
 
 
 class FacebookCommentsScraper:
@@ -23,6 +37,7 @@ class FacebookCommentsScraper:
         self.lsd = None
         self.jazoest = "25515"
         self.user_id = None
+        self.account_key = None
         
         # إعداد timeout افتراضي
         self.session.timeout = 30
@@ -53,48 +68,51 @@ class FacebookCommentsScraper:
                 
             if not self.user_id:
                 return False
+            
+            # مفتاح الحساب لمشاركة التوكنز بين المهام
+            self.account_key = token_cache.make_account_key(self.user_id, self.session.cookies.get('xs'))
+            # الـ session طويل العمر للحساب (اتصالات keep-alive مشتركة بين المهام)
+            self.session = transport_pool.get_session(self.account_key, self.session.cookies)
                 
             return True
             
         except Exception as e:
-            print(f"❌ خطأ في تحميل الكوكيز: {e}")
+            log.error("خطأ في تحميل الكوكيز", error=str(e))
             return False
 
+    def share_account(self, scraper) -> bool:
+        """استخدام session وكوكيز سكربر آخر محمّل مسبقاً (بدون تحميل الكوكيز أو جلب الصفحة الرئيسية مرة أخرى)"""
+        self.session = scraper.session
+        self.user_id = scraper.user_id
+        self.account_key = scraper.account_key
+        
+        # التوكنز موجودة في الكاش المشترك لنفس الحساب
+        return self.load_tokens()
+
+    def new_post_scraper(self) -> Optional["FacebookCommentsScraper"]:
+        """سكربر لبوست واحد من دفعة: نفس الـ session والحساب مع توكنز خاصة به (None إذا فشل تحميل التوكنز)"""
+        # كل بوست يحدّث توكنزه بنفسه: تحديث بوست لا يترك توكنز البوستات الأخرى فارغة
+        scraper = type(self)()
+        return scraper if scraper.share_account(self) else None
+
     def extract_tokens(self):
         """استخراج التوكنز من فيسبوك"""
         try:
-            response = self.session.get('https://www.facebook.com/', timeout=30)
+            response = self.session.get(f'{settings.FACEBOOK_BASE_URL}/', timeout=30)
             
             if response.status_code != 200:
                 return False
             
             content = response.text
             
-            # استخراج fb_dtsg
-            dtsg_patterns = [
-                r'"DTSGInitialData",\[\],\{"token":"([^"]+)"',
-                r'"dtsg":\{"token":"([^"]+)"',
-                r'fb_dtsg":"([^"]+)"',
-                r'DTSGInitialData.*?"token":"([^"]+)"'
-            ]
-            
-            for pattern in dtsg_patterns:
-                match = re.search(pattern, content)
-                if match:
-                    self.fb_dtsg = match.group(1)
-                    break
-            
-            # استخراج lsd
-            lsd_patterns = [
-                r'"LSD",\[\],\{"token":"([^"]+)"',
-                r'"token":"([^"]{20,})"'
-            ]
-            
-            for pattern in lsd_patterns:
-                match = re.search(pattern, content)
-                if match:
-                    self.lsd = match.group(1)
-                    break
+            # استخراج fb_dtsg و lsd و jazoest
+            tokens = scan_tokens(content)
+            if tokens['marker']:
+                log.warning("فيسبوك لم يعرض الصفحة الرئيسية", page=tokens['marker'])
+            
+            self.fb_dtsg = tokens['fb_dtsg']
+            self.lsd = tokens['lsd']
+            self.jazoest = tokens['jazoest'] or self.jazoest
             
             # التحقق من النتائج
             if not self.fb_dtsg:
@@ -103,8 +121,35 @@ class FacebookCommentsScraper:
             return True
             
         except Exception as e:
-            print(f"❌ خطأ في استخراج التوكنز: {e}")
+            log.error("خطأ في استخراج التوكنز", error=str(e))
+            return False
+
+    def load_tokens(self, force_refresh=False):
+        """تحميل التوكنز من الكاش المشترك أو استخراجها من فيسبوك مرة واحدة لكل حساب"""
+        if force_refresh:
+            token_cache.invalidate(self.account_key, self.fb_dtsg)
+        
+        tokens = token_cache.get_or_fetch(self.account_key, self.fetch_fresh_tokens)
+        if not tokens:
             return False
+        
+        self.fb_dtsg = tokens['fb_dtsg']
+        self.lsd = tokens.get('lsd')
+        self.jazoest = tokens.get('jazoest') or self.jazoest
+        return True
+
+    def fetch_fresh_tokens(self):
+        """استخراج توكنز جديدة من فيسبوك (يستدعى من الكاش عند الحاجة فقط)"""
+        self.fb_dtsg = None
+        self.lsd = None
+        started_at = time.monotonic()
+        
+        if not self.extract_tokens():
+            TOKEN_EXTRACTION_SECONDS.labels("failed").observe(time.monotonic() - started_at)
+            return None
+        
+        TOKEN_EXTRACTION_SECONDS.labels("ok").observe(time.monotonic() - started_at)
+        return {'fb_dtsg': self.fb_dtsg, 'lsd': self.lsd, 'jazoest': self.jazoest}
 
     def extract_post_id(self, post_url):
         """استخراج معرف البوست من الرابط"""
@@ -133,210 +178,288 @@ class FacebookCommentsScraper:
                     graphql_id = base64.b64encode(feedback_data.encode()).decode()
                     return graphql_id
                 except Exception as e:
-                    print(f"⚠️ فشل تحويل pfbid: {e} - سيتم استخدام المعرف الأصلي")
+                    log.warning("فشل تحويل pfbid - سيتم استخدام المعرف الأصلي", error=str(e))
                     return post_id
             
             return post_id
             
         except Exception as e:
-            print(f"❌ خطأ في تحليل الرابط: {e}")
+            log.warning("خطأ في تحليل الرابط", error=str(e))
             return None
 
-    def fetch_comments_page(self, post_id, cursor=None):
+    def fetch_comments_page(self, post_id, cursor=None, retry_on_stale_tokens=True):
         """جلب صفحة واحدة من الكومنتات"""
         try:
-            # إعداد المتغيرات
-            variables = {
-                "commentsAfterCount": -1,
-                "commentsAfterCursor": cursor,
-                "commentsBeforeCount": None,
-                "commentsBeforeCursor": None,
-                "commentsIntentToken": "RANKED_FILTERED_INTENT_V1",
-                "feedLocation": "POST_PERMALINK_DIALOG",
-                "focusCommentID": None,
-                "scale": 2,
-                "useDefaultActor": False,
-                "id": post_id,
-                "__relay_internal__pv__IsWorkUserrelayprovider": False
-            }
-            
-            # إعداد بيانات الطلب
-            data = {
-                "av": self.user_id,
-                "__aaid": "0",
-                "__user": self.user_id,
-                "__a": "1",
-                "__req": "3n",
-                "__hs": "20325.HYP:comet_pkg.2.1...0",
-                "dpr": "1",
-                "__ccg": "EXCELLENT",
-                "__rev": "1026303884",
-                "__s": "43pu0c:crpsn8:ehpbtp",
-                "__comet_req": "15",
-                "fb_dtsg": self.fb_dtsg,
-                "jazoest": self.jazoest,
-                "lsd": self.lsd or "",
-                "__spin_r": "1026303884",
-                "__spin_b": "trunk",
-                "__spin_t": str(int(time.time())),
-                "fb_api_caller_class": "RelayModern",
-                "server_timestamps": "true",
-                "fb_api_req_friendly_name": "CommentsListComponentsPaginationQuery",
-                "variables": json.dumps(variables),
-                "doc_id": "24170828295923210"
-            }
-            
-            # إعداد headers
-            headers = {
-                'Accept': '*/*',
-                'Accept-Language': 'en-US,en;q=0.9,ar;q=0.8',
-                'Content-Type': 'application/x-www-form-urlencoded',
-                'Origin': 'https://www.facebook.com',
-                'Referer': 'https://www.facebook.com/',
-                'Sec-Fetch-Dest': 'empty',
-                'Sec-Fetch-Mode': 'cors',
-                'Sec-Fetch-Site': 'same-origin',
-            }
-            
-            # إرسال الطلب
+            data, headers = self.build_comments_request(post_id, cursor)
+            
+            # إرسال الطلب بعد انتظار دور الحساب
+            rate_limiter.acquire(self.user_id)
+            started_at = time.monotonic()
             response = self.session.post(
-                'https://www.facebook.com/api/graphql/',
+                f'{settings.FACEBOOK_BASE_URL}/api/graphql/',
                 data=data,
                 headers=headers,
                 timeout=30
             )
+            elapsed = time.monotonic() - started_at
+            record_graphql_request("comments", response.status_code, elapsed, len(response.content))
+            log.debug("استجابة GraphQL", cursor=cursor, status=response.status_code,
+                      size=len(response.content), latency_ms=round(elapsed * 1000, 1))
             
             if response.status_code != 200:
                 return None, None
             
+            # التوكنز منتهية الصلاحية: تحديثها مرة واحدة وإعادة نفس الطلب
+            if is_stale_token_response(response.content):
+                if retry_on_stale_tokens and self.load_tokens(force_refresh=True):
+                    return self.fetch_comments_page(post_id, cursor, retry_on_stale_tokens=False)
+                return None, None
+            
             try:
-                return self.parse_response(response.json())
-            except json.JSONDecodeError:
+                page = parse_pool.run(parse_comments_body, response.content,
+                                      response.headers.get('content-encoding', '').lower())
+            except ValueError:
                 return None, None
+            if page is None:
+                return None, None
+            PAGES_SCRAPED.labels("comments").inc()
+            return page
                 
         except Exception as e:
-            print(f"❌ خطأ في جلب الكومنتات: {e}")
+            log.error("خطأ في جلب الكومنتات", error=str(e))
             return None, None
 
-    def parse_response(self, response_data):
-        """تحليل استجابة الكومنتات"""
-        try:
-            # التنقل في بنية البيانات
-            data = response_data.get('data', {})
-            node = data.get('node')
+    def build_comments_request(self, post_id, cursor=None):
+        """بناء بيانات و headers طلب صفحة كومنتات (مشترك بين محركي thread و async)"""
+        # إعداد المتغيرات
+        variables = {
+            "commentsAfterCount": -1,
+            "commentsAfterCursor": cursor,
+            "commentsBeforeCount": None,
+            "commentsBeforeCursor": None,
+            "commentsIntentToken": "RANKED_FILTERED_INTENT_V1",
+            "feedLocation": "POST_PERMALINK_DIALOG",
+            "focusCommentID": None,
+            "scale": 2,
+            "useDefaultActor": False,
+            "id": post_id,
+            "__relay_internal__pv__IsWorkUserrelayprovider": False
+        }
+        
+        # إعداد بيانات الطلب
+        data = {
+            "av": self.user_id,
+            "__aaid": "0",
+            "__user": self.user_id,
+            "__a": "1",
+            "__req": "3n",
+            "__hs": "20325.HYP:comet_pkg.2.1...0",
+            "dpr": "1",
+            "__ccg": "EXCELLENT",
+            "__rev": "1026303884",
+            "__s": "43pu0c:crpsn8:ehpbtp",
+            "__comet_req": "15",
+            "fb_dtsg": self.fb_dtsg,
+            "jazoest": self.jazoest,
+            "lsd": self.lsd or "",
+            "__spin_r": "1026303884",
+            "__spin_b": "trunk",
+            "__spin_t": str(int(time.time())),
+            "fb_api_caller_class": "RelayModern",
+            "server_timestamps": "true",
+            "fb_api_req_friendly_name": "CommentsListComponentsPaginationQuery",
+            "variables": json.dumps(variables),
+            "doc_id": "24170828295923210"
+        }
+        
+        # إعداد headers
+        headers = {
+            'Accept': '*/*',
+            'Accept-Language': 'en-US,en;q=0.9,ar;q=0.8',
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'Origin': settings.FACEBOOK_BASE_URL,
+            'Referer': f'{settings.FACEBOOK_BASE_URL}/',
+            'Sec-Fetch-Dest': 'empty',
+            'Sec-Fetch-Mode': 'cors',
+            'Sec-Fetch-Site': 'same-origin',
+        }
+        
+        return data, headers
+
+    def iter_comment_pages(self, post_id, delay: int = 10, max_pages: Optional[int] = None,
+                           state: Optional[Dict] = None) -> Iterator[List[Dict]]:
+        """
+        جلب الكومنتات صفحة بصفحة (generator) بدون تجميعها في الذاكرة
+        
+        state (من new_pagination_state) يُحدَّث قبل تسليم كل صفحة ويسمح بالاستئناف من آخر cursor
+        """
+        if state is None:
+            state = new_pagination_state()
+        
+        cursor = state["cursor"]
+        page_count = state["page_count"]
+        
+        while True:
+            page_count += 1
             
-            if not node:
-                return [], None
+            if max_pages and page_count > max_pages:
+                break
             
-            # البحث عن الكومنتات
-            comment_rendering = node.get('comment_rendering_instance_for_feed_location', {})
-            comments_data = comment_rendering.get('comments', {})
+            comments, next_cursor = self.fetch_comments_page(post_id, cursor)
             
-            if not comments_data:
-                return [], None
+            if comments is None:
+                state["interrupted"] = "request_failed"
+                break
             
-            # استخراج pagination
-            page_info = comments_data.get('page_info', {})
-            next_cursor = None
-            if page_info.get('has_next_page'):
-                next_cursor = page_info.get('end_cursor')
+            if not comments:
+                state["exhausted"] = True
+                break
             
-            # استخراج الكومنتات
-            edges = comments_data.get('edges', [])
-            comments = []
+            # تحديث حالة الترقيم قبل تسليم الصفحة (نقطة الاستئناف هي الصفحة التالية)
+            state.update(cursor=next_cursor, page_count=page_count,
+                         items=state["items"] + len(comments), exhausted=not next_cursor)
+            yield comments
             
-            for edge in edges:
-                comment_node = edge.get('node', {})
-                comment = self.extract_comment_data(comment_node)
-                if comment:
-                    comments.append(comment)
+            if not next_cursor:
+                break
             
-            return comments, next_cursor
+            cursor = next_cursor
             
-        except Exception as e:
-            print(f"❌ خطأ في تحليل الاستجابة: {e}")
-            return [], None
+            # فارق زمني بين الطلبات
+            time.sleep(delay)
+
+    def new_comments_summary(self, keep_items: bool) -> Dict:
+        """إنشاء ملخص فارغ يتم تحديثه صفحة بصفحة"""
+        return {"total": 0, "pages": 0, "comments": [] if keep_items else None}
 
-    def extract_comment_data(self, comment_node):
-        """استخراج بيانات الكومنت"""
+    def add_comments_page(self, summary: Dict, page: List[Dict], result_writer=None,
+                          state: Optional[Dict] = None):
+        """إضافة صفحة كومنتات للملخص وكتابتها على القرص إن وجد writer"""
+        if result_writer:
+            result_writer.write_items(page, 'comments', state)
+        else:
+            summary["comments"].extend(page)
+        
+        summary["total"] += len(page)
+        summary["pages"] += 1
+
+    def prepare_pagination(self, summary: Dict, result_writer=None, resume_state: Optional[Dict] = None) -> Dict:
+        """تجهيز حالة الترقيم، مع استعادة العدادات عند الاستئناف"""
+        state = new_pagination_state()
+        
+        if resume_state and result_writer:
+            state.update(resume_state)
+            state["interrupted"] = None
+            summary["total"] = result_writer.items_written['comments']
+            summary["pages"] = result_writer.pages_written['comments']
+        
+        return state
+
+    def merge_comments_delta(self, summary: Dict, delta_tracker, result_writer=None,
+                             state: Optional[Dict] = None):
+        """
+        فصل الكومنتات الجديدة أو المعدلة (delta) عن المهمة السابقة وإكمال اللقطة بكومنتاتها التي لم تُسحب مجدداً
+        
+        إذا وصل الترقيم لآخر صفحة فما لم يظهر قد حُذف، فلا يضاف من المهمة السابقة
+        """
+        def add_previous(items):
+            if result_writer:
+                result_writer.write_items(items, 'comments')
+            else:
+                summary["comments"].extend(items)
+            summary["total"] += len(items)
+        
+        if state and state["exhausted"]:
+            add_previous = None
+        
+        if result_writer:
+            delta_tracker.merge(result_writer.iter_written_items('comments'),
+                                lambda items: result_writer.write_items(items, 'delta'), add_previous)
+        else:
+            summary["delta"] = []
+            delta_tracker.merge(list(summary["comments"]), summary["delta"].extend, add_previous)
+
+    def build_comments_result(self, post_url: str, summary: Dict, state: Optional[Dict] = None) -> Dict:
+        """بناء النتيجة النهائية (بدون القائمة إذا تمت كتابتها على القرص)"""
+        result = {
+            "success": True,
+            "post_url": post_url,
+            "total_comments": summary["total"],
+            "pages_scraped": summary["pages"],
+            "scraped_at": datetime.now().isoformat()
+        }
+        
+        if summary["comments"] is not None:
+            result["comments"] = summary["comments"]
+        if summary.get("delta") is not None:
+            result["delta"] = summary["delta"]
+        
+        # توقف الترقيم قبل النهاية: النتيجة جزئية ويمكن استئنافها
+        if state and state.get("interrupted"):
+            result["interrupted"] = True
+            result["interruption_reason"] = state["interrupted"]
+        
+        return result
+
+    def prepare_account(self, cookies_array: List[Dict]) -> Optional[str]:
+        """تحميل الكوكيز والتوكنز مرة واحدة للحساب (يُرجع رسالة الخطأ أو None)"""
+        if not self.load_cookies_from_array(cookies_array):
+            return "فشل في تحميل الكوكيز"
+        
+        if not self.load_tokens():
+            return "فشل في استخراج التوكنز"
+        
+        return None
+
+    def scrape_all_comments_api(self, post_url: str, cookies_array: List[Dict], 
+                               delay: int = 10, max_pages: Optional[int] = None,
+                               result_writer=None, resume_state: Optional[Dict] = None,
+                               delta_tracker=None) -> Dict:
+        """
+        جلب جميع الكومنتات - نسخة API
+        
+        عند تمرير result_writer تكتب كل صفحة على القرص فور وصولها ولا تُرجع قائمة الكومنتات،
+        و resume_state يكمل الترقيم من آخر نقطة حفظ، و delta_tracker (DeltaTracker لمهمة سابقة)
+        يوقف الترقيم عند أول صفحة بدون جديد ويضيف قسم delta للنتيجة
+        """
         try:
-            # استخراج author_id
-            author = comment_node.get('author', {})
-            author_id = author.get('id', '')
-            
-            if not author_id:
-                return None
-            
-            # النص
-            body = comment_node.get('body', {})
-            text = body.get('text', '') if body else ''
-            
-            # التاريخ
-            created_time = comment_node.get('created_time', 0)
+            # التحقق من المتطلبات
+            error = self.prepare_account(cookies_array)
+            if error:
+                return {"error": error, "comments": []}
             
-            return {
-                'author_id': author_id,
-                'text': text,
-                'created_time': created_time
-            }
+            return self.scrape_post_comments(post_url, delay, max_pages, result_writer, resume_state, delta_tracker)
             
         except Exception as e:
-            print(f"⚠️ خطأ في استخراج كومنت: {e}")
-            return None
+            return {"error": f"خطأ عام في السكربت: {str(e)}", "comments": []}
 
-    def scrape_all_comments_api(self, post_url: str, cookies_array: List[Dict], 
-                               delay: int = 10, max_pages: Optional[int] = None) -> Dict:
-        """جلب جميع الكومنتات - نسخة API"""
+    def scrape_post_comments(self, post_url: str, delay: int = 10, max_pages: Optional[int] = None,
+                             result_writer=None, resume_state: Optional[Dict] = None,
+                             delta_tracker=None) -> Dict:
+        """جلب كومنتات بوست واحد بعد prepare_account (الـ session والتوكنز مشتركة بين بوستات الدفعة)"""
         try:
-            # التحقق من المتطلبات
-            if not self.load_cookies_from_array(cookies_array):
-                return {"error": "فشل في تحميل الكوكيز", "comments": []}
-                
-            if not self.extract_tokens():
-                return {"error": "فشل في استخراج التوكنز", "comments": []}
-                
             post_id = self.extract_post_id(post_url)
             if not post_id:
                 return {"error": "فشل في استخراج معرف البوست", "comments": []}
             
             # جلب الكومنتات
-            all_comments = []
-            cursor = None
-            page_count = 0
-            
-            while True:
-                page_count += 1
-                
-                if max_pages and page_count > max_pages:
-                    break
-                
-                comments, next_cursor = self.fetch_comments_page(post_id, cursor)
-                
-                if not comments:
-                    break
-                
-                all_comments.extend(comments)
-                
-                if not next_cursor:
-                    break
-                
-                cursor = next_cursor
-                
-                # فارق زمني بين الطلبات
-                if next_cursor:
-                    time.sleep(delay)
+            summary = self.new_comments_summary(keep_items=result_writer is None)
+            state = self.prepare_pagination(summary, result_writer, resume_state)
+            if not state["exhausted"]:
+                for page in self.iter_comment_pages(post_id, delay, max_pages, state):
+                    self.add_comments_page(summary, page, result_writer, state)
+                    # الباقي سُحب في المهمة السابقة
+                    if delta_tracker and delta_tracker.check_page(page):
+                        break
+            
+            if delta_tracker:
+                self.merge_comments_delta(summary, delta_tracker, result_writer, state)
             
             # إعداد النتائج النهائية
-            return {
-                "success": True,
-                "post_url": post_url,
-                "total_comments": len(all_comments),
-                "pages_scraped": page_count,
-                "scraped_at": datetime.now().isoformat(),
-                "comments": all_comments
-            }
+            result = self.build_comments_result(post_url, summary, state)
+            if delta_tracker:
+                result["incremental"] = delta_tracker.get_summary()
+            return result
             
         except Exception as e:
             return {"error": f"خطأ عام في السكربت: {str(e)}", "comments": []}
-
-
@@ -0,0 +1,121 @@
+"""
+Incremental scraping: compare fresh pages with the items of a previous job
+
+Pagination stops at the first page that brings nothing new, the result keeps
+the new or changed items apart (the delta), and the previous items that were
+not scraped again are appended to form the merged snapshot.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+# Items are compared in chunks when the merge streams them from disk
+MERGE_CHUNK_SIZE = 500
+
+
+def reaction_identity(reaction: Dict) -> Tuple[Optional[str], Any]:
+    """Key and signature of a reaction: the reacting user and the reaction type"""
+    return (reaction.get("user") or {}).get("id"), reaction.get("reaction_type")
+
+
+def comment_identity(comment: Dict) -> Tuple[Optional[str], Any]:
+    """Key and signature of a comment: its id (author + time for older results) and its text"""
+    key = comment.get("comment_id")
+    if not key and comment.get("author_id"):
+        key = f"{comment['author_id']}:{comment.get('created_time')}"
+    return key, comment.get("text")
+
+
+def _iter_chunks(items: Iterable[Dict], size: int = MERGE_CHUNK_SIZE) -> Iterable[List[Dict]]:
+    """Group items in lists of at most size items"""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class DeltaTracker:
+    """
+    Items of a previous job, seen through their keys and signatures only
+
+    previous_items is called once here and once more by merge(), so the
+    previous result is streamed from disk instead of being held in memory.
+    """
+
+    def __init__(self, since_job_id: str, previous_items: Callable[[], Iterable[Dict]],
+                 identity: Callable[[Dict], Tuple[Optional[str], Any]]):
+        """Index the keys of the previous job items"""
+        self.since_job_id = since_job_id
+        self.previous_items = previous_items
+        self.identity = identity
+        self.known: Dict[str, Any] = {}
+        for item in previous_items():
+            key, signature = identity(item)
+            if key:
+                self.known[key] = signature
+
+        self.caught_up = False
+        self.new_items = 0
+        self.changed_items = 0
+        self.merged_items = 0
+
+    def is_delta(self, item: Dict) -> bool:
+        """Check whether an item is new or changed since the previous job"""
+        key, signature = self.identity(item)
+        return not key or key not in self.known or self.known[key] != signature
+
+    def check_page(self, page: List[Dict]) -> bool:
+        """Record whether a page brought nothing new; pagination stops there"""
+        if page and not any(self.is_delta(item) for item in page):
+            self.caught_up = True
+        return self.caught_up
+
+    def merge(self, scraped_items: Iterable[Dict], add_delta: Callable[[List[Dict]], None],
+              add_previous: Optional[Callable[[List[Dict]], None]]):
+        """
+        Pass the new or changed scraped items to add_delta, then the previous
+        items that were not scraped again to add_previous
+
+        scraped_items is fully consumed before add_previous is called, so both
+        may read and append to the same spool. add_previous is None when the
+        pagination went through every page: items missing from it are gone.
+        """
+        scraped_keys = set()
+        for chunk in _iter_chunks(scraped_items):
+            delta = []
+            for item in chunk:
+                key, signature = self.identity(item)
+                if key:
+                    scraped_keys.add(key)
+                if not key or key not in self.known:
+                    self.new_items += 1
+                    delta.append(item)
+                elif self.known[key] != signature:
+                    self.changed_items += 1
+                    delta.append(item)
+            if delta:
+                add_delta(delta)
+
+        if add_previous is None:
+            return
+
+        for chunk in _iter_chunks(self.previous_items()):
+            previous = [item for item in chunk if self.identity(item)[0] not in scraped_keys]
+            if previous:
+                self.merged_items += len(previous)
+                add_previous(previous)
+
+    def get_summary(self) -> Dict:
+        """Summary stored in the result document"""
+        return {
+            "since_job_id": self.since_job_id,
+            "previous_items": len(self.known),
+            "new_items": self.new_items,
+            "changed_items": self.changed_items,
+            "merged_from_previous": self.merged_items,
+            "caught_up": self.caught_up
+        }
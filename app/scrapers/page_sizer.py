@@ -0,0 +1,117 @@
+"""
+Adaptive page sizing for GraphQL pagination
+"""
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from app.config import settings
+
+
+# Failures that say the page was too big to serve; anything else (HTTP 500, a login
+# wall or other invalid response) says nothing about the size
+SIZE_FAILURE_REASONS = ("http_413", "http_504")
+
+# Full pages at a ceiling set by a failure before larger pages are tried again
+CEILING_RECOVERY_PAGES = 5
+
+# Latest fetched pages whose timings are kept for the percentiles of the summary
+TIMING_WINDOW = 200
+
+
+class PageSizer:
+    """
+    Picks how many items to request per page
+
+    Starts large and grows while the server returns full pages. A page that
+    comes back short while more pages exist means the server capped it, so
+    that size becomes the ceiling. A failed page halves the size and is
+    retried, up to max_retries times in a row; only a size-related failure
+    (SIZE_FAILURE_REASONS) also lowers the ceiling, and that ceiling is lifted
+    again after CEILING_RECOVERY_PAGES full pages at it.
+    """
+
+    def __init__(self, initial: Optional[int] = None,
+                 minimum: int = settings.REACTIONS_PAGE_SIZE_MIN,
+                 maximum: int = settings.REACTIONS_PAGE_SIZE_MAX,
+                 max_retries: int = 3):
+        """Initialize page sizer (initial is e.g. the size saved in a checkpoint)"""
+        self.minimum = minimum
+        self.ceiling = maximum
+        self.server_ceiling = maximum  # lowered only by pages the server truncated
+        self.ceiling_from_failure = False
+        self.full_pages_at_ceiling = 0
+        self.size = self._clamp(initial or settings.REACTIONS_PAGE_SIZE_START)
+        self.max_retries = max_retries
+        self.consecutive_failures = 0
+        self.requests = 0
+        self.failed_requests = 0
+        self.fetched_ms = 0.0
+        self.recent_ms: Deque[float] = deque(maxlen=TIMING_WINDOW)
+
+    def _clamp(self, size: int) -> int:
+        """Keep a size between the minimum and the current ceiling"""
+        return max(self.minimum, min(self.ceiling, size))
+
+    def next_size(self, remaining: Optional[int] = None) -> int:
+        """Get the page size for the next request"""
+        if remaining is not None and remaining > 0:
+            return min(self.size, remaining)
+        return self.size
+
+    def record_success(self, page: int, requested: int, received: int,
+                       has_next_page: bool, elapsed: float):
+        """Record a page that was fetched and parsed"""
+        self.consecutive_failures = 0
+        self.requests += 1
+        self.fetched_ms += elapsed * 1000
+        self.recent_ms.append(elapsed * 1000)
+
+        if has_next_page and received < requested:
+            # Truncated by the server: never ask for more than it returns
+            self.ceiling = self.server_ceiling = max(self.minimum, received)
+            self.ceiling_from_failure = False
+            self.size = self.ceiling
+        elif received >= requested and requested == self.size:
+            if self.ceiling_from_failure and self.size == self.ceiling:
+                self.full_pages_at_ceiling += 1
+                if self.full_pages_at_ceiling >= CEILING_RECOVERY_PAGES:
+                    self.ceiling = self.server_ceiling
+                    self.ceiling_from_failure = False
+            self.size = self._clamp(int(self.size * 1.5))
+
+    def record_failure(self, page: int, requested: int, elapsed: float, reason: str) -> bool:
+        """
+        Record a failed page and shrink the size
+
+        Returns True if the page should be retried with the smaller size.
+        """
+        self.consecutive_failures += 1
+        self.requests += 1
+        self.failed_requests += 1
+
+        if requested <= self.minimum or self.consecutive_failures > self.max_retries:
+            return False
+
+        if reason in SIZE_FAILURE_REASONS:
+            self.ceiling = max(self.minimum, requested - 1)
+            self.ceiling_from_failure = True
+            self.full_pages_at_ceiling = 0
+        self.size = self._clamp(requested // 2)
+        return True
+
+    def get_summary(self) -> Dict:
+        """
+        Summarize pagination for the job result
+
+        avg_page_ms covers every fetched page, p95_page_ms the last TIMING_WINDOW.
+        """
+        fetched = self.requests - self.failed_requests
+        recent = sorted(self.recent_ms)
+
+        return {
+            "requests": self.requests,
+            "failed_requests": self.failed_requests,
+            "final_page_size": self.size,
+            "avg_page_ms": round(self.fetched_ms / fetched, 1) if fetched else 0,
+            "p95_page_ms": round(recent[min(len(recent) - 1, int(len(recent) * 0.95))], 1) if recent else 0
+        }
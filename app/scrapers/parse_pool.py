@@ -0,0 +1,129 @@
+"""
+Worker processes for decoding and extracting large GraphQL responses
+
+JSON decoding and record extraction are CPU-bound and hold the GIL, so with
+many concurrent jobs they slow down the API threads and the async event loop.
+When enabled, bodies of at least min_bytes are parsed in a process pool: the
+raw bytes go to the worker and only the compact extracted records come back.
+Small bodies are parsed inline, where the pickling round trip would cost more
+than the parse itself.
+"""
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+from app.config import settings
+from app.core.log import get_logger
+from app.core.metrics import PARSE_SECONDS
+
+
+log = get_logger("parse_pool")
+
+
+class ParsePool:
+    """Process pool shared by all jobs, created on first use"""
+
+    def __init__(self, workers: int, min_bytes: int):
+        """Initialize parse pool (workers=0 parses everything inline)"""
+        self.workers = workers
+        self.min_bytes = min_bytes
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.lock = threading.Lock()
+        self.offloaded = 0
+        self.inline = 0
+
+    def _should_offload(self, body: bytes) -> bool:
+        """Check whether a body is worth sending to a worker process"""
+        return self.workers > 0 and len(body) >= self.min_bytes
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Get (or start) the process pool"""
+        with self.lock:
+            if self.executor is None:
+                # spawn: لا نعمل fork لعملية فيها threads و event loop
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+                log.info("تم تشغيل عمليات التحليل", workers=self.workers)
+            return self.executor
+
+    def _reset_executor(self, executor: ProcessPoolExecutor):
+        """Drop a broken process pool; the next offloaded body starts a new one"""
+        with self.lock:
+            if self.executor is executor:
+                self.executor = None
+        executor.shutdown(wait=False)
+
+    def _run_inline(self, func: Callable[..., Any], body: bytes, *args) -> Any:
+        """Call func(body, *args) in this process"""
+        started_at = time.monotonic()
+        self.inline += 1
+        try:
+            return func(body, *args)
+        finally:
+            PARSE_SECONDS.labels(func.__name__, "inline").observe(time.monotonic() - started_at)
+
+    def run(self, func: Callable[..., Any], body: bytes, *args) -> Any:
+        """Call func(body, *args), in a worker process when the body is large"""
+        if not self._should_offload(body):
+            return self._run_inline(func, body, *args)
+
+        executor = self._get_executor()
+        started_at = time.monotonic()
+        try:
+            result = executor.submit(func, body, *args).result()
+        except BrokenProcessPool:
+            log.warning("توقفت عمليات التحليل، التحليل داخل العملية")
+            self._reset_executor(executor)
+            return self._run_inline(func, body, *args)
+
+        self.offloaded += 1
+        PARSE_SECONDS.labels(func.__name__, "pool").observe(time.monotonic() - started_at)
+        return result
+
+    async def run_async(self, func: Callable[..., Any], body: bytes, *args) -> Any:
+        """Same as run() without blocking the event loop while a worker parses"""
+        if not self._should_offload(body):
+            return self._run_inline(func, body, *args)
+
+        executor = self._get_executor()
+        started_at = time.monotonic()
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(executor, func, body, *args)
+        except BrokenProcessPool:
+            log.warning("توقفت عمليات التحليل، التحليل داخل العملية")
+            self._reset_executor(executor)
+            return self._run_inline(func, body, *args)
+
+        self.offloaded += 1
+        PARSE_SECONDS.labels(func.__name__, "pool").observe(time.monotonic() - started_at)
+        return result
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def get_stats(self) -> Dict:
+        """Get pool statistics"""
+        return {
+            "workers": self.workers,
+            "min_bytes": self.min_bytes,
+            "running": self.executor is not None,
+            "offloaded": self.offloaded,
+            "inline": self.inline
+        }
+
+
+# Global parse pool instance
+parse_pool = ParsePool(
+    workers=settings.PARSE_WORKERS,
+    min_bytes=settings.PARSE_POOL_MIN_BYTES
+)
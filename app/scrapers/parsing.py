@@ -0,0 +1,153 @@
+"""
+Fast parsing of Facebook GraphQL responses
+
+Bodies are decoded from bytes exactly once. orjson is used when it is
+installed; otherwise the standard json module parses the bytes directly.
+
+The *_body functions go from raw bytes to extracted records in one call and
+only depend on this module, so they can run in a parse worker process
+(see app.scrapers.parse_pool).
+"""
+import gzip
+import json
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+# Anti-JSON-hijacking prefix Facebook puts in front of some responses
+FACEBOOK_JSON_PREFIX = b"for (;;);"
+
+JSON_BACKEND = "orjson" if orjson else "json"
+
+
+def json_loads(data: bytes) -> Any:
+    """Parse JSON from bytes with the fastest available backend"""
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def decode_graphql_body(body: bytes, content_encoding: str = "") -> Optional[Any]:
+    """
+    Decode a GraphQL response body
+
+    Returns None for empty bodies and HTML pages (login walls, rate limiting).
+    Raises ValueError if the body is not valid JSON.
+    """
+    # requests/httpx normally decompress already; only handle bodies that are still compressed
+    if content_encoding == "gzip" and body[:2] == b"\x1f\x8b":
+        body = gzip.decompress(body)
+    elif content_encoding == "deflate" and body[:1] == b"\x78":
+        body = zlib.decompress(body)
+
+    body = body.lstrip()
+    if not body or body[:1] == b"<":
+        return None
+
+    if body.startswith(FACEBOOK_JSON_PREFIX):
+        body = body[len(FACEBOOK_JSON_PREFIX):]
+
+    return json_loads(body)
+
+
+def parse_reactions_page(data: Any, reaction_types: Dict[str, str]) -> Optional[Dict]:
+    """Extract the reactions and page_info of a decoded reactions page"""
+    try:
+        reactors = data["data"]["node"]["reactors"]
+        edges = reactors["edges"]
+    except (KeyError, TypeError):
+        return None
+
+    reactions: List[Dict] = []
+    for edge in edges:
+        user = edge.get("node")
+        if user:
+            picture = user.get("profile_picture")
+            user_info = {
+                "id": user.get("id"),
+                "name": user.get("name"),
+                "profile_url": user.get("url") or user.get("profile_url"),
+                "profile_picture": picture.get("uri") if picture else None
+            }
+        else:
+            user_info = {"id": None, "name": None, "profile_url": None, "profile_picture": None}
+
+        if "feedback_reaction_info" in edge:
+            reaction_info = edge["feedback_reaction_info"]
+            if isinstance(reaction_info, dict):
+                reaction_type = reaction_types.get(reaction_info.get("id", ""), "LIKE")
+            else:
+                reaction_type = "UNKNOWN"
+        else:
+            reaction_type = "LIKE"
+
+        reactions.append({
+            "user": user_info,
+            "reaction_type": reaction_type,
+            "timestamp": None
+        })
+
+    return {
+        "reactions": reactions,
+        "page_info": reactors.get("page_info", {})
+    }
+
+
+def parse_comments_page(data: Any) -> Tuple[List[Dict], Optional[str]]:
+    """Extract the comments and next cursor of a decoded comments page"""
+    try:
+        comments_data = data["data"]["node"]["comment_rendering_instance_for_feed_location"]["comments"]
+        edges = comments_data.get("edges") or []
+    except (KeyError, TypeError, AttributeError):
+        return [], None
+
+    page_info = comments_data.get("page_info") or {}
+    next_cursor = page_info.get("end_cursor") if page_info.get("has_next_page") else None
+
+    comments: List[Dict] = []
+    for edge in edges:
+        node = edge.get("node") or {}
+        author_id = (node.get("author") or {}).get("id")
+        if not author_id:
+            continue
+        body = node.get("body")
+        comments.append({
+            "comment_id": node.get("id"),
+            "author_id": author_id,
+            "text": body.get("text", "") if body else "",
+            "created_time": node.get("created_time", 0)
+        })
+
+    return comments, next_cursor
+
+
+def parse_reactions_body(body: bytes, content_encoding: str,
+                         reaction_types: Dict[str, str]) -> Optional[Dict]:
+    """
+    Decode a reactions response body and extract its page
+
+    Returns None for HTML pages and unexpected structures.
+    Raises ValueError if the body is not valid JSON.
+    """
+    data = decode_graphql_body(body, content_encoding)
+    if data is None:
+        return None
+    return parse_reactions_page(data, reaction_types)
+
+
+def parse_comments_body(body: bytes, content_encoding: str) -> Optional[Tuple[List[Dict], Optional[str]]]:
+    """
+    Decode a comments response body and extract its page
+
+    Returns None for HTML pages.
+    Raises ValueError if the body is not valid JSON.
+    """
+    data = decode_graphql_body(body, content_encoding)
+    if data is None:
+        return None
+    return parse_comments_page(data)
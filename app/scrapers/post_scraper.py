@@ -0,0 +1,138 @@
+"""
+Facebook Post Scraper - reactions and comments of one post in one job
+Both pagination streams run interleaved on a single authenticated session.
+"""
+
+import time
+from typing import Optional, Dict, List, Iterator, Tuple
+
+from app.core.checkpoints import new_pagination_state
+from app.core.log import get_logger
+from app.scrapers.page_sizer import PageSizer
+from app.scrapers.reactions_scraper import FacebookReactionsScraper
+from app.scrapers.comments_scraper import FacebookCommentsScraper
+
+
+log = get_logger("posts")
+
+
+def interleave_pages(streams: Dict[str, Tuple[Iterator[List[Dict]], float, Dict]]) -> Iterator[Tuple[str, List[Dict]]]:
+    """
+    دمج عدة مولدات صفحات في حلقة واحدة: يُطلب من كل مولد صفحته التالية عند حلول موعدها
+
+    المولدات تُنشأ بتأخير صفر، والتأخير الخاص بكل منها (delay) يطبق هنا بين صفحاته،
+    فينتظر كل تدفق دوره بدون أن يوقف الآخر. التدفق الذي انتهت صفحاته (state["exhausted"])
+    يُحذف فوراً بدون انتظار موعده التالي
+    """
+    due = {section: 0.0 for section in streams}
+
+    while due:
+        section = min(due, key=due.get)
+        wait = due[section] - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+
+        pages, delay, state = streams[section]
+        page = next(pages, None)
+        if page is None:
+            del due[section]
+            continue
+
+        due[section] = time.monotonic() + delay
+        yield section, page
+
+        if state.get("exhausted"):
+            del due[section]
+
+
+def merge_post_results(reactions_result: Dict, comments_result: Dict) -> Dict:
+    """دمج نتيجتي التفاعلات والكومنتات في مستند واحد"""
+    result = {**comments_result, **reactions_result}
+    result["total_items"] = reactions_result["total_reactions"] + comments_result["total_comments"]
+
+    reasons = [
+        f"{section}: {section_result['interruption_reason']}"
+        for section, section_result in (("reactions", reactions_result), ("comments", comments_result))
+        if section_result.get("interrupted")
+    ]
+    if reasons:
+        result["interrupted"] = True
+        result["interruption_reason"] = "; ".join(reasons)
+
+    return result
+
+
+class FacebookPostScraper:
+    """سحب التفاعلات والكومنتات لبوست واحد معاً على نفس الـ session"""
+
+    def __init__(self):
+        """تهيئة الفئة"""
+        self.reactions_scraper = FacebookReactionsScraper()
+        self.comments_scraper = FacebookCommentsScraper()
+
+    def prepare_account(self, cookies_array: List[Dict]) -> Optional[str]:
+        """تحميل الكوكيز والتوكنز مرة واحدة للسكربرين (يُرجع رسالة الخطأ أو None)"""
+        error = self.reactions_scraper.prepare_account(cookies_array)
+        if error:
+            return error
+
+        if not self.comments_scraper.share_account(self.reactions_scraper):
+            return "فشل في استخراج التوكنز"
+
+        return None
+
+    def scrape_post_api(self, post_url: str, cookies_array: List[Dict], limit: int = 0,
+                        reactions_delay: float = 2.0, comments_delay: int = 10,
+                        max_pages: Optional[int] = None, result_writer=None) -> Dict:
+        """
+        سحب التفاعلات والكومنتات لبوست واحد - نسخة API
+
+        عند تمرير result_writer تكتب كل صفحة في قسمها (reactions أو comments) فور وصولها
+        """
+        try:
+            log.info("بدء سحب المنشور", post_url=post_url, limit=limit, max_pages=max_pages)
+
+            error = self.prepare_account(cookies_array)
+            if error:
+                return {"error": error}
+
+            reactions_scraper = self.reactions_scraper
+            comments_scraper = self.comments_scraper
+
+            post_id = reactions_scraper.extract_post_id_from_url(post_url)
+            feedback_id = reactions_scraper.smart_feedback_id_extractor(post_id, post_url) if post_id else None
+            comments_post_id = comments_scraper.extract_post_id(post_url)
+            if not feedback_id or not comments_post_id:
+                return {"error": "فشل في استخراج معرف البوست"}
+
+            reactions_summary = reactions_scraper.new_reactions_summary(keep_items=result_writer is None)
+            comments_summary = comments_scraper.new_comments_summary(keep_items=result_writer is None)
+            reactions_state = new_pagination_state()
+            comments_state = new_pagination_state()
+            page_sizer = PageSizer()
+
+            streams = {
+                "reactions": (reactions_scraper.iter_reaction_pages(feedback_id, limit, 0, reactions_state,
+                                                                     page_sizer), reactions_delay, reactions_state),
+                "comments": (comments_scraper.iter_comment_pages(comments_post_id, 0, max_pages,
+                                                                 comments_state), comments_delay, comments_state)
+            }
+            for section, page in interleave_pages(streams):
+                if section == "reactions":
+                    reactions_scraper.add_reactions_page(reactions_summary, page, result_writer, reactions_state)
+                else:
+                    comments_scraper.add_comments_page(comments_summary, page, result_writer, comments_state)
+
+            result = merge_post_results(
+                reactions_scraper.build_reactions_result(post_url, post_id, reactions_summary,
+                                                         reactions_state, page_sizer),
+                comments_scraper.build_comments_result(post_url, comments_summary, comments_state)
+            )
+
+            log.info("تم الانتهاء من سحب المنشور", reactions=reactions_summary['total'],
+                     comments=comments_summary['total'], interrupted=result.get('interruption_reason'))
+            return result
+
+        except Exception as e:
+            log.error("خطأ عام في السكربت", exc_info=True, error=str(e))
+            return {"error": f"خطأ عام في السكربت: {str(e)}"}
@@ -12,7 +12,22 @@ import base64
 import gzip
 import io
 from datetime import datetime
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Iterator
+
+from app.config import settings
+from app.core.token_cache import token_cache, is_stale_token_response
+from app.core.checkpoints import new_pagination_state
+from app.core.rate_limiter import rate_limiter
+from app.core.transport import transport_pool
+from app.core.log import get_logger
+from app.core.metrics import PAGES_SCRAPED, TOKEN_EXTRACTION_SECONDS, record_graphql_request
+from app.scrapers.page_sizer import PageSizer
+from app.scrapers.parse_pool import parse_pool
+from app.scrapers.parsing import parse_reactions_body
+from app.scrapers.token_scanner import scan_tokens
+
+
+log = get_logger("reactions")
 
 
 class FacebookReactionsScraper:
@@ -25,6 +40,7 @@ class FacebookReactionsScraper:
         self.lsd = None
         self.jazoest = "25729"
         self.user_id = None
+        self.account_key = None
         
         # إعدادات headers لـ GraphQL API
         self.api_headers = {
@@ -33,8 +49,8 @@ class FacebookReactionsScraper:
             'Accept-Language': 'en-US,en;q=0.9,ar;q=0.8',
             'Accept-Encoding': 'identity',  # تجنب مشاكل الضغط في GraphQL
             'Content-Type': 'application/x-www-form-urlencoded',
-            'Origin': 'https://www.facebook.com',
-            'Referer': 'https://www.facebook.com/',
+            'Origin': settings.FACEBOOK_BASE_URL,
+            'Referer': f'{settings.FACEBOOK_BASE_URL}/',
             'Cache-Control': 'no-cache',
             'Pragma': 'no-cache',
             'Sec-Fetch-Dest': 'empty',
@@ -77,14 +93,10 @@ class FacebookReactionsScraper:
     def load_cookies_from_array(self, cookies_array: List[Dict]) -> bool:
         """تحميل الكوكيز من array - للاستخدام في API"""
         try:
-            print(f"🔍 [DEBUG] بدء تحميل الكوكيز...")
-            print(f"🔍 [DEBUG] عدد الكوكيز المستلمة: {len(cookies_array)}")
-            
             facebook_cookies_count = 0
             for cookie in cookies_array:
                 if cookie.get('domain') == '.facebook.com':
                     facebook_cookies_count += 1
-                    print(f"🔍 [DEBUG] تحميل كوكي: {cookie['name']}")
                     
                     self.session.cookies.set(
                         cookie['name'], 
@@ -94,45 +106,42 @@ class FacebookReactionsScraper:
                     
                     if cookie['name'] == 'c_user':
                         self.user_id = cookie['value']
-                        print(f"🔍 [DEBUG] تم العثور على user_id: {self.user_id}")
             
-            print(f"🔍 [DEBUG] تم تحميل {facebook_cookies_count} كوكي من فيسبوك")
+            log.debug("تم تحميل الكوكيز", received=len(cookies_array),
+                      facebook_cookies=facebook_cookies_count, user_id=self.user_id)
             
             if not self.user_id:
-                print(f"❌ [DEBUG] لم يتم العثور على c_user في الكوكيز")
+                log.warning("لم يتم العثور على c_user في الكوكيز")
                 return False
             
-            print(f"✅ [DEBUG] تم تحميل الكوكيز بنجاح")
+            # مفتاح الحساب لمشاركة التوكنز بين المهام
+            self.account_key = token_cache.make_account_key(self.user_id, self.session.cookies.get('xs'))
+            # الـ session طويل العمر للحساب (اتصالات keep-alive مشتركة بين المهام)
+            self.session = transport_pool.get_session(self.account_key, self.session.cookies)
+            
             return True
             
         except Exception as e:
-            print(f"❌ [DEBUG] خطأ في تحميل الكوكيز: {e}")
-            import traceback
-            print(f"❌ [DEBUG] تفاصيل الخطأ:")
-            traceback.print_exc()
+            log.error("خطأ في تحميل الكوكيز", exc_info=True, error=str(e))
             return False
             
     def check_cookies_validity(self) -> bool:
         """التحقق من صحة الكوكيز بسرعة"""
         try:
-            print(f"🔍 [DEBUG] التحقق من صحة الكوكيز...")
-            
             # طلب سريع لاختبار الكوكيز
-            test_response = self.session.head('https://www.facebook.com/', timeout=10)
-            print(f"🔍 [DEBUG] حالة اختبار الكوكيز: {test_response.status_code}")
+            test_response = self.session.head(f'{settings.FACEBOOK_BASE_URL}/', timeout=10)
             
             # التحقق من وجود كوكيز أساسية
-            important_cookies = ['c_user', 'xs', 'datr']
-            for cookie_name in important_cookies:
-                if cookie_name in [cookie.name for cookie in self.session.cookies]:
-                    print(f"✅ [DEBUG] الكوكي {cookie_name} موجود")
-                else:
-                    print(f"❌ [DEBUG] الكوكي {cookie_name} مفقود")
+            if log.is_debug_enabled():
+                cookie_names = {cookie.name for cookie in self.session.cookies}
+                important_cookies = ['c_user', 'xs', 'datr']
+                log.debug("اختبار الكوكيز", status=test_response.status_code,
+                          missing=[name for name in important_cookies if name not in cookie_names])
                     
             return test_response.status_code in [200, 302]
             
         except Exception as e:
-            print(f"❌ [DEBUG] خطأ في التحقق من الكوكيز: {e}")
+            log.warning("خطأ في التحقق من الكوكيز", error=str(e))
             return True  # نتابع حتى لو فشل الاختبار
     
     def decompress_content(self, response) -> str:
@@ -141,10 +150,10 @@ class FacebookReactionsScraper:
             content_encoding = response.headers.get('content-encoding', '').lower()
             
             if content_encoding == 'gzip':
-                print(f"🔍 [DEBUG] إلغاء ضغط gzip يدوياً...")
+                log.debug("إلغاء ضغط المحتوى يدوياً", encoding=content_encoding)
                 return gzip.decompress(response.content).decode('utf-8')
             elif content_encoding == 'deflate':
-                print(f"🔍 [DEBUG] إلغاء ضغط deflate يدوياً...")
+                log.debug("إلغاء ضغط المحتوى يدوياً", encoding=content_encoding)
                 import zlib
                 return zlib.decompress(response.content).decode('utf-8')
             else:
@@ -152,7 +161,7 @@ class FacebookReactionsScraper:
                 return response.text
                 
         except Exception as e:
-            print(f"❌ [DEBUG] خطأ في إلغاء الضغط: {e}")
+            log.debug("خطأ في إلغاء الضغط", error=str(e))
             # كبديل، جرب response.text العادي
             try:
                 return response.text
@@ -162,47 +171,43 @@ class FacebookReactionsScraper:
     def extract_tokens(self) -> bool:
         """استخراج التوكنز المطلوبة من فيسبوك"""
         try:
-            print(f"🔍 [DEBUG] بدء استخراج التوكنز...")
-            print(f"🔍 [DEBUG] إرسال طلب GET إلى https://www.facebook.com/")
-            
             # محاولة أولى مع User-Agent الحالي
-            response = self.session.get('https://www.facebook.com/', 
+            response = self.session.get(f'{settings.FACEBOOK_BASE_URL}/', 
                                       headers=self.browser_headers, timeout=30)
             
             # إذا فشلت المحاولة الأولى، جرب user-agent آخر
             if response.status_code != 200:
-                print(f"🔍 [DEBUG] المحاولة الأولى فشلت ({response.status_code})، جاري المحاولة مع User-Agent مختلف...")
+                log.debug("المحاولة الأولى فشلت، جاري المحاولة مع User-Agent مختلف", status=response.status_code)
                 alternative_headers = self.browser_headers.copy()
                 alternative_headers['User-Agent'] = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                response = self.session.get('https://www.facebook.com/', 
+                response = self.session.get(f'{settings.FACEBOOK_BASE_URL}/', 
                                           headers=alternative_headers, timeout=30)
             
-            print(f"🔍 [DEBUG] حالة الاستجابة: {response.status_code}")
-            print(f"🔍 [DEBUG] حجم المحتوى الخام: {len(response.content)} بايت")
-            print(f"🔍 [DEBUG] Content-Type: {response.headers.get('content-type', 'غير محدد')}")
-            print(f"🔍 [DEBUG] Content-Encoding: {response.headers.get('content-encoding', 'غير محدد')}")
+            log.debug("استجابة الصفحة الرئيسية", status=response.status_code,
+                      size=len(response.content),
+                      content_type=response.headers.get('content-type'),
+                      content_encoding=response.headers.get('content-encoding'))
             
             if response.status_code != 200:
-                print(f"❌ [DEBUG] فشل الطلب مع حالة: {response.status_code}")
+                log.warning("فشل طلب الصفحة الرئيسية", status=response.status_code)
                 return False
             
             # التأكد من إلغاء ضغط المحتوى باستخدام الدالة المخصصة
             try:
                 content = self.decompress_content(response)
-                print(f"🔍 [DEBUG] حجم المحتوى بعد إلغاء الضغط: {len(content)} حرف")
                 
                 # التحقق من أن المحتوى نص صالح
                 if len(content) == 0:
-                    print(f"❌ [DEBUG] المحتوى فارغ")
+                    log.warning("محتوى الصفحة الرئيسية فارغ")
                     return False
                 
                 # التحقق من وجود HTML tags أساسية
                 if '<html' not in content.lower() and '<div' not in content.lower() and '<script' not in content.lower():
-                    print(f"❌ [DEBUG] المحتوى لا يبدو كـ HTML صحيح")
-                    print(f"🔍 [DEBUG] أول 200 حرف: {repr(content[:200])}")
+                    if log.is_debug_enabled():
+                        log.debug("المحتوى لا يبدو كـ HTML صحيح، محاولة مع headers مبسطة",
+                                  preview=repr(content[:200]))
                     
                     # محاولة إضافية مع headers مختلفة
-                    print(f"🔍 [DEBUG] محاولة مع headers مبسطة...")
                     simple_headers = {
                         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
                         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
@@ -211,251 +216,115 @@ class FacebookReactionsScraper:
                         'Connection': 'keep-alive',
                         'Upgrade-Insecure-Requests': '1'
                     }
-                    response = self.session.get('https://www.facebook.com/', 
+                    response = self.session.get(f'{settings.FACEBOOK_BASE_URL}/', 
                                               headers=simple_headers, timeout=30)
                     content = self.decompress_content(response)
-                    print(f"🔍 [DEBUG] حجم المحتوى الجديد: {len(content)} حرف")
                     
             except Exception as e:
-                print(f"❌ [DEBUG] خطأ في معالجة المحتوى: {e}")
-                import traceback
-                traceback.print_exc()
+                log.error("خطأ في معالجة محتوى الصفحة الرئيسية", exc_info=True, error=str(e))
                 return False
             
-            # حفظ محتوى الصفحة للديباجنج إذا لزم الأمر
-            try:
-                with open('debug_facebook_page.html', 'w', encoding='utf-8') as f:
-                    f.write(content)
-                print(f"🔍 [DEBUG] تم حفظ محتوى الصفحة في debug_facebook_page.html")
-            except:
-                pass
-            
-            # طباعة أول 500 حرف من المحتوى للديباجنج
-            print(f"🔍 [DEBUG] أول 500 حرف من المحتوى:")
-            print(f"{'='*50}")
-            print(content[:500])
-            print(f"{'='*50}")
-            
-            # التحقق من تسجيل الدخول والأخطاء أولاً (بطريقة أكثر دقة)
-            content_lower = content.lower()
-            
-            # فحص صفحات تسجيل الدخول الحقيقية فقط
-            login_indicators = [
-                'login form', 
-                'sign in form',
-                'loginform',
-                'please enter your password',
-                'enter your password',
-                'تسجيل الدخول إلى فيسبوك',
-                'ادخل كلمة المرور',
-                'log into facebook'
-            ]
-            
-            if any(indicator in content_lower for indicator in login_indicators):
-                print(f"❌ [DEBUG] يبدو أن فيسبوك يطلب تسجيل الدخول - الكوكيز قد تكون منتهية الصلاحية")
+            # حفظ محتوى الصفحة للديباجنج (فقط عند تفعيل debug)
+            if log.is_debug_enabled():
+                try:
+                    with open('debug_facebook_page.html', 'w', encoding='utf-8') as f:
+                        f.write(content)
+                    log.debug("تم حفظ محتوى الصفحة", path='debug_facebook_page.html', size=len(content),
+                              preview=content[:500])
+                except OSError:
+                    pass
+            
+            # استخراج fb_dtsg و lsd و jazoest مع فحص صفحات تسجيل الدخول والأخطاء
+            if not self.apply_scanned_tokens(scan_tokens(content)):
+                # عرض النصوص القريبة من dtsg/token للتشخيص (فقط عند تفعيل debug)
+                if log.is_debug_enabled():
+                    log.debug("لم يتم العثور على fb_dtsg بأي نمط",
+                              dtsg_matches=re.findall(r'.{0,50}dtsg.{0,50}', content, re.IGNORECASE)[:5],
+                              token_matches=re.findall(r'.{0,30}token.{0,30}', content, re.IGNORECASE)[:5])
                 return False
             
-            # فحص صفحات الخطأ
-            error_indicators = [
-                'page not found',
-                'this page isn\'t available',
-                'content not found',
-                'error 404',
-                'الصفحة غير موجودة'
-            ]
-            
-            if any(indicator in content_lower for indicator in error_indicators):
-                print(f"❌ [DEBUG] فيسبوك يعرض صفحة خطأ")
-                return False
-            
-            # فحص checkpoint/security
-            security_indicators = [
-                'security checkpoint',
-                'verify your identity',
-                'account temporarily locked',
-                'نقطة تفتيش أمنية',
-                'تأكيد الهوية'
-            ]
-            
-            if any(indicator in content_lower for indicator in security_indicators):
-                print(f"❌ [DEBUG] فيسبوك يطلب تأكيد الأمان - قد تحتاج لتسجيل دخول جديد")
-                return False
-            
-            print(f"✅ [DEBUG] الصفحة تبدو طبيعية، جاري البحث عن التوكنز...")
-            
-            # استخراج fb_dtsg
-            print(f"🔍 [DEBUG] البحث عن fb_dtsg...")
-            dtsg_patterns = [
-                # الأنماط التقليدية
-                r'"DTSGInitialData",\[\],\{"token":"([^"]+)"',
-                r'"dtsg":\{"token":"([^"]+)"',
-                r'fb_dtsg":"([^"]+)"',
-                r'DTSGInitialData.*?"token":"([^"]+)"',
-                r'"fb_dtsg":"([^"]+)"',
-                r'fb_dtsg["\']?\s*:\s*["\']([^"\']+)["\']',
-                r'name="fb_dtsg"\s+value="([^"]+)"',
-                r'fb_dtsg.*?value="([^"]+)"',
-                r'"token":"([a-zA-Z0-9_-]{20,})"',
-                # أنماط جديدة للصيغة الحديثة من فيسبوك
-                r'"dtsg"[^"]*"[^"]*"([a-zA-Z0-9_-]{20,})"',
-                r'"LSD"[^"]*"[^"]*"([a-zA-Z0-9_-]{20,})"',
-                r'"token":\s*"([a-zA-Z0-9_-]{20,})"',
-                r'DTSG[^a-zA-Z0-9]*([a-zA-Z0-9_-]{20,})',
-                r'"serverJSData"[^}]*"dtsg"[^"]*"([a-zA-Z0-9_-]{20,})"',
-                r'"dtsg_ag":"([^"]+)"',
-                r'"asyncParams"[^}]*"fb_dtsg":"([^"]+)"'
-            ]
-            
-            for i, pattern in enumerate(dtsg_patterns):
-                print(f"🔍 [DEBUG] تجريب نمط fb_dtsg #{i+1}: {pattern}")
-                match = re.search(pattern, content)
-                if match:
-                    self.fb_dtsg = match.group(1)
-                    print(f"✅ [DEBUG] تم العثور على fb_dtsg: {self.fb_dtsg[:20]}...")
-                    break
-                else:
-                    print(f"❌ [DEBUG] لم يتم العثور على fb_dtsg بالنمط #{i+1}")
-            
-            if not self.fb_dtsg:
-                print(f"❌ [DEBUG] فشل في العثور على fb_dtsg بأي نمط")
-                
-                # محاولة استخراج من JSON مضمن
-                print(f"🔍 [DEBUG] البحث في البيانات المضمنة...")
-                json_patterns = [
-                    r'"server_timestamps":true[^}]*"fb_dtsg":"([^"]+)"',
-                    r'"__spinner[^}]*"fb_dtsg":"([^"]+)"',
-                    r'"asyncSignal[^}]*"fb_dtsg":"([^"]+)"',
-                    r'"__async[^}]*fb_dtsg[^"]*"([a-zA-Z0-9_-]{20,})"'
-                ]
-                
-                for i, pattern in enumerate(json_patterns):
-                    print(f"🔍 [DEBUG] تجريب نمط JSON #{i+1}")
-                    match = re.search(pattern, content)
-                    if match:
-                        self.fb_dtsg = match.group(1)
-                        print(f"✅ [DEBUG] تم العثور على fb_dtsg من JSON: {self.fb_dtsg[:20]}...")
-                        break
-                
-                if not self.fb_dtsg:
-                    # البحث عن أي نصوص تحتوي على dtsg أو token
-                    print(f"🔍 [DEBUG] البحث عن أي نصوص تحتوي على 'dtsg':")
-                    dtsg_matches = re.findall(r'.{0,50}dtsg.{0,50}', content, re.IGNORECASE)
-                    for match in dtsg_matches[:5]:  # عرض أول 5 نتائج
-                        print(f"  - {match}")
-                    
-                    print(f"🔍 [DEBUG] البحث عن أي نصوص تحتوي على 'token':")
-                    token_matches = re.findall(r'.{0,30}token.{0,30}', content, re.IGNORECASE)
-                    for match in token_matches[:5]:  # عرض أول 5 نتائج
-                        print(f"  - {match}")
-                    
-                    # كحل أخير، نبحث عن أي توكن يبدو صحيح
-                    print(f"🔍 [DEBUG] البحث عن أي توكنز محتملة...")
-                    potential_tokens = re.findall(r'"([a-zA-Z0-9_-]{20,})"', content)
-                    if potential_tokens:
-                        # اختر أطول توكن (عادة fb_dtsg يكون طويل)
-                        longest_token = max(potential_tokens, key=len)
-                        if len(longest_token) >= 30:  # fb_dtsg عادة أطول من 30 حرف
-                            self.fb_dtsg = longest_token
-                            print(f"🔍 [DEBUG] تم العثور على توكن محتمل: {self.fb_dtsg[:20]}...")
-            
-            # استخراج lsd
-            print(f"🔍 [DEBUG] البحث عن lsd...")
-            lsd_patterns = [
-                r'"LSD",\[\],\{"token":"([^"]+)"',
-                r'"token":"([^"]{20,})"',
-                r'"lsd":"([^"]+)"',
-                r'lsd["\']?\s*:\s*["\']([^"\']+)["\']',
-                r'name="lsd"\s+value="([^"]+)"',
-                r'lsd.*?value="([^"]+)"',
-                r'"LSD".*?"token":"([^"]+)"',
-                # أنماط إضافية للمحتوى المضغوط
-                r'lsd[^a-zA-Z0-9]+([a-zA-Z0-9_-]{15,})',
-                r'LSD[^a-zA-Z0-9]+([a-zA-Z0-9_-]{15,})'
-            ]
-            
-            for i, pattern in enumerate(lsd_patterns):
-                print(f"🔍 [DEBUG] تجريب نمط lsd #{i+1}: {pattern}")
-                match = re.search(pattern, content)
-                if match:
-                    self.lsd = match.group(1)
-                    print(f"✅ [DEBUG] تم العثور على lsd: {self.lsd[:20]}...")
-                    break
-                else:
-                    print(f"❌ [DEBUG] لم يتم العثور على lsd بالنمط #{i+1}")
-            
-            if not self.lsd:
-                print(f"❌ [DEBUG] فشل في العثور على lsd بأي نمط")
-                # البحث عن أي نصوص تحتوي على LSD
-                print(f"🔍 [DEBUG] البحث عن أي نصوص تحتوي على 'LSD':")
-                lsd_matches = re.findall(r'.{0,50}LSD.{0,50}', content, re.IGNORECASE)
-                for match in lsd_matches[:5]:  # عرض أول 5 نتائج
-                    print(f"  - {match}")
-            
             result = bool(self.fb_dtsg)
-            print(f"🔍 [DEBUG] نتيجة استخراج التوكنز: {result}")
-            print(f"🔍 [DEBUG] fb_dtsg: {'موجود' if self.fb_dtsg else 'غير موجود'}")
-            print(f"🔍 [DEBUG] lsd: {'موجود' if self.lsd else 'غير موجود'}")
+            log.debug("نتيجة استخراج التوكنز", fb_dtsg=bool(self.fb_dtsg), lsd=bool(self.lsd))
             
             return result
             
         except Exception as e:
-            print(f"❌ [DEBUG] خطأ في استخراج التوكنز: {e}")
-            import traceback
-            print(f"❌ [DEBUG] تفاصيل الخطأ:")
-            traceback.print_exc()
+            log.error("خطأ في استخراج التوكنز", exc_info=True, error=str(e))
+            return False
+    
+    def apply_scanned_tokens(self, tokens: Dict) -> bool:
+        """حفظ التوكنز المستخرجة بواسطة scan_tokens مع تفسير الصفحات التي لا تحتوي عليها"""
+        if not tokens['fb_dtsg']:
+            if tokens['marker'] == 'login':
+                log.warning("يبدو أن فيسبوك يطلب تسجيل الدخول - الكوكيز قد تكون منتهية الصلاحية")
+            elif tokens['marker'] == 'error':
+                log.warning("فيسبوك يعرض صفحة خطأ")
+            elif tokens['marker'] == 'checkpoint':
+                log.warning("فيسبوك يطلب تأكيد الأمان - قد تحتاج لتسجيل دخول جديد")
             return False
+        
+        self.fb_dtsg = tokens['fb_dtsg']
+        self.lsd = tokens['lsd'] or self.lsd
+        self.jazoest = tokens['jazoest'] or self.jazoest
+        return True
     
     def extract_tokens_alternative(self) -> bool:
         """طريقة بديلة لاستخراج التوكنز من صفحة مختلفة"""
         try:
-            print(f"🔍 [DEBUG] محاولة استخراج التوكنز من طريقة بديلة...")
-            
             # جرب صفحة mobile facebook
             mobile_headers = self.browser_headers.copy()
             mobile_headers['User-Agent'] = 'Mozilla/5.0 (iPhone; CPU iPhone OS 15_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/15.0 Mobile/15E148 Safari/604.1'
             
-            response = self.session.get('https://m.facebook.com/', 
+            response = self.session.get(f'{settings.FACEBOOK_MOBILE_URL}/', 
                                       headers=mobile_headers, timeout=30)
             
             if response.status_code == 200:
                 content = self.decompress_content(response)
-                print(f"🔍 [DEBUG] حجم محتوى الموبايل: {len(content)} حرف")
+                log.debug("استخراج التوكنز من صفحة الموبايل", size=len(content))
                 
                 # البحث في محتوى الموبايل
-                dtsg_patterns = [
-                    r'name="fb_dtsg"\s+value="([^"]+)"',
-                    r'fb_dtsg.*?value="([^"]+)"',
-                    r'"dtsg":"([^"]+)"',
-                    r'dtsg[^a-zA-Z0-9]+([a-zA-Z0-9_-]{20,})'
-                ]
-                
-                for pattern in dtsg_patterns:
-                    match = re.search(pattern, content)
-                    if match:
-                        self.fb_dtsg = match.group(1)
-                        print(f"✅ [DEBUG] تم العثور على fb_dtsg من الموبايل: {self.fb_dtsg[:20]}...")
-                        break
-                
-                # البحث عن lsd
-                lsd_patterns = [
-                    r'name="lsd"\s+value="([^"]+)"',
-                    r'lsd.*?value="([^"]+)"',
-                    r'"lsd":"([^"]+)"'
-                ]
-                
-                for pattern in lsd_patterns:
-                    match = re.search(pattern, content)
-                    if match:
-                        self.lsd = match.group(1)
-                        print(f"✅ [DEBUG] تم العثور على lsd من الموبايل: {self.lsd[:20]}...")
-                        break
+                if self.apply_scanned_tokens(scan_tokens(content)):
+                    log.debug("تم العثور على fb_dtsg من الموبايل")
             
             return bool(self.fb_dtsg)
             
         except Exception as e:
-            print(f"❌ [DEBUG] خطأ في الطريقة البديلة: {e}")
+            log.warning("خطأ في الطريقة البديلة لاستخراج التوكنز", error=str(e))
             return False
 
+    def load_tokens(self, force_refresh: bool = False) -> bool:
+        """تحميل التوكنز من الكاش المشترك أو استخراجها من فيسبوك مرة واحدة لكل حساب"""
+        if force_refresh:
+            log.info("التوكنز منتهية الصلاحية، جاري التحديث", user_id=self.user_id)
+            token_cache.invalidate(self.account_key, self.fb_dtsg)
+        
+        tokens = token_cache.get_or_fetch(self.account_key, self.fetch_fresh_tokens)
+        if not tokens:
+            return False
+        
+        self.fb_dtsg = tokens['fb_dtsg']
+        self.lsd = tokens.get('lsd')
+        self.jazoest = tokens.get('jazoest') or self.jazoest
+        return True
+    
+    def fetch_fresh_tokens(self) -> Optional[Dict]:
+        """استخراج توكنز جديدة من فيسبوك (يستدعى من الكاش عند الحاجة فقط)"""
+        self.fb_dtsg = None
+        self.lsd = None
+        started_at = time.monotonic()
+        
+        # التحقق من صحة الكوكيز
+        self.check_cookies_validity()
+        
+        if not self.extract_tokens():
+            log.info("فشل استخراج التوكنز من الطريقة الأساسية، جاري المحاولة بالطريقة البديلة")
+            if not self.extract_tokens_alternative():
+                TOKEN_EXTRACTION_SECONDS.labels("failed").observe(time.monotonic() - started_at)
+                return None
+        
+        TOKEN_EXTRACTION_SECONDS.labels("ok").observe(time.monotonic() - started_at)
+        return {'fb_dtsg': self.fb_dtsg, 'lsd': self.lsd, 'jazoest': self.jazoest}
+
     def extract_post_id_from_url(self, post_url: str) -> Optional[str]:
         """استخراج معرف البوست من الرابط"""
         try:
@@ -482,7 +351,7 @@ class FacebookReactionsScraper:
             return None
             
         except Exception as e:
-            print(f"❌ خطأ في استخراج معرف البوست: {e}")
+            log.warning("خطأ في استخراج معرف البوست", error=str(e))
             return None
 
     def create_feedback_target_id(self, post_id: str) -> str:
@@ -498,105 +367,229 @@ class FacebookReactionsScraper:
             return feedback_target_id
             
         except Exception as e:
-            print(f"❌ خطأ في إنشاء feedback_id: {e}")
+            log.warning("خطأ في إنشاء feedback_id", error=str(e))
             return None
 
     def get_reactions(self, feedback_id: str, limit: int = 0, delay: float = 2.0) -> List[Dict[str, Any]]:
         """جلب التفاعلات من البوست"""
+        all_reactions = []
+        for page in self.iter_reaction_pages(feedback_id, limit, delay):
+            all_reactions.extend(page)
+        return all_reactions
+
+    def iter_reaction_pages(self, feedback_id: str, limit: int = 0, delay: float = 2.0,
+                            state: Optional[Dict] = None,
+                            page_sizer: Optional[PageSizer] = None) -> Iterator[List[Dict[str, Any]]]:
+        """
+        جلب التفاعلات صفحة بصفحة (generator) بدون تجميعها في الذاكرة
+        
+        state (من new_pagination_state) يُحدَّث قبل تسليم كل صفحة ويسمح بالاستئناف من آخر cursor،
+        و page_sizer يحدد حجم كل صفحة ويسجل زمن كل طلب
+        """
+        if state is None:
+            state = new_pagination_state()
+        if page_sizer is None:
+            page_sizer = PageSizer(state.get("page_size"))
+        
         try:
-            all_reactions = []
-            cursor = None
-            page_count = 0
+            fetched_count = state["items"]
+            cursor = state["cursor"]
+            page_count = state["page_count"]
+            tokens_refreshed = False
             
             while True:
                 page_count += 1
                 
-                # تحديد عدد التفاعلات لهذا الطلب
-                if limit == 0:
-                    count_per_request = 50
-                else:
-                    remaining = limit - len(all_reactions)
-                    count_per_request = min(10, remaining)
-                
-                # إعداد variables للطلب
-                variables = {
-                    "count": count_per_request,
-                    "cursor": cursor,
-                    "feedbackTargetID": feedback_id,
-                    "reactionID": None,
-                    "scale": 1,
-                    "id": feedback_id
-                }
-                
-                # إعداد payload
-                payload = self.build_request_payload(variables, page_count)
+                # تحديد عدد التفاعلات لهذا الطلب (حجم متكيف)
+                count_per_request = page_sizer.next_size(limit - fetched_count if limit > 0 else None)
                 
-                print(f"🔍 [DEBUG] إعداد payload...")
-                print(f"🔍 [DEBUG] fb_dtsg: {payload.get('fb_dtsg', 'غير موجود')[:20]}...")
-                print(f"🔍 [DEBUG] lsd: {payload.get('lsd', 'غير موجود')[:20]}...")
-                print(f"🔍 [DEBUG] user_id: {payload.get('__user', 'غير موجود')}")
-                print(f"🔍 [DEBUG] doc_id: {payload.get('doc_id', 'غير موجود')}")
-                
-                # إعداد headers
-                headers = self.api_headers.copy()
-                headers['x-fb-lsd'] = self.lsd
-                
-                print(f"🔍 [DEBUG] إعداد headers...")
-                print(f"🔍 [DEBUG] User-Agent: {headers.get('User-Agent', 'غير موجود')[:50]}...")
-                print(f"🔍 [DEBUG] x-fb-lsd: {headers.get('x-fb-lsd', 'غير موجود')[:20]}...")
+                # إعداد payload و headers
+                payload, headers = self.build_reactions_request(feedback_id, cursor, count_per_request, page_count)
                 
                 # إرسال الطلب
-                print(f"🔍 [DEBUG] إرسال طلب GraphQL للصفحة {page_count}")
-                print(f"🔍 [DEBUG] معاملات الطلب: count={count_per_request}, cursor={cursor}")
+                log.debug("إرسال طلب GraphQL", page=page_count, count=count_per_request, cursor=cursor)
                 
+                # انتظار دور الحساب (حد مشترك بين كل المهام على نفس الحساب)
+                rate_limiter.acquire(self.user_id)
+                started_at = time.monotonic()
                 response = self.session.post(
-                    'https://www.facebook.com/api/graphql/',
+                    f'{settings.FACEBOOK_BASE_URL}/api/graphql/',
                     data=payload,
                     headers=headers,
                     timeout=30
                 )
+                elapsed = time.monotonic() - started_at
+                record_graphql_request("reactions", response.status_code, elapsed, len(response.content))
                 
-                print(f"🔍 [DEBUG] حالة استجابة GraphQL: {response.status_code}")
-                print(f"🔍 [DEBUG] حجم الاستجابة: {len(response.content)} بايت")
-                print(f"🔍 [DEBUG] Content-Type: {response.headers.get('content-type', 'غير محدد')}")
+                log.debug("استجابة GraphQL", page=page_count, status=response.status_code,
+                          size=len(response.content), latency_ms=round(elapsed * 1000, 1))
                 
                 if response.status_code != 200:
-                    print(f"❌ [DEBUG] فشل طلب GraphQL مع حالة {response.status_code}")
-                    print(f"❌ [DEBUG] محتوى الخطأ: {response.text[:500]}")
+                    log.warning("فشل طلب GraphQL", page=page_count, status=response.status_code,
+                                latency_ms=round(elapsed * 1000, 1))
+                    # إعادة نفس الصفحة بحجم أصغر قبل الاستسلام
+                    if page_sizer.record_failure(page_count, count_per_request, elapsed, f"http_{response.status_code}"):
+                        page_count -= 1
+                        time.sleep(delay)
+                        continue
+                    state["interrupted"] = f"http_{response.status_code}"
                     break
                 
+                # التوكنز منتهية الصلاحية: تحديثها مرة واحدة وإعادة نفس الصفحة
+                if is_stale_token_response(response.content):
+                    if tokens_refreshed or not self.load_tokens(force_refresh=True):
+                        log.warning("فيسبوك رفض التوكنز حتى بعد التحديث", page=page_count)
+                        state["interrupted"] = "stale_tokens"
+                        break
+                    tokens_refreshed = True
+                    page_count -= 1
+                    continue
+                
                 # معالجة الاستجابة
                 reactions_data = self.process_response(response)
                 if not reactions_data:
+                    if page_sizer.record_failure(page_count, count_per_request, elapsed, "invalid_response"):
+                        page_count -= 1
+                        time.sleep(delay)
+                        continue
+                    state["interrupted"] = "invalid_response"
                     break
                 
-                new_reactions = reactions_data.get('reactions', [])
-                all_reactions.extend(new_reactions)
+                tokens_refreshed = False
                 
-                # التحقق من وجود صفحات أخرى
+                new_reactions = reactions_data.get('reactions', [])
                 page_info = reactions_data.get('page_info', {})
                 has_next_page = page_info.get('has_next_page', False)
+                page_sizer.record_success(page_count, count_per_request, len(new_reactions), has_next_page, elapsed)
+                PAGES_SCRAPED.labels("reactions").inc()
+                
+                # قطع الصفحة للحد المطلوب (فقط إذا كان هناك حد محدد)
+                if limit > 0 and fetched_count + len(new_reactions) > limit:
+                    new_reactions = new_reactions[:limit - fetched_count]
+                
+                fetched_count += len(new_reactions)
+                
+                # التحقق من وجود صفحات أخرى
                 cursor = page_info.get('end_cursor')
                 
+                # تحديث حالة الترقيم قبل تسليم الصفحة (نقطة الاستئناف هي الصفحة التالية)
+                state.update(cursor=cursor, page_count=page_count, items=fetched_count,
+                             exhausted=not has_next_page or not cursor, page_size=page_sizer.size)
+                yield new_reactions
+                
                 # شروط التوقف
-                if not has_next_page or not cursor:
+                if state["exhausted"]:
                     break
                 
-                if limit > 0 and len(all_reactions) >= limit:
+                if limit > 0 and fetched_count >= limit:
                     break
                 
                 # تأخير قبل الطلب التالي
                 time.sleep(delay)
             
-            # قطع القائمة للحد المطلوب (فقط إذا كان هناك حد محدد)
-            if limit > 0 and len(all_reactions) > limit:
-                all_reactions = all_reactions[:limit]
-            
-            return all_reactions
-            
         except Exception as e:
-            print(f"❌ خطأ في جلب التفاعلات: {e}")
-            return []
+            log.error("خطأ في جلب التفاعلات", error=str(e))
+            state["interrupted"] = str(e)
+
+    def new_reactions_summary(self, keep_items: bool) -> Dict:
+        """إنشاء ملخص فارغ يتم تحديثه صفحة بصفحة"""
+        return {"total": 0, "stats": {}, "reactions": [] if keep_items else None}
+
+    def add_reactions_page(self, summary: Dict, page: List[Dict], result_writer=None,
+                           state: Optional[Dict] = None):
+        """إضافة صفحة تفاعلات للملخص وكتابتها على القرص إن وجد writer"""
+        if result_writer:
+            result_writer.write_items(page, 'reactions', state)
+        else:
+            summary["reactions"].extend(page)
+        
+        self.count_reactions(summary, page)
+
+    def count_reactions(self, summary: Dict, reactions):
+        """حساب إحصائيات التفاعلات"""
+        for reaction in reactions:
+            summary["total"] += 1
+            reaction_type = reaction.get('reaction_type', 'UNKNOWN')
+            summary["stats"][reaction_type] = summary["stats"].get(reaction_type, 0) + 1
+
+    def prepare_pagination(self, summary: Dict, result_writer=None, resume_state: Optional[Dict] = None) -> Dict:
+        """تجهيز حالة الترقيم، مع استعادة الإحصائيات من القرص عند الاستئناف"""
+        state = new_pagination_state()
+        
+        if resume_state and result_writer:
+            state.update(resume_state)
+            state["interrupted"] = None
+            self.count_reactions(summary, result_writer.iter_written_items('reactions'))
+        
+        return state
+
+    def merge_reactions_delta(self, summary: Dict, delta_tracker, result_writer=None,
+                              state: Optional[Dict] = None):
+        """
+        فصل التفاعلات الجديدة أو المتغيرة (delta) عن المهمة السابقة وإكمال اللقطة بتفاعلاتها التي لم تُسحب مجدداً
+        
+        إذا وصل الترقيم لآخر صفحة فما لم يظهر قد أزيل، فلا يضاف من المهمة السابقة
+        """
+        add_previous = None
+        if not (state and state["exhausted"]):
+            add_previous = lambda items: self.add_reactions_page(summary, items, result_writer)
+        
+        if result_writer:
+            delta_tracker.merge(result_writer.iter_written_items('reactions'),
+                                lambda items: result_writer.write_items(items, 'delta'), add_previous)
+        else:
+            summary["delta"] = []
+            delta_tracker.merge(list(summary["reactions"]), summary["delta"].extend, add_previous)
+
+    def build_reactions_result(self, post_url: str, post_id: str, summary: Dict,
+                               state: Optional[Dict] = None,
+                               page_sizer: Optional[PageSizer] = None) -> Dict:
+        """بناء النتيجة النهائية (بدون القائمة إذا تمت كتابتها على القرص)"""
+        result = {
+            "success": True,
+            "post_url": post_url,
+            "post_id": post_id,
+            "total_reactions": summary["total"],
+            "reaction_stats": summary["stats"],
+            "scraped_at": datetime.now().isoformat()
+        }
+        
+        if page_sizer:
+            result["pagination"] = page_sizer.get_summary()
+        
+        if summary["reactions"] is not None:
+            result["reactions"] = summary["reactions"]
+        if summary.get("delta") is not None:
+            result["delta"] = summary["delta"]
+        
+        # توقف الترقيم قبل النهاية: النتيجة جزئية ويمكن استئنافها
+        if state and state.get("interrupted"):
+            result["interrupted"] = True
+            result["interruption_reason"] = state["interrupted"]
+        
+        return result
+
+    def build_reactions_request(self, feedback_id: str, cursor: Optional[str],
+                                count_per_request: int, page_count: int) -> tuple:
+        """بناء payload و headers لطلب صفحة تفاعلات (مشترك بين محركي thread و async)"""
+        # إعداد variables للطلب
+        variables = {
+            "count": count_per_request,
+            "cursor": cursor,
+            "feedbackTargetID": feedback_id,
+            "reactionID": None,
+            "scale": 1,
+            "id": feedback_id
+        }
+        
+        # إعداد payload
+        payload = self.build_request_payload(variables, page_count)
+        
+        # إعداد headers
+        headers = self.api_headers.copy()
+        headers['x-fb-lsd'] = self.lsd or ''
+        
+        return payload, headers
 
     def build_request_payload(self, variables: Dict, page_count: int) -> Dict:
         """بناء payload للطلب"""
@@ -629,192 +622,123 @@ class FacebookReactionsScraper:
         }
 
     def process_response(self, response) -> Optional[Dict]:
-        """معالجة استجابة API"""
+        """معالجة استجابة API (فك ترميز الـ body مرة واحدة واستخراج reactors و page_info فقط)"""
         try:
-            print(f"🔍 [DEBUG] بدء معالجة استجابة API...")
-            
-            # التحقق من Content-Type
-            content_type = response.headers.get('content-type', '').lower()
-            print(f"🔍 [DEBUG] Content-Type: {content_type}")
-            
-            # إذا كان المحتوى مضغوط أو binary، استخدم الدالة المخصصة
-            if 'html' in content_type or len(response.content) != len(response.text):
-                print(f"🔍 [DEBUG] محتوى مضغوط أو binary، استخدام إلغاء الضغط...")
-                response_text = self.decompress_content(response)
-            else:
-                response_text = response.text
-            
-            print(f"🔍 [DEBUG] حجم النص الخام: {len(response_text)} حرف")
-            
-            if not response_text.strip():
-                print(f"❌ [DEBUG] الاستجابة فارغة!")
-                return None
-            
-            print(f"🔍 [DEBUG] أول 200 حرف من الاستجابة:")
-            print(f"{'='*50}")
-            print(repr(response_text[:200]))
-            print(f"{'='*50}")
-            
-            # التحقق من صيغة HTML خاطئة
-            if response_text.strip().startswith('<'):
-                print(f"❌ [DEBUG] فيسبوك يعيد HTML بدلاً من JSON - قد تكون مشكلة authentication أو rate limiting")
-                return None
-            
-            if response_text.startswith('for (;;);'):
-                print(f"🔍 [DEBUG] إزالة بادئة فيسبوك...")
-                response_text = response_text[9:]
-            
-            print(f"🔍 [DEBUG] محاولة تحليل JSON...")
-            data = json.loads(response_text)
-            print(f"✅ [DEBUG] تم تحليل JSON بنجاح")
-            
-            # استخراج التفاعلات
-            if 'data' in data and 'node' in data['data']:
-                node = data['data']['node']
-                
-                if 'reactors' in node and 'edges' in node['reactors']:
-                    reactions = []
-                    
-                    for edge in node['reactors']['edges']:
-                        reaction_info = {
-                            'user': self.extract_user_info(edge),
-                            'reaction_type': self.extract_reaction_type(edge),
-                            'timestamp': self.extract_timestamp(edge)
-                        }
-                        reactions.append(reaction_info)
-                    
-                    page_info = node['reactors'].get('page_info', {})
-                    
-                    return {
-                        'reactions': reactions,
-                        'page_info': page_info
-                    }
-            
-            return None
-            
-        except json.JSONDecodeError as e:
-            print(f"❌ خطأ في معالجة JSON: {e}")
+            self.log_response(response)
+            reactions_data = parse_pool.run(parse_reactions_body, response.content,
+                                            response.headers.get('content-encoding', '').lower(),
+                                            self.reaction_types)
+            return self.check_reactions_data(reactions_data)
+            
+        except ValueError as e:
+            log.warning("خطأ في معالجة JSON", error=str(e))
             return None
         except Exception as e:
-            print(f"❌ خطأ في معالجة الاستجابة: {e}")
+            log.warning("خطأ في معالجة الاستجابة", error=str(e))
             return None
 
-    def extract_user_info(self, edge: Dict) -> Dict:
-        """استخراج معلومات المستخدم"""
-        try:
-            user_info = {
-                'id': None,
-                'name': None,
-                'profile_url': None,
-                'profile_picture': None
-            }
-            
-            if 'node' in edge:
-                user = edge['node']
-                user_info['id'] = user.get('id')
-                user_info['name'] = user.get('name')
-                user_info['profile_url'] = user.get('url') or user.get('profile_url')
-                
-                if 'profile_picture' in user and user['profile_picture']:
-                    user_info['profile_picture'] = user['profile_picture'].get('uri')
-            
-            return user_info
-            
-        except Exception:
-            return {'id': None, 'name': None, 'profile_url': None, 'profile_picture': None}
+    def log_response(self, response):
+        """تسجيل الاستجابة في وضع debug"""
+        if log.is_debug_enabled():
+            log.debug("استجابة API", content_type=response.headers.get('content-type'),
+                      size=len(response.content), preview=repr(response.content[:200]))
 
-    def extract_reaction_type(self, edge: Dict) -> str:
-        """استخراج نوع التفاعل"""
-        try:
-            if 'feedback_reaction_info' in edge:
-                reaction_info = edge['feedback_reaction_info']
-                reaction_id = reaction_info.get('id', '')
-                return self.reaction_types.get(reaction_id, 'LIKE')
-            
-            return 'LIKE'
-        except Exception:
-            return 'UNKNOWN'
+    def check_reactions_data(self, reactions_data: Optional[Dict]) -> Optional[Dict]:
+        """تسجيل تحذير عند استجابة بدون reactors"""
+        if reactions_data is None:
+            log.warning("استجابة فارغة أو HTML بدلاً من JSON - قد تكون مشكلة authentication أو rate limiting")
+        return reactions_data
 
-    def extract_timestamp(self, edge: Dict) -> Optional[str]:
-        """استخراج وقت التفاعل"""
-        try:
-            return None
-        except Exception:
-            return None
+    def share_account(self, scraper) -> bool:
+        """استخدام session وكوكيز سكربر آخر محمّل مسبقاً (بدون تحميل الكوكيز أو جلب الصفحة الرئيسية مرة أخرى)"""
+        self.session = scraper.session
+        self.user_id = scraper.user_id
+        self.account_key = scraper.account_key
+        
+        # التوكنز موجودة في الكاش المشترك لنفس الحساب
+        return self.load_tokens()
+
+    def new_post_scraper(self) -> Optional["FacebookReactionsScraper"]:
+        """سكربر لبوست واحد من دفعة: نفس الـ session والحساب مع توكنز خاصة به (None إذا فشل تحميل التوكنز)"""
+        # كل بوست يحدّث توكنزه بنفسه: تحديث بوست لا يترك توكنز البوستات الأخرى فارغة
+        scraper = type(self)()
+        return scraper if scraper.share_account(self) else None
+
+    def prepare_account(self, cookies_array: List[Dict]) -> Optional[str]:
+        """تحميل الكوكيز والتوكنز مرة واحدة للحساب (يُرجع رسالة الخطأ أو None)"""
+        if not self.load_cookies_from_array(cookies_array):
+            return "فشل في تحميل الكوكيز"
+        
+        # استخراج التوكنز (من الكاش المشترك إن وجدت)
+        if not self.load_tokens():
+            log.warning("فشل في استخراج التوكنز من جميع الطرق", user_id=self.user_id)
+            return "فشل في استخراج التوكنز"
+        
+        return None
 
     def scrape_reactions_api(self, post_url: str, cookies_array: List[Dict], 
-                           limit: int = 0, delay: float = 2.0) -> Dict:
-        """الدالة الرئيسية لسحب التفاعلات - نسخة API"""
+                           limit: int = 0, delay: float = 2.0, result_writer=None,
+                           resume_state: Optional[Dict] = None, delta_tracker=None) -> Dict:
+        """
+        الدالة الرئيسية لسحب التفاعلات - نسخة API
+        
+        عند تمرير result_writer تكتب كل صفحة على القرص فور وصولها ولا تُرجع قائمة التفاعلات،
+        و resume_state يكمل الترقيم من آخر نقطة حفظ، و delta_tracker (DeltaTracker لمهمة سابقة)
+        يوقف الترقيم عند أول صفحة بدون جديد ويضيف قسم delta للنتيجة
+        """
+        try:
+            error = self.prepare_account(cookies_array)
+            if error:
+                return {"error": error, "reactions": []}
+            
+            return self.scrape_post_reactions(post_url, limit, delay, result_writer, resume_state, delta_tracker)
+            
+        except Exception as e:
+            log.error("خطأ عام في السكربت", exc_info=True, error=str(e))
+            return {"error": f"خطأ عام في السكربت: {str(e)}", "reactions": []}
+
+    def scrape_post_reactions(self, post_url: str, limit: int = 0, delay: float = 2.0,
+                              result_writer=None, resume_state: Optional[Dict] = None,
+                              delta_tracker=None) -> Dict:
+        """سحب تفاعلات بوست واحد بعد prepare_account (الـ session والتوكنز مشتركة بين بوستات الدفعة)"""
         try:
-            print(f"🔍 [DEBUG] بدء سحب التفاعلات من: {post_url}")
-            print(f"🔍 [DEBUG] المعاملات: limit={limit}, delay={delay}")
-            
-            # تحميل الكوكيز
-            print(f"🔍 [DEBUG] خطوة 1: تحميل الكوكيز...")
-            if not self.load_cookies_from_array(cookies_array):
-                print(f"❌ [DEBUG] فشل في تحميل الكوكيز")
-                return {"error": "فشل في تحميل الكوكيز", "reactions": []}
-            
-            # التحقق من صحة الكوكيز
-            print(f"🔍 [DEBUG] خطوة 1.5: التحقق من صحة الكوكيز...")
-            self.check_cookies_validity()
-            
-            # استخراج التوكنز
-            print(f"🔍 [DEBUG] خطوة 2: استخراج التوكنز...")
-            if not self.extract_tokens():
-                print(f"❌ [DEBUG] فشل في استخراج التوكنز من الطريقة الأساسية")
-                print(f"🔍 [DEBUG] جاري المحاولة بالطريقة البديلة...")
-                if not self.extract_tokens_alternative():
-                    print(f"❌ [DEBUG] فشل في استخراج التوكنز من جميع الطرق")
-                    return {"error": "فشل في استخراج التوكنز", "reactions": []}
+            log.info("بدء سحب التفاعلات", post_url=post_url, limit=limit, delay=delay,
+                     resumed=bool(resume_state),
+                     since_job_id=delta_tracker.since_job_id if delta_tracker else None)
             
             # استخراج معرف البوست
-            print(f"🔍 [DEBUG] خطوة 3: استخراج معرف البوست...")
             post_id = self.extract_post_id_from_url(post_url)
             if not post_id:
-                print(f"❌ [DEBUG] فشل في استخراج معرف البوست")
                 return {"error": "فشل في استخراج معرف البوست", "reactions": []}
-            print(f"✅ [DEBUG] معرف البوست: {post_id}")
             
             # الحصول على feedback_id
-            print(f"🔍 [DEBUG] خطوة 4: إنشاء feedback_id...")
             feedback_id = self.smart_feedback_id_extractor(post_id, post_url)
             if not feedback_id:
-                print(f"❌ [DEBUG] فشل في إنشاء feedback_id")
                 return {"error": "فشل في إنشاء feedback_id", "reactions": []}
-            print(f"✅ [DEBUG] feedback_id: {feedback_id[:50]}...")
+            log.debug("تم تجهيز البوست", post_id=post_id, feedback_id=feedback_id)
             
             # جلب التفاعلات
-            print(f"🔍 [DEBUG] خطوة 5: جلب التفاعلات...")
-            reactions = self.get_reactions(feedback_id, limit, delay)
-            print(f"✅ [DEBUG] تم جلب {len(reactions)} تفاعل")
-            
-            # حساب إحصائيات التفاعلات
-            reaction_stats = {}
-            for reaction in reactions:
-                reaction_type = reaction.get('reaction_type', 'UNKNOWN')
-                reaction_stats[reaction_type] = reaction_stats.get(reaction_type, 0) + 1
-            
-            print(f"✅ [DEBUG] إحصائيات التفاعلات: {reaction_stats}")
-            
-            result = {
-                "success": True,
-                "post_url": post_url,
-                "post_id": post_id,
-                "total_reactions": len(reactions),
-                "reaction_stats": reaction_stats,
-                "reactions": reactions,
-                "scraped_at": datetime.now().isoformat()
-            }
-            
-            print(f"✅ [DEBUG] تم الانتهاء بنجاح من سحب التفاعلات")
+            summary = self.new_reactions_summary(keep_items=result_writer is None)
+            state = self.prepare_pagination(summary, result_writer, resume_state)
+            page_sizer = PageSizer(state.get("page_size"))
+            if not state["exhausted"]:
+                for page in self.iter_reaction_pages(feedback_id, limit, delay, state, page_sizer):
+                    self.add_reactions_page(summary, page, result_writer, state)
+                    # الباقي سُحب في المهمة السابقة
+                    if delta_tracker and delta_tracker.check_page(page):
+                        break
+            
+            if delta_tracker:
+                self.merge_reactions_delta(summary, delta_tracker, result_writer, state)
+            
+            result = self.build_reactions_result(post_url, post_id, summary, state, page_sizer)
+            if delta_tracker:
+                result["incremental"] = delta_tracker.get_summary()
+            
+            log.info("تم الانتهاء من سحب التفاعلات", total=summary['total'], stats=summary['stats'],
+                     pages=state['page_count'], interrupted=state.get('interrupted'))
             return result
             
         except Exception as e:
-            print(f"❌ [DEBUG] خطأ عام في السكربت: {str(e)}")
-            import traceback
-            print(f"❌ [DEBUG] تفاصيل الخطأ:")
-            traceback.print_exc()
+            log.error("خطأ عام في السكربت", exc_info=True, error=str(e))
             return {"error": f"خطأ عام في السكربت: {str(e)}", "reactions": []}
-
-
@@ -0,0 +1,150 @@
+"""
+Shared fb_dtsg/lsd/jazoest extraction for Facebook pages
+
+Every pattern is precompiled and tied to a literal anchor. The page is
+searched with str.find (C speed, no lowercased copy) and each pattern is
+only matched where its anchor occurs. Searching for a token stops at its
+first match, jazoest is only looked for next to fb_dtsg, and the
+login/error/checkpoint markers are only scanned when the page turned out
+to carry no fb_dtsg.
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+
+
+# (token, literal anchor, pattern matched at the anchor) in priority order
+TOKEN_PATTERNS: List[Tuple[str, str, "re.Pattern"]] = [
+    ("fb_dtsg", '"DTSGInitialData"', re.compile(r'"DTSGInitialData",\[\],\{"token":"([^"]+)"')),
+    ("fb_dtsg", '"dtsg":{"token":"', re.compile(r'"dtsg":\{"token":"([^"]+)"')),
+    ("fb_dtsg", '"fb_dtsg":"', re.compile(r'"fb_dtsg":"([^"]+)"')),
+    ("fb_dtsg", 'name="fb_dtsg"', re.compile(r'name="fb_dtsg"\s+value="([^"]+)"')),
+    ("fb_dtsg", '"dtsg_ag":"', re.compile(r'"dtsg_ag":"([^"]+)"')),
+    ("fb_dtsg", '"dtsg":"', re.compile(r'"dtsg":"([^"]+)"')),
+    ("lsd", '"LSD"', re.compile(r'"LSD",\[\],\{"token":"([^"]+)"')),
+    ("lsd", '"lsd":"', re.compile(r'"lsd":"([^"]+)"')),
+    ("lsd", 'name="lsd"', re.compile(r'name="lsd"\s+value="([^"]+)"')),
+    ("jazoest", 'name="jazoest"', re.compile(r'name="jazoest"\s+value="(\d+)"')),
+    ("jazoest", '"jazoest":', re.compile(r'"jazoest":"?(\d+)')),
+    ("jazoest", 'jazoest=', re.compile(r'jazoest=(\d+)')),
+]
+
+# Markers of pages that do not carry usable tokens (matched case-insensitively)
+PAGE_MARKERS: List[Tuple[str, str]] = [
+    ("login", "login form"),
+    ("login", "sign in form"),
+    ("login", "loginform"),
+    ("login", "please enter your password"),
+    ("login", "enter your password"),
+    ("login", "تسجيل الدخول إلى فيسبوك"),
+    ("login", "ادخل كلمة المرور"),
+    ("login", "log into facebook"),
+    ("error", "page not found"),
+    ("error", "this page isn't available"),
+    ("error", "content not found"),
+    ("error", "error 404"),
+    ("error", "الصفحة غير موجودة"),
+    ("checkpoint", "security checkpoint"),
+    ("checkpoint", "verify your identity"),
+    ("checkpoint", "account temporarily locked"),
+    ("checkpoint", "نقطة تفتيش أمنية"),
+    ("checkpoint", "تأكيد الهوية"),
+]
+
+# Looser patterns, only tried when the anchored patterns found nothing (full page scans)
+FALLBACK_PATTERNS: List[Tuple[str, "re.Pattern"]] = [
+    ("fb_dtsg", re.compile(r'DTSGInitialData.*?"token":"([^"]+)"')),
+    ("fb_dtsg", re.compile(r'fb_dtsg["\']?\s*:\s*["\']([^"\']+)["\']')),
+    ("fb_dtsg", re.compile(r'fb_dtsg.*?value="([^"]+)"')),
+    ("fb_dtsg", re.compile(r'"__async[^}]*fb_dtsg[^"]*"([a-zA-Z0-9_-]{20,})"')),
+    ("fb_dtsg", re.compile(r'dtsg[^a-zA-Z0-9]*([a-zA-Z0-9_-]{20,})', re.IGNORECASE)),
+    ("lsd", re.compile(r'"LSD".*?"token":"([^"]+)"')),
+    ("lsd", re.compile(r'lsd["\']?\s*:\s*["\']([^"\']+)["\']')),
+    ("lsd", re.compile(r'lsd.*?value="([^"]+)"')),
+    ("lsd", re.compile(r'lsd[^a-zA-Z0-9]+([a-zA-Z0-9_-]{15,})', re.IGNORECASE)),
+]
+
+# jazoest sits next to fb_dtsg in Facebook's forms: only look for it this close (in characters)
+JAZOEST_WINDOW = 4096
+
+_POTENTIAL_TOKEN_PATTERN = re.compile(r'"([a-zA-Z0-9_-]{30,})"')
+
+
+def compute_jazoest(fb_dtsg: str) -> str:
+    """Derive jazoest from fb_dtsg the way Facebook's own forms do"""
+    return "2" + str(sum(ord(char) for char in fb_dtsg))
+
+
+def _find_anchored(content: str, anchor: str, pattern: "re.Pattern",
+                   start: int = 0, end: Optional[int] = None) -> Optional["re.Match"]:
+    """Match a pattern at each occurrence of its anchor, return the first match"""
+    end = len(content) if end is None else end
+    position = content.find(anchor, start, end)
+    while position != -1:
+        match = pattern.match(content, position)
+        if match:
+            return match
+        position = content.find(anchor, position + 1, end)
+    return None
+
+
+def find_page_marker(content: str) -> Optional[str]:
+    """Get the kind of the first login/error/checkpoint marker in a page, if any"""
+    content_lower = content.lower()
+    for kind, marker in PAGE_MARKERS:
+        if marker in content_lower:
+            return kind
+    return None
+
+
+def scan_tokens(content: str, use_fallback: bool = True) -> Dict:
+    """
+    Extract fb_dtsg, lsd and jazoest from a page
+
+    Returns {"fb_dtsg", "lsd", "jazoest", "marker"}: missing tokens are None,
+    jazoest is derived from fb_dtsg when the page does not carry it, and
+    marker tells why a page without fb_dtsg has none (login, error, checkpoint).
+    """
+    tokens: Dict[str, Optional[str]] = {"fb_dtsg": None, "lsd": None, "jazoest": None, "marker": None}
+
+    dtsg_position = None
+    for name, anchor, pattern in TOKEN_PATTERNS:
+        if tokens[name] is not None:
+            continue
+
+        if name == "jazoest":
+            # Without fb_dtsg there is no jazoest worth having; with it, stay next to it
+            if dtsg_position is None:
+                continue
+            match = _find_anchored(content, anchor, pattern,
+                                   max(0, dtsg_position - JAZOEST_WINDOW), dtsg_position + JAZOEST_WINDOW)
+        else:
+            match = _find_anchored(content, anchor, pattern)
+
+        if match:
+            tokens[name] = match.group(1)
+            if name == "fb_dtsg":
+                dtsg_position = match.start()
+
+    if not tokens["fb_dtsg"]:
+        # Login walls and error pages carry no tokens: no point in the slow patterns
+        tokens["marker"] = find_page_marker(content)
+        if tokens["marker"] or not use_fallback:
+            return tokens
+
+    if use_fallback and not (tokens["fb_dtsg"] and tokens["lsd"]):
+        for name, pattern in FALLBACK_PATTERNS:
+            if tokens[name] is None:
+                match = pattern.search(content)
+                if match:
+                    tokens[name] = match.group(1)
+
+        if not tokens["fb_dtsg"]:
+            # As a last resort take the longest token-looking string (fb_dtsg is usually the longest)
+            potential_tokens = _POTENTIAL_TOKEN_PATTERN.findall(content)
+            if potential_tokens:
+                tokens["fb_dtsg"] = max(potential_tokens, key=len)
+
+    if tokens["fb_dtsg"] and not tokens["jazoest"]:
+        tokens["jazoest"] = compute_jazoest(tokens["fb_dtsg"])
+
+    return tokens
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark: FastAPI -> JobManager -> scraper against the local mock Facebook
+
+Starts benchmarks/mock_facebook.py in a subprocess, points the scrapers at it
+(FACEBOOK_BASE_URL), runs the API with uvicorn in a background thread of this
+process (with its results and job store in a temporary directory), submits
+--jobs scraping jobs over HTTP and waits for all of them to finish.
+
+Reports jobs/minute, pages/second, p50/p99 GraphQL page latency as seen by the
+scrapers (interpolated from the fbscraper_graphql_request_seconds buckets of
+/metrics) and the peak RSS of the process running the API.
+
+The per-account rate limit is raised to --requests-per-minute (default high
+enough not to be the bottleneck) so that the runs measure the scraping path;
+pass 30 to benchmark with the production limit.
+
+Usage: python benchmarks/bench_e2e.py [--jobs 20] [--kind reactions] [--engine thread]
+       [--concurrency 5] [--accounts 5] [--pages 10] [--page-size 50] [--latency-ms 50] ...
+"""
+
+import argparse
+import math
+import os
+import re
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+import uvicorn
+
+# إضافة مسار المشروع
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_facebook import add_mock_arguments
+
+
+MOCK_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock_facebook.py")
+FINISHED = ("completed", "failed", "cancelled")
+
+SAMPLE_RE = re.compile(r'^(\w+)(?:\{(.*)\})? (\S+)$')
+LABEL_RE = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def start_mock(args, mock_args) -> subprocess.Popen:
+    """Start the mock Facebook server and wait until it answers"""
+    process = subprocess.Popen([sys.executable, MOCK_SCRIPT, "--port", str(args.mock_port), *mock_args])
+    url = f"http://127.0.0.1:{args.mock_port}/__stats"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit("mock server exited")
+        try:
+            requests.get(url, timeout=1)
+            return process
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    process.terminate()
+    sys.exit("mock server did not start")
+
+
+def start_server(port: int) -> uvicorn.Server:
+    """Run the API in a background thread and wait until it accepts requests"""
+    from app.main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    server.thread = thread
+    return server
+
+
+def build_cookies(account: int):
+    """Cookies of one benchmark account (each account has its own rate limit and tokens)"""
+    return [
+        {"domain": ".facebook.com", "name": "c_user", "value": str(61550000000000 + account)},
+        {"domain": ".facebook.com", "name": "xs", "value": f"{account}%3Abenchmark%3A2%3A1755800000"},
+        {"domain": ".facebook.com", "name": "datr", "value": "benchmark"},
+    ]
+
+
+def build_job(args, index: int):
+    """Request body of one scraping job"""
+    body = {
+        "post_url": f"https://www.facebook.com/benchmark/posts/{1000000 + index}",
+        "delay": args.delay,
+        "engine": args.engine,
+        "cookies": build_cookies(index % args.accounts),
+    }
+    if args.kind == "comments":
+        body["max_pages"] = min(100, args.pages)
+    return body
+
+
+def parse_metrics(text: str):
+    """Parse the Prometheus text format into (name, labels, value) samples"""
+    samples = []
+    for line in text.splitlines():
+        match = SAMPLE_RE.match(line)
+        if match:
+            name, labels, value = match.groups()
+            samples.append((name, dict(LABEL_RE.findall(labels or "")), float(value)))
+    return samples
+
+
+def histogram_quantile(quantile: float, buckets):
+    """Quantile from cumulative (upper bound, count) buckets, interpolated like Prometheus"""
+    buckets = sorted(buckets)
+    total = buckets[-1][1] if buckets else 0
+    if not total:
+        return None
+    rank = quantile * total
+    lower, previous = 0.0, 0.0
+    for bound, count in buckets:
+        if count >= rank:
+            if math.isinf(bound):
+                return lower
+            return lower + (bound - lower) * (rank - previous) / max(count - previous, 1)
+        lower, previous = bound, count
+    return lower
+
+
+def read_page_metrics(api_url: str, query: str):
+    """Pages scraped and p50/p99 latency of successful GraphQL requests of one query"""
+    samples = parse_metrics(requests.get(f"{api_url}/metrics").text)
+    pages = sum(value for name, labels, value in samples
+                if name == "fbscraper_pages_total" and labels.get("query") == query)
+
+    buckets = {}
+    for name, labels, value in samples:
+        if name == "fbscraper_graphql_request_seconds_bucket" and labels.get("query") == query \
+                and labels.get("status") == "200":
+            bound = float(labels["le"]) if labels["le"] != "+Inf" else math.inf
+            buckets[bound] = buckets.get(bound, 0) + value
+    bucket_list = list(buckets.items())
+    return pages, histogram_quantile(0.5, bucket_list), histogram_quantile(0.99, bucket_list)
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def run_jobs(args, api_url: str):
+    """Submit the jobs, wait for all of them and return their final statuses"""
+    session = requests.Session()
+    job_ids = []
+    for index in range(args.jobs):
+        response = session.post(f"{api_url}/api/v1/{args.kind}/scrape", json=build_job(args, index))
+        response.raise_for_status()
+        job_ids.append(response.json()["job_id"])
+
+    statuses = {}
+    while len(statuses) < len(job_ids):
+        time.sleep(args.poll)
+        for job_id in job_ids:
+            if job_id in statuses:
+                continue
+            status = session.get(f"{api_url}/api/v1/{args.kind}/status/{job_id}").json()
+            if status["status"] in FINISHED:
+                statuses[job_id] = status
+    return statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=20, help="jobs to run")
+    parser.add_argument("--kind", choices=("reactions", "comments"), default="reactions")
+    parser.add_argument("--engine", choices=("thread", "async"), default="thread")
+    parser.add_argument("--concurrency", type=int, default=5, help="MAX_CONCURRENT_JOBS of the thread engine")
+    parser.add_argument("--accounts", type=int, default=5, help="distinct accounts the jobs are spread over")
+    parser.add_argument("--delay", type=float, default=None, help="delay between pages (default: the minimum)")
+    parser.add_argument("--requests-per-minute", type=float, default=6000, help="per-account rate limit")
+    parser.add_argument("--poll", type=float, default=0.5, help="status polling interval")
+    parser.add_argument("--port", type=int, default=8192, help="API port")
+    parser.add_argument("--mock-port", type=int, default=8190)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+    if args.delay is None:
+        args.delay = 5 if args.kind == "comments" else 1.0
+
+    # تمرير خيارات الخادم الوهمي كما هي
+    mock_parser = argparse.ArgumentParser(add_help=False)
+    add_mock_arguments(mock_parser)
+    mock_args = []
+    for action in mock_parser._actions:
+        mock_args += [action.option_strings[0], str(getattr(args, action.dest))]
+
+    workdir = tempfile.mkdtemp(prefix="bench_e2e_")
+    os.chdir(workdir)
+    mock = start_mock(args, mock_args)
+    mock_url = f"http://127.0.0.1:{args.mock_port}"
+
+    # توجيه المكشطات إلى الخادم المحلي قبل استيراد التطبيق (الإعدادات تُقرأ عند الاستيراد)
+    os.environ["FACEBOOK_BASE_URL"] = mock_url
+    os.environ["FACEBOOK_MOBILE_URL"] = mock_url
+    from app.config import settings
+    settings.ACCOUNT_REQUESTS_PER_MINUTE = args.requests_per_minute
+    settings.ACCOUNT_BURST = max(settings.ACCOUNT_BURST, int(args.requests_per_minute // 60))
+    settings.MAX_CONCURRENT_JOBS = args.concurrency
+
+    try:
+        server = start_server(args.port)
+        api_url = f"http://127.0.0.1:{args.port}"
+        rss_before = current_rss_mb()
+
+        print(f"{args.jobs} {args.kind} jobs ({args.engine} engine, concurrency {args.concurrency}, "
+              f"{args.accounts} accounts, delay {args.delay}s)")
+        print(f"mock: {args.pages} pages x {args.page_size} items, latency {args.latency_ms}±{args.jitter_ms} ms, "
+              f"errors {args.error_rate:.0%}, login walls {args.html_rate:.0%}")
+
+        started = time.monotonic()
+        statuses = run_jobs(args, api_url)
+        elapsed = time.monotonic() - started
+
+        pages, p50, p99 = read_page_metrics(api_url, args.kind)
+        completed = [s for s in statuses.values() if s["status"] == "completed"]
+        items = sum((s.get("result") or {}).get("total_items") or 0 for s in completed)
+        mock_stats = requests.get(f"{mock_url}/__stats").json()
+
+        print(f"  wall time         {elapsed:10.1f} s")
+        print(f"  jobs              {len(completed):10d} completed, {len(statuses) - len(completed)} failed/cancelled")
+        print(f"  jobs/minute       {len(completed) / elapsed * 60:10.1f}")
+        print(f"  pages/second      {pages / elapsed:10.1f}   ({int(pages)} pages, {items} items)")
+        if p50 is not None:
+            print(f"  page latency      p50 {p50 * 1000:8.1f} ms   p99 {p99 * 1000:8.1f} ms")
+        print(f"  RSS               {rss_before:10.1f} MB at start, "
+              f"peak {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB")
+        print(f"  mock requests     {mock_stats}")
+
+        server.should_exit = True
+        server.thread.join(timeout=10)
+    finally:
+        mock.terminate()
+        mock.wait()
+        os.chdir("/")
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
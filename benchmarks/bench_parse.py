@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: parse time per reactions page, legacy path vs single-decode path
+
+Usage: python benchmarks/bench_parse.py [--pages 200]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import requests
+
+# إضافة مسار المشروع
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.scrapers.reactions_scraper import FacebookReactionsScraper
+from app.scrapers.parsing import JSON_BACKEND
+
+
+def build_page(edge_count: int) -> bytes:
+    """Build a synthetic reactions GraphQL page like the ones Facebook returns"""
+    edges = []
+    for i in range(edge_count):
+        edges.append({
+            "node": {
+                "__typename": "User",
+                "id": str(100000000000000 + i),
+                "name": f"مستخدم تجريبي {i}",
+                "url": f"https://www.facebook.com/profile.php?id={100000000000000 + i}",
+                "profile_picture": {"uri": f"https://scontent.xx.fbcdn.net/v/t39.30808-1/{i}_n.jpg?stp=cp0"},
+                "friendship_status": "CAN_REQUEST",
+                "subscribe_status": "CAN_SUBSCRIBE"
+            },
+            "feedback_reaction_info": {"id": "1635855486666999" if i % 3 else "115940658764963"},
+            "cursor": f"cursor_{i:08d}"
+        })
+
+    page = {
+        "data": {
+            "node": {
+                "__typename": "Feedback",
+                "id": "ZmVlZGJhY2s6MTIzNDU2Nzg5",
+                "reactors": {
+                    "count": 100000,
+                    "edges": edges,
+                    "page_info": {"has_next_page": True, "end_cursor": "AQHRnext_cursor_value"}
+                }
+            }
+        },
+        "extensions": {"is_final": True}
+    }
+    return b"for (;;);" + json.dumps(page, ensure_ascii=False).encode("utf-8")
+
+
+def build_response(body: bytes) -> requests.Response:
+    """Wrap a body in a requests.Response the way the HTTP client returns it"""
+    response = requests.models.Response()
+    response._content = body
+    response.status_code = 200
+    response.headers["content-type"] = "application/json; charset=utf-8"
+    response.encoding = "utf-8"
+    return response
+
+
+def legacy_extract_user_info(edge):
+    """The per-edge user extraction of the legacy parse path"""
+    try:
+        user_info = {
+            'id': None,
+            'name': None,
+            'profile_url': None,
+            'profile_picture': None
+        }
+
+        if 'node' in edge:
+            user = edge['node']
+            user_info['id'] = user.get('id')
+            user_info['name'] = user.get('name')
+            user_info['profile_url'] = user.get('url') or user.get('profile_url')
+
+            if 'profile_picture' in user and user['profile_picture']:
+                user_info['profile_picture'] = user['profile_picture'].get('uri')
+
+        return user_info
+
+    except Exception:
+        return {'id': None, 'name': None, 'profile_url': None, 'profile_picture': None}
+
+
+def legacy_extract_reaction_type(edge, reaction_types):
+    """The per-edge reaction type lookup of the legacy parse path"""
+    try:
+        if 'feedback_reaction_info' in edge:
+            reaction_info = edge['feedback_reaction_info']
+            reaction_id = reaction_info.get('id', '')
+            return reaction_types.get(reaction_id, 'LIKE')
+
+        return 'LIKE'
+    except Exception:
+        return 'UNKNOWN'
+
+
+def legacy_extract_timestamp(edge):
+    """The legacy parse path had no timestamp in the reactions page"""
+    try:
+        return None
+    except Exception:
+        return None
+
+
+def legacy_process_response(scraper: FacebookReactionsScraper, response):
+    """The pre-optimization parse path (text decoded twice, json.loads on str, per-edge function calls)"""
+    content_type = response.headers.get('content-type', '').lower()
+    if 'html' in content_type or len(response.content) != len(response.text):
+        response_text = scraper.decompress_content(response)
+    else:
+        response_text = response.text
+
+    if not response_text.strip() or response_text.strip().startswith('<'):
+        return None
+    if response_text.startswith('for (;;);'):
+        response_text = response_text[9:]
+
+    data = json.loads(response_text)
+    node = data['data']['node']
+    reactions = []
+    for edge in node['reactors']['edges']:
+        reactions.append({
+            'user': legacy_extract_user_info(edge),
+            'reaction_type': legacy_extract_reaction_type(edge, scraper.reaction_types),
+            'timestamp': legacy_extract_timestamp(edge)
+        })
+    return {'reactions': reactions, 'page_info': node['reactors'].get('page_info', {})}
+
+
+def bench(label: str, parse, response, pages: int) -> float:
+    """Run a parse function over the same page and return ms per page"""
+    parse(response)  # warm-up
+    started = time.perf_counter()
+    for _ in range(pages):
+        parse(response)
+    elapsed_ms = (time.perf_counter() - started) * 1000 / pages
+    print(f"  {label:<14} {elapsed_ms:8.3f} ms/page")
+    return elapsed_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=200, help="pages parsed per measurement")
+    args = parser.parse_args()
+
+    scraper = FacebookReactionsScraper()
+    print(f"JSON backend: {JSON_BACKEND}")
+
+    for edge_count in (10, 50, 250):
+        response = build_response(build_page(edge_count))
+        assert legacy_process_response(scraper, response) == scraper.process_response(response)
+
+        print(f"{edge_count} reactions/page ({len(response.content) / 1024:.1f} KB):")
+        legacy = bench("legacy", lambda r: legacy_process_response(scraper, r), response, args.pages)
+        fast = bench("single-decode", scraper.process_response, response, args.pages)
+        print(f"  speedup        {legacy / fast:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
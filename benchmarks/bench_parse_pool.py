@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark: API latency while many jobs parse large reactions pages, inline vs parse worker processes
+
+Starts the API with uvicorn in a background thread, keeps --jobs threads
+parsing large pages through FacebookReactionsScraper.process_response (as
+scraping jobs do) and measures the latency of GET /health meanwhile.
+
+Usage: python benchmarks/bench_parse_pool.py [--jobs 20] [--workers 4] [--edges 2000] [--seconds 5]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+import requests
+import uvicorn
+
+# إضافة مسار المشروع
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.scrapers.parse_pool import parse_pool
+from app.scrapers.parsing import JSON_BACKEND
+from app.scrapers.reactions_scraper import FacebookReactionsScraper
+from bench_parse import build_page, build_response
+
+
+def start_server(port: int) -> uvicorn.Server:
+    """Run the API in a background thread and wait until it accepts requests"""
+    # استيراد التطبيق هنا فقط: عمليات التحليل (spawn) تعيد استيراد هذا الملف
+    from app.main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def run_phase(label: str, workers: int, args, response, url: str):
+    """Parse pages from --jobs threads for --seconds while timing /health requests"""
+    parse_pool.shutdown()
+    parse_pool.workers = workers
+
+    scraper = FacebookReactionsScraper()
+    scraper.process_response(response)  # warm-up (starts the worker processes)
+
+    stop = threading.Event()
+    pages = [0] * args.jobs
+
+    def job(index: int):
+        while not stop.is_set():
+            scraper.process_response(response)
+            pages[index] += 1
+
+    threads = [threading.Thread(target=job, args=(i,), daemon=True) for i in range(args.jobs)]
+    for thread in threads:
+        thread.start()
+
+    latencies = []
+    with requests.Session() as session:
+        deadline = time.monotonic() + args.seconds
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            session.get(url).raise_for_status()
+            latencies.append((time.perf_counter() - started) * 1000)
+            time.sleep(0.02)
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"  {label:<16} /health p50 {statistics.median(latencies):8.2f} ms   p99 {p99:8.2f} ms   "
+          f"max {latencies[-1]:8.2f} ms   pages/s {sum(pages) / args.seconds:8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=20, help="concurrent parsing jobs")
+    parser.add_argument("--workers", type=int, default=4, help="parse worker processes")
+    parser.add_argument("--edges", type=int, default=2000, help="reactions per page")
+    parser.add_argument("--seconds", type=float, default=5, help="duration of each phase")
+    parser.add_argument("--port", type=int, default=8191)
+    args = parser.parse_args()
+
+    response = build_response(build_page(args.edges))
+    server = start_server(args.port)
+    url = f"http://127.0.0.1:{args.port}/health"
+
+    print(f"JSON backend: {JSON_BACKEND}")
+    print(f"{args.jobs} jobs, {args.edges} reactions/page ({len(response.content) / 1024:.1f} KB):")
+    run_phase("inline", 0, args, response, url)
+    run_phase(f"{args.workers} workers", args.workers, args, response, url)
+
+    parse_pool.shutdown()
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
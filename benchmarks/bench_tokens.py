@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: token extraction per homepage, legacy pattern lists vs scan_tokens
+
+Usage: python benchmarks/bench_tokens.py [--runs 50] [--fixture debug_facebook_page.html ...]
+
+Saved pages (e.g. debug_facebook_page.html written by a debug job) are
+benchmarked alongside the synthetic fixtures.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+# إضافة مسار المشروع
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.scrapers.token_scanner import scan_tokens
+
+
+FB_DTSG = "NAcMx3bQ9k1p7ZKj2WvXyTq8R4sL0uVe:22:1712345678"
+LSD = "AVqE4z1fOnY8xKpL2mW9"
+
+
+def build_homepage(size_kb: int, tokens_at: str = "head") -> str:
+    """Build a synthetic desktop homepage: a lot of inline JS around the DTSG/LSD definitions"""
+    definitions = (
+        '<script>requireLazy(["ServerJS"],function(s){s.handle({"define":['
+        f'["DTSGInitialData",[],{{"token":"{FB_DTSG}"}},258],'
+        f'["LSD",[],{{"token":"{LSD}"}},323]]}})}});</script>'
+    )
+    module = {
+        "__bbox": {"require": [["ScheduledServerJS", "handle", None, [{"token": "x" * 12}]]]},
+        "markup": "<div class=\"x1n2onr6 x1ja2u2z\">" + "محتوى " * 20 + "</div>",
+        "clientID": "a1b2c3d4-e5f6",
+    }
+    filler = "<script>" + json.dumps(module, ensure_ascii=False) + "</script>\n"
+    body = filler * (size_kb * 1024 // len(filler.encode("utf-8")) + 1)
+
+    head = '<!DOCTYPE html><html lang="ar" dir="rtl"><head><title>Facebook</title></head><body>'
+    if tokens_at == "head":
+        return head + definitions + body + "</body></html>"
+    return head + body + definitions + "</body></html>"
+
+
+def build_mobile_page() -> str:
+    """Build a synthetic m.facebook.com page carrying the tokens in a form"""
+    return (
+        '<html><body><form method="post" action="/a/home.php">'
+        f'<input type="hidden" name="fb_dtsg" value="{FB_DTSG}" autocomplete="off" />'
+        f'<input type="hidden" name="jazoest" value="25612" autocomplete="off" />'
+        f'<input type="hidden" name="lsd" value="{LSD}" autocomplete="off" />'
+        '</form>' + '<div class="story">منشور</div>' * 2000 + '</body></html>'
+    )
+
+
+def build_login_page() -> str:
+    """Build a synthetic login wall (no tokens)"""
+    return build_homepage(512).replace(FB_DTSG, "").replace('"DTSGInitialData",[],{"token":""}', "") \
+        + '<div id="login_form">Log into Facebook</div>'
+
+
+def legacy_extract(content: str) -> dict:
+    """The pre-optimization extraction (lowercased copy, marker lists, unanchored pattern lists)"""
+    content_lower = content.lower()
+    for indicators in (
+        ['login form', 'sign in form', 'loginform', 'please enter your password',
+         'enter your password', 'تسجيل الدخول إلى فيسبوك', 'ادخل كلمة المرور', 'log into facebook'],
+        ['page not found', 'this page isn\'t available', 'content not found', 'error 404', 'الصفحة غير موجودة'],
+        ['security checkpoint', 'verify your identity', 'account temporarily locked',
+         'نقطة تفتيش أمنية', 'تأكيد الهوية'],
+    ):
+        if any(indicator in content_lower for indicator in indicators):
+            return {"fb_dtsg": None, "lsd": None}
+
+    tokens = {"fb_dtsg": None, "lsd": None}
+    dtsg_patterns = [
+        r'"DTSGInitialData",\[\],\{"token":"([^"]+)"',
+        r'"dtsg":\{"token":"([^"]+)"',
+        r'fb_dtsg":"([^"]+)"',
+        r'DTSGInitialData.*?"token":"([^"]+)"',
+        r'"fb_dtsg":"([^"]+)"',
+        r'fb_dtsg["\']?\s*:\s*["\']([^"\']+)["\']',
+        r'name="fb_dtsg"\s+value="([^"]+)"',
+        r'fb_dtsg.*?value="([^"]+)"',
+    ]
+    for pattern in dtsg_patterns:
+        match = re.search(pattern, content)
+        if match:
+            tokens["fb_dtsg"] = match.group(1)
+            break
+
+    lsd_patterns = [
+        r'"LSD",\[\],\{"token":"([^"]+)"',
+        r'"lsd":"([^"]+)"',
+        r'lsd["\']?\s*:\s*["\']([^"\']+)["\']',
+        r'name="lsd"\s+value="([^"]+)"',
+        r'lsd.*?value="([^"]+)"',
+    ]
+    for pattern in lsd_patterns:
+        match = re.search(pattern, content)
+        if match:
+            tokens["lsd"] = match.group(1)
+            break
+    return tokens
+
+
+def bench(label: str, extract, content: str, runs: int) -> float:
+    """Run an extraction function over the same page and return ms per page"""
+    extract(content)  # warm-up
+    started = time.perf_counter()
+    for _ in range(runs):
+        extract(content)
+    elapsed_ms = (time.perf_counter() - started) * 1000 / runs
+    print(f"  {label:<12} {elapsed_ms:8.3f} ms/page")
+    return elapsed_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=50, help="extractions per measurement")
+    parser.add_argument("--fixture", action="append", default=[], help="saved homepage HTML to include")
+    args = parser.parse_args()
+
+    fixtures = [
+        ("homepage 256 KB", build_homepage(256)),
+        ("homepage 2 MB", build_homepage(2048)),
+        ("homepage 2 MB, tokens at end", build_homepage(2048, tokens_at="tail")),
+        ("mobile form", build_mobile_page()),
+        ("login wall", build_login_page()),
+    ]
+    for path in args.fixture:
+        with open(path, encoding="utf-8", errors="ignore") as f:
+            fixtures.append((os.path.basename(path), f.read()))
+
+    for label, content in fixtures:
+        legacy_tokens = legacy_extract(content)
+        scanned = scan_tokens(content)
+        # Legacy dropped every token of a marked page; scan_tokens still reports lsd there
+        agree = scanned["fb_dtsg"] == legacy_tokens["fb_dtsg"] and (
+            not scanned["fb_dtsg"] or scanned["lsd"] == legacy_tokens["lsd"]
+        )
+
+        print(f"{label} ({len(content.encode('utf-8')) / 1024:.0f} KB):"
+              f" fb_dtsg={'yes' if scanned['fb_dtsg'] else 'no'}"
+              f" marker={scanned['marker']} same_as_legacy={agree}")
+        legacy = bench("legacy", legacy_extract, content, args.runs)
+        fast = bench("scan_tokens", scan_tokens, content, args.runs)
+        print(f"  speedup      {legacy / fast:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Facebook endpoints the scrapers call, for offline benchmarks
+
+Serves the home page with fb_dtsg/lsd (GET/HEAD /) and the reactions and
+comments GraphQL pagination (POST /api/graphql/). Users are seeded from the
+sample reactions documents in api_results/; every post has --pages pages of
+--page-size items, so runs are reproducible and never touch the network.
+
+Point the API at it before starting it:
+
+    python benchmarks/mock_facebook.py --port 8190 --latency-ms 80 &
+    FACEBOOK_BASE_URL=http://127.0.0.1:8190 FACEBOOK_MOBILE_URL=http://127.0.0.1:8190 python run.py
+
+Usage: python benchmarks/mock_facebook.py [--port 8190] [--pages 10] [--page-size 50]
+       [--latency-ms 50] [--jitter-ms 20] [--item-padding 0] [--error-rate 0] [--html-rate 0]
+"""
+
+import argparse
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import random
+import sys
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, Response
+
+# إضافة مسار المشروع
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_tokens import build_homepage
+
+
+SAMPLES_GLOB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            "api_results", "reactions_*.json")
+
+# Used when api_results/ has no samples
+FALLBACK_USERS = [
+    ({"id": "100000000000001", "name": "Sample User",
+      "profile_url": "https://www.facebook.com/profile.php?id=100000000000001",
+      "profile_picture": "https://scontent.xx.fbcdn.net/v/t1.30497-1/sample.jpg"}, "LIKE"),
+]
+
+# Idle keep-alive connections are kept this long (uvicorn's default of 5 s is not longer
+# than the scrapers' delays between pages, so reused connections would be reset)
+KEEP_ALIVE_SECONDS = 120
+
+LOGIN_WALL = '<!DOCTYPE html><html><head><title>Log in to Facebook</title></head><body><form id="login_form"></form></body></html>'
+
+
+def load_sample_users(pattern: str = SAMPLES_GLOB):
+    """(user, reaction_type) pairs from the sample reactions documents"""
+    users = []
+    for path in sorted(glob.glob(pattern)):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                document = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for reaction in document.get("reactions") or []:
+            user = reaction.get("user") or {}
+            if user.get("id"):
+                users.append((user, reaction.get("reaction_type", "LIKE")))
+    return users or FALLBACK_USERS
+
+
+def graphql_body(data) -> bytes:
+    """Serialize a GraphQL response the way Facebook does (with the for (;;); prefix)"""
+    return b"for (;;);" + json.dumps({"data": data}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def page_slice(cursor, page_size: int, requested: int, total: int):
+    """Items [start, end) of the page after cursor (the cursor is the start offset)"""
+    start = int(cursor) if cursor and str(cursor).isdigit() else 0
+    end = min(total, start + min(page_size, requested or page_size))
+    return start, end
+
+
+def create_app(args) -> FastAPI:
+    """Build the mock application for the given pagination, latency and error settings"""
+    # استيراد هنا فقط: bench_e2e.py يستورد هذا الملف قبل ضبط FACEBOOK_BASE_URL
+    from app.scrapers.reactions_scraper import FacebookReactionsScraper
+
+    app = FastAPI(title="Mock Facebook")
+    users = load_sample_users()
+    reaction_ids = {name: reaction_id for reaction_id, name in FacebookReactionsScraper().reaction_types.items()}
+    padding = "x" * args.item_padding
+    total = args.pages * args.page_size
+    rng = random.Random(args.seed)
+    homepage = build_homepage(args.homepage_kb)
+    stats = {"homepage": 0, "reactions": 0, "comments": 0, "errors": 0, "html": 0}
+
+    def user_for(post_key: str, index: int):
+        """Seed user and reaction type of item index of a post, with a per-post unique id"""
+        user, reaction_type = users[index % len(users)]
+        digest = int(hashlib.md5(f"{post_key}:{index}".encode()).hexdigest()[:12], 16)
+        return dict(user, id=str(100000000000000 + digest % 10 ** 14)), reaction_type
+
+    def reactions_page(variables) -> bytes:
+        """One page of reactors"""
+        post_key = variables.get("feedbackTargetID") or ""
+        start, end = page_slice(variables.get("cursor"), args.page_size, variables.get("count") or 0, total)
+        edges = []
+        for index in range(start, end):
+            user, reaction_type = user_for(post_key, index)
+            node = {"__typename": "User", "id": user["id"], "name": user.get("name"),
+                    "url": user.get("profile_url"), "profile_picture": {"uri": user.get("profile_picture")}}
+            if padding:
+                node["padding"] = padding
+            edges.append({"node": node, "feedback_reaction_info": {"id": reaction_ids.get(reaction_type, "")},
+                          "cursor": str(index + 1)})
+        page_info = {"has_next_page": end < total, "end_cursor": str(end) if end < total else None}
+        return graphql_body({"node": {"reactors": {"count": total, "edges": edges, "page_info": page_info}}})
+
+    def comments_page(variables) -> bytes:
+        """One page of comments"""
+        post_key = variables.get("id") or ""
+        start, end = page_slice(variables.get("commentsAfterCursor"), args.page_size, 0, total)
+        edges = []
+        for index in range(start, end):
+            user, _ = user_for(post_key, index)
+            node = {"id": f"{post_key}_{index}", "author": {"id": user["id"], "name": user.get("name")},
+                    "body": {"text": f"تعليق رقم {index} {padding}".strip()},
+                    "created_time": 1755800000 + index}
+            edges.append({"node": node, "cursor": str(index + 1)})
+        page_info = {"has_next_page": end < total, "end_cursor": str(end) if end < total else None}
+        return graphql_body({"node": {"comment_rendering_instance_for_feed_location": {
+            "comments": {"edges": edges, "page_info": page_info}}}})
+
+    async def simulate_latency():
+        """Sleep for the configured latency plus jitter"""
+        latency = args.latency_ms + rng.uniform(-args.jitter_ms, args.jitter_ms)
+        if latency > 0:
+            await asyncio.sleep(latency / 1000)
+
+    @app.get("/", response_class=HTMLResponse)
+    async def home():
+        """Home page carrying fb_dtsg and lsd (HEAD is answered by the same route)"""
+        stats["homepage"] += 1
+        await simulate_latency()
+        return homepage
+
+    @app.post("/api/graphql/")
+    async def graphql(request: Request):
+        """Reactions and comments pagination, dispatched on fb_api_req_friendly_name"""
+        form = await request.form()
+        await simulate_latency()
+
+        roll = rng.random()
+        if roll < args.error_rate:
+            stats["errors"] += 1
+            return Response(status_code=500)
+        if roll < args.error_rate + args.html_rate:
+            stats["html"] += 1
+            return HTMLResponse(LOGIN_WALL)
+
+        variables = json.loads(form.get("variables") or "{}")
+        query = form.get("fb_api_req_friendly_name")
+        if query == "CometUFIReactionsDialogTabContentRefetchQuery":
+            stats["reactions"] += 1
+            body = reactions_page(variables)
+        elif query == "CommentsListComponentsPaginationQuery":
+            stats["comments"] += 1
+            body = comments_page(variables)
+        else:
+            return Response(status_code=400)
+        return Response(body, media_type="application/json")
+
+    @app.get("/__stats")
+    async def get_stats():
+        """Requests served so far"""
+        return stats
+
+    return app
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Command line options (shared with bench_e2e.py)"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8190)
+    add_mock_arguments(parser)
+    return parser
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser):
+    """Pagination, payload, latency and error options of the mock"""
+    parser.add_argument("--pages", type=int, default=10, help="pages per post")
+    parser.add_argument("--page-size", type=int, default=50, help="items per page")
+    parser.add_argument("--item-padding", type=int, default=0, help="extra bytes per item (payload size)")
+    parser.add_argument("--homepage-kb", type=int, default=500, help="size of the home page")
+    parser.add_argument("--latency-ms", type=float, default=50, help="latency of every response")
+    parser.add_argument("--jitter-ms", type=float, default=20, help="random +/- added to the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of GraphQL requests answered with HTTP 500")
+    parser.add_argument("--html-rate", type=float, default=0.0, help="fraction of GraphQL requests answered with a login wall")
+    parser.add_argument("--seed", type=int, default=1)
+
+
+def main():
+    args = build_parser().parse_args()
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning",
+                timeout_keep_alive=KEEP_ALIVE_SECONDS)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Shared fixtures: the API running against benchmarks/mock_facebook.py
+
+Settings are read when app modules are imported, so the working directory
+(results and job store) and FACEBOOK_BASE_URL are set here, before any test
+module imports the application.
+"""
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import pytest
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MOCK_SCRIPT = os.path.join(ROOT, "benchmarks", "mock_facebook.py")
+
+# Every post of the mock has MOCK_PAGES pages of MOCK_PAGE_SIZE items
+MOCK_PAGES = 2
+MOCK_PAGE_SIZE = 20
+
+
+def _free_port() -> int:
+    """A local port nothing listens on"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+WORKDIR = tempfile.mkdtemp(prefix="fbscraper_tests_")
+os.chdir(WORKDIR)
+
+MOCK_PORT = _free_port()
+MOCK_URL = f"http://127.0.0.1:{MOCK_PORT}"
+os.environ["FACEBOOK_BASE_URL"] = MOCK_URL
+os.environ["FACEBOOK_MOBILE_URL"] = MOCK_URL
+
+
+@pytest.fixture(scope="session")
+def mock_facebook():
+    """Run the mock Facebook server for the whole session"""
+    process = subprocess.Popen([
+        sys.executable, MOCK_SCRIPT, "--port", str(MOCK_PORT), "--pages", str(MOCK_PAGES),
+        "--page-size", str(MOCK_PAGE_SIZE), "--latency-ms", "0", "--jitter-ms", "0", "--homepage-kb", "50"
+    ])
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                requests.get(f"{MOCK_URL}/__stats", timeout=1)
+                break
+            except requests.ConnectionError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    pytest.fail("mock Facebook server did not start")
+                time.sleep(0.1)
+        yield MOCK_URL
+    finally:
+        process.terminate()
+        process.wait()
+
+
+@pytest.fixture(scope="session")
+def client(mock_facebook):
+    """TestClient of the API, with the rate limit out of the way of the tests"""
+    from fastapi.testclient import TestClient
+    from app.config import settings
+
+    settings.ACCOUNT_REQUESTS_PER_MINUTE = 6000
+    settings.ACCOUNT_BURST = 100
+
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def cookies():
+    """Cookies of a test account"""
+    return [
+        {"domain": ".facebook.com", "name": "c_user", "value": "61550000000001"},
+        {"domain": ".facebook.com", "name": "xs", "value": "1%3Atests%3A2%3A1755800000"},
+    ]
+
+
+def wait_for(client, url: str, timeout: float = 60) -> dict:
+    """Poll a status endpoint until the job is finished"""
+    deadline = time.monotonic() + timeout
+    while True:
+        status = client.get(url).json()
+        if status["status"] in ("completed", "failed", "cancelled"):
+            return status
+        assert time.monotonic() < deadline, f"job did not finish: {status}"
+        time.sleep(0.2)
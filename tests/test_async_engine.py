@@ -0,0 +1,29 @@
+"""
+Async engine: disk writes of a job never run on the shared event loop
+"""
+import threading
+
+from conftest import MOCK_PAGES, wait_for
+
+
+def test_pages_are_written_off_the_event_loop(client, cookies, monkeypatch):
+    from app.core.job_manager import job_manager
+    from app.core.result_writer import ResultWriter
+
+    write_threads = []
+    write_items = ResultWriter.write_items
+
+    def record_thread(self, *args, **kwargs):
+        write_threads.append(threading.current_thread())
+        return write_items(self, *args, **kwargs)
+    monkeypatch.setattr(ResultWriter, "write_items", record_thread)
+
+    response = client.post("/api/v1/reactions/scrape", json={
+        "post_url": "https://www.facebook.com/tests/posts/asyncwrites", "delay": 1,
+        "engine": "async", "cookies": cookies
+    })
+    status = wait_for(client, f"/api/v1/reactions/status/{response.json()['job_id']}")
+
+    assert status["status"] == "completed"
+    assert len(write_threads) == MOCK_PAGES
+    assert job_manager.async_loop_thread not in write_threads
@@ -0,0 +1,54 @@
+"""
+Author index: activity across jobs, read back through /results, next to the job registry
+"""
+import os
+import tempfile
+import threading
+
+from conftest import wait_for
+
+
+def test_author_activity_points_at_post_job_items(client, cookies):
+    response = client.post("/api/v1/posts/scrape", json={
+        "post_url": "https://www.facebook.com/tests/posts/authors", "reactions_delay": 1,
+        "comments_delay": 5, "max_pages": 1, "cookies": cookies
+    })
+    job_id = response.json()["job_id"]
+    assert wait_for(client, f"/api/v1/posts/status/{job_id}")["status"] == "completed"
+
+    comment = client.get(f"/api/v1/posts/results/{job_id}/comments", params={"offset": 3, "limit": 1}).json()["items"][0]
+    activity = client.get(f"/api/v1/authors/{comment['author_id']}/activity").json()
+    item = next(item for item in activity["items"] if item["job_id"] == job_id and item["section"] == "comments")
+
+    page = client.get(f"/api/v1/posts/results/{job_id}/comments", params={"offset": item["item_offset"], "limit": 1})
+    assert page.json()["items"] == [comment]
+
+    filtered = client.get(f"/api/v1/posts/results/{job_id}/comments", params={"author_id": comment["author_id"]})
+    assert comment in filtered.json()["items"]
+
+
+def test_indexing_a_job_does_not_lock_out_the_registry():
+    from app.core.author_index import AuthorIndex
+    from app.core.job_store import JobStore
+
+    store = JobStore(os.path.join(tempfile.mkdtemp(), "jobs.db"))
+    author_index = AuthorIndex(store)
+    reactions = ({"user": {"id": str(i % 5000)}, "reaction_type": "LIKE"} for i in range(100000))
+
+    errors = []
+    def save_jobs():
+        for i in range(200):
+            try:
+                store.save({"job_id": f"job{i}", "job_type": "reactions", "status": "queued",
+                            "created_at": "2025-01-01T00:00:00"})
+            except Exception as e:
+                errors.append(e)
+    saver = threading.Thread(target=save_jobs)
+    saver.start()
+    unique_authors = author_index.index_job("reactions_job", "post", {"reactions": reactions})
+    saver.join()
+
+    assert not errors
+    assert unique_authors == 5000
+    assert len(store.load_all()) == 200
+    assert author_index.get_activity("42", limit=1)[0] == 20
@@ -0,0 +1,69 @@
+"""
+Batch jobs through the API: every post of the batch must be scraped
+"""
+import pytest
+
+from conftest import MOCK_PAGE_SIZE, MOCK_PAGES, wait_for
+
+
+@pytest.mark.parametrize("engine", ["thread", "async"])
+@pytest.mark.parametrize("kind, delay", [("reactions", 1), ("comments", 5)])
+def test_batch_scrapes_every_post(client, cookies, kind, delay, engine):
+    post_urls = [f"https://www.facebook.com/tests/posts/{kind}{engine}{i}" for i in range(2)]
+    response = client.post(f"/api/v1/{kind}/batch", json={
+        "post_urls": post_urls, "delay": delay, "engine": engine, "cookies": cookies
+    })
+    assert response.status_code == 200, response.text
+    job_id = response.json()["job_id"]
+
+    batch = wait_for(client, f"/api/v1/{kind}/batch/{job_id}")
+
+    assert batch["status"] == "completed"
+    assert batch["completed_posts"] == len(post_urls), batch["posts"]
+    assert batch["failed_posts"] == 0
+    for post in batch["posts"]:
+        assert post["total_items"] == MOCK_PAGES * MOCK_PAGE_SIZE, post
+
+
+@pytest.mark.parametrize("kind", ["reactions", "comments"])
+def test_token_refresh_of_one_post_leaves_the_others_alone(mock_facebook, cookies, kind):
+    from app.scrapers.comments_scraper import FacebookCommentsScraper
+    from app.scrapers.reactions_scraper import FacebookReactionsScraper
+
+    scraper = FacebookReactionsScraper() if kind == "reactions" else FacebookCommentsScraper()
+    assert scraper.prepare_account(cookies) is None
+    first, second = scraper.new_post_scraper(), scraper.new_post_scraper()
+    assert first.session is scraper.session and first.account_key == scraper.account_key
+
+    # The sibling's tokens stay usable while the first post refreshes its own
+    seen_by_second = []
+    extract_tokens = first.extract_tokens
+    def extract_and_look(*args):
+        seen_by_second.append((second.fb_dtsg, second.lsd))
+        return extract_tokens(*args)
+    first.extract_tokens = extract_and_look
+
+    assert first.load_tokens(force_refresh=True)
+    assert seen_by_second and all(fb_dtsg and lsd for fb_dtsg, lsd in seen_by_second)
+    assert first.fb_dtsg and scraper.fb_dtsg
+
+
+def test_batch_posts_are_reused_by_single_post_jobs(client, cookies):
+    post_url = "https://www.facebook.com/tests/posts/batchcache"
+    response = client.post("/api/v1/reactions/batch", json={
+        "post_urls": [post_url], "limit": 30, "delay": 1, "cookies": cookies
+    })
+    child_job_id = response.json()["child_job_ids"][0]
+    assert wait_for(client, f"/api/v1/reactions/batch/{response.json()['job_id']}")["status"] == "completed"
+
+    cached = client.post("/api/v1/reactions/scrape", json={
+        "post_url": post_url, "limit": 30, "max_age_seconds": 600, "cookies": cookies
+    }).json()
+    assert cached["cached"] and cached["job_id"] == child_job_id
+
+    # Other parameters are another result
+    fresh = client.post("/api/v1/reactions/scrape", json={
+        "post_url": post_url, "limit": 10, "max_age_seconds": 600, "cookies": cookies
+    }).json()
+    assert not fresh.get("cached") and fresh["job_id"] != child_job_id
+    wait_for(client, f"/api/v1/reactions/status/{fresh['job_id']}")
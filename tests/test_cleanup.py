@@ -0,0 +1,37 @@
+"""
+Orphan cleanup: only expired job artifacts are deleted from the results directory
+"""
+import os
+import shutil
+from datetime import datetime, timedelta
+
+from conftest import ROOT
+
+
+def test_orphan_cleanup_keeps_samples_and_user_files(client):
+    from app.config import settings
+    from app.core.job_manager import job_manager
+
+    sample = "reactions_20250828_014414_875ac083.json"
+    shutil.copy(os.path.join(ROOT, "api_results", sample), os.path.join(settings.RESULTS_DIR, sample))
+    kept = [sample, "notes.txt", "reactions_20250101_000000_aaaaaaaa.reactions.ndjson"]
+    orphans = [
+        "comments_20250101_000000_bbbbbbbb.json.gz",
+        "comments_20250101_000000_bbbbbbbb.comments.ndjson",
+        "comments_20250101_000000_bbbbbbbb.comments.idx.json",
+        "comments_batch_20250101_000000_cccccccc.checkpoint.json",
+        "posts_20250101_000000_dddddddd.profile.memory.txt",
+        "posts_20250101_000000_dddddddd.json.tmp",
+    ]
+    old = (datetime.now() - timedelta(days=30)).timestamp()
+    for name in kept + orphans:
+        path = os.path.join(settings.RESULTS_DIR, name)
+        if not os.path.exists(path):
+            open(path, "w").close()
+        os.utime(path, (old, old))
+
+    job_manager._cleanup_orphan_files({"reactions_20250101_000000_aaaaaaaa"}, datetime.now() - timedelta(days=1))
+
+    remaining = set(os.listdir(settings.RESULTS_DIR))
+    assert set(kept) <= remaining
+    assert not remaining & set(orphans)
@@ -0,0 +1,74 @@
+"""
+Downloads of compressed result documents, following the client's Accept-Encoding
+"""
+import gzip
+import json
+import os
+
+import pytest
+
+from conftest import MOCK_PAGE_SIZE, MOCK_PAGES, wait_for
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip", True),
+    ("gzip;q=0.5, br", True),
+    ("gzip;q=0", False),
+    ("gzip; q=0.000", False),
+    ("br, *", True),
+    ("*;q=0, gzip", True),
+    ("gzip;q=0, *", False),
+    ("identity", False),
+    (None, False),
+])
+def test_accepts_encoding_honours_q_values(header, expected):
+    from app.api.downloads import accepts_encoding
+
+    assert accepts_encoding(header, "gzip") is expected
+
+
+@pytest.fixture
+def completed_job(client, cookies):
+    response = client.post("/api/v1/reactions/scrape", json={
+        "post_url": "https://www.facebook.com/tests/posts/downloads", "delay": 1, "cookies": cookies
+    })
+    job_id = response.json()["job_id"]
+    assert wait_for(client, f"/api/v1/reactions/status/{job_id}")["status"] == "completed"
+    return job_id
+
+
+def test_download_is_sent_compressed_only_when_accepted(client, completed_job):
+    from app.core.job_manager import job_manager
+
+    url = f"/api/v1/reactions/download/{completed_job}"
+    with open(job_manager.get_job_result_file(completed_job), "rb") as f:
+        stored = f.read()
+
+    passed_through = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert passed_through.headers["content-encoding"] == "gzip"
+    assert passed_through.headers["vary"] == "Accept-Encoding"
+    assert json.loads(gzip.decompress(stored))["reactions"] == passed_through.json()["reactions"]
+
+    refused = client.get(url, headers={"Accept-Encoding": "gzip;q=0"})
+    assert "content-encoding" not in refused.headers
+    assert len(refused.json()["reactions"]) == MOCK_PAGES * MOCK_PAGE_SIZE
+
+
+def test_zstd_document_without_zstandard_is_a_clear_error(client, completed_job, monkeypatch):
+    from app.config import settings
+    from app.core import compression
+    from app.core.job_manager import job_manager
+
+    zstd_path = os.path.join(settings.RESULTS_DIR, f"{completed_job}.json.zst")
+    with open(zstd_path, "wb") as f:
+        f.write(b"\x28\xb5\x2f\xfd not really zstd")
+    monkeypatch.setattr(compression, "zstandard", None)
+    monkeypatch.setattr(job_manager, "get_job_result_file", lambda job_id: zstd_path)
+
+    response = client.get(f"/api/v1/reactions/download/{completed_job}", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 503
+    assert response.json()["detail"]["error"] == "encoding_not_available"
+
+    with pytest.raises(RuntimeError, match="zstandard"):
+        compression.open_result_file(zstd_path)
+    os.remove(zstd_path)
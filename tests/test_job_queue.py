@@ -0,0 +1,65 @@
+"""
+Job queue: dispatch order by priority, and jobs that cannot be queued are cancelled
+"""
+import threading
+import time
+
+import pytest
+
+
+@pytest.mark.parametrize("kind", ["reactions", "comments", "posts"])
+def test_failed_start_cancels_the_job(client, cookies, kind, monkeypatch):
+    from app.core.job_manager import job_manager
+
+    def broken_start_job(*args, **kwargs):
+        raise RuntimeError("dispatcher unavailable")
+
+    monkeypatch.setattr(job_manager, "start_job", broken_start_job)
+    response = client.post(f"/api/v1/{kind}/scrape", json={
+        "post_url": f"https://www.facebook.com/tests/posts/{kind}broken", "cookies": cookies
+    })
+
+    assert response.status_code == 500, response.text
+    detail = response.json()["detail"]
+    assert detail["error"] == "job_start_failed"
+    assert job_manager.get_job_status(detail["job_id"])["status"] == "cancelled"
+
+
+def test_dispatcher_runs_higher_priority_first_then_fifo(client, monkeypatch):
+    from app.config import settings
+    from app.core.job_manager import job_manager
+
+    monkeypatch.setattr(settings, "MAX_CONCURRENT_JOBS", 1)
+    release = threading.Event()
+
+    def blocking_worker(job_id, progress_callback):
+        release.wait(30)
+        return {"total_items": 0}
+
+    def quick_worker(job_id, progress_callback):
+        return {"total_items": 0}
+
+    blocker = job_manager.create_job("reactions", "https://www.facebook.com/tests/posts/blocker")
+    assert job_manager.start_job(blocker, blocking_worker)
+    deadline = time.monotonic() + 10
+    while job_manager.get_job_status(blocker)["status"] != "running":
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+    queued = {}
+    for name, priority in [("low_1", 0), ("high_1", 5), ("low_2", 0), ("high_2", 5), ("urgent", 10)]:
+        queued[name] = job_manager.create_job("reactions", f"https://www.facebook.com/tests/posts/{name}",
+                                              priority=priority)
+        assert job_manager.start_job(queued[name], quick_worker)
+
+    expected = ["urgent", "high_1", "high_2", "low_1", "low_2"]
+    assert [job_manager.get_queue_position(queued[name]) for name in expected] == [1, 2, 3, 4, 5]
+
+    release.set()
+    deadline = time.monotonic() + 30
+    while any(job_manager.get_job_status(job_id)["status"] != "completed" for job_id in queued.values()):
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+    started = {name: job_manager.jobs[job_id].started_at for name, job_id in queued.items()}
+    assert sorted(started, key=started.get) == expected
@@ -0,0 +1,59 @@
+"""
+Adaptive page sizing: only size-related failures lower the ceiling, and not for good
+"""
+from app.scrapers.page_sizer import CEILING_RECOVERY_PAGES, TIMING_WINDOW, PageSizer
+
+
+def fetch_full_pages(sizer: PageSizer, pages: int):
+    for page in range(pages):
+        size = sizer.next_size()
+        sizer.record_success(page, size, size, True, 0.1)
+
+
+def test_server_errors_and_invalid_responses_keep_the_ceiling():
+    sizer = PageSizer(initial=100, minimum=10, maximum=400)
+
+    assert sizer.record_failure(1, 100, 0.1, "http_500")
+    assert sizer.record_failure(1, 50, 0.1, "invalid_response")
+    assert sizer.ceiling == 400 and sizer.next_size() == 25
+
+    fetch_full_pages(sizer, 10)
+    assert sizer.next_size() == 400
+
+
+def test_size_failure_ceiling_is_lifted_after_full_pages():
+    sizer = PageSizer(initial=200, minimum=10, maximum=400)
+
+    assert sizer.record_failure(1, 200, 0.1, "http_504")
+    assert sizer.ceiling == 199
+
+    fetch_full_pages(sizer, 2)
+    assert sizer.next_size() == 199
+
+    fetch_full_pages(sizer, CEILING_RECOVERY_PAGES)
+    assert sizer.ceiling == 400 and sizer.next_size() > 199
+
+
+def test_server_truncation_is_a_permanent_ceiling():
+    sizer = PageSizer(initial=100, minimum=10, maximum=400)
+
+    sizer.record_success(1, 100, 60, True, 0.1)
+    fetch_full_pages(sizer, CEILING_RECOVERY_PAGES * 2)
+    assert sizer.ceiling == 60 and sizer.next_size() == 60
+
+
+def test_summary_reports_aggregates_of_a_bounded_window():
+    sizer = PageSizer(initial=100, minimum=10, maximum=100)
+
+    for page in range(TIMING_WINDOW * 5):
+        sizer.record_success(page, 100, 100, True, (page % 100 + 1) / 1000)
+    sizer.record_failure(TIMING_WINDOW * 5, 100, 0.5, "http_500")
+
+    assert len(sizer.recent_ms) == TIMING_WINDOW
+    assert sizer.get_summary() == {
+        "requests": TIMING_WINDOW * 5 + 1,
+        "failed_requests": 1,
+        "final_page_size": 50,
+        "avg_page_ms": 50.5,
+        "p95_page_ms": 96.0
+    }
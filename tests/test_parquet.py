@@ -0,0 +1,60 @@
+"""
+Parquet export: flat rows per section, written in row groups, served by ?format=parquet
+"""
+import pytest
+
+from conftest import MOCK_PAGE_SIZE, MOCK_PAGES, wait_for
+
+
+def test_items_are_flattened_to_the_section_columns():
+    from app.core.columnar import COMMENT_COLUMNS, REACTION_COLUMNS, flatten_comment, flatten_reaction
+
+    reaction = {"user": {"id": "1", "name": "Ali", "profile_url": "https://facebook.com/1"},
+                "reaction_type": "LIKE", "timestamp": None}
+    assert flatten_reaction(reaction) == ("1", "Ali", "https://facebook.com/1", None, "LIKE", None)
+    assert flatten_reaction({}) == (None,) * len(REACTION_COLUMNS)
+
+    comment = {"comment_id": "c1", "author_id": "2", "text": "hi", "created_time": "1755800000"}
+    assert flatten_comment(comment) == ("c1", "2", "hi", 1755800000)
+    assert flatten_comment({}) == (None,) * len(COMMENT_COLUMNS)
+
+
+def test_write_parquet_in_row_groups(tmp_path, monkeypatch):
+    pyarrow_parquet = pytest.importorskip("pyarrow.parquet")
+    from app.core import columnar
+
+    monkeypatch.setattr(columnar, "PARQUET_BATCH_ROWS", 4)
+    comments = [{"comment_id": f"c{i}", "author_id": str(i), "text": f"text {i}", "created_time": 1755800000 + i}
+                for i in range(10)]
+
+    file_path = str(tmp_path / "comments.parquet")
+    assert columnar.write_parquet(file_path, "comments", iter(comments)) == 10
+
+    parquet_file = pyarrow_parquet.ParquetFile(file_path)
+    assert parquet_file.metadata.num_row_groups == 3
+    table = parquet_file.read()
+    assert table.column_names == [name for name, _ in columnar.COMMENT_COLUMNS]
+    assert table.column("comment_id").to_pylist() == [comment["comment_id"] for comment in comments]
+    assert table.column("created_time").to_pylist() == [comment["created_time"] for comment in comments]
+
+
+def test_parquet_download(client, cookies):
+    from app.core.columnar import is_parquet_enabled
+
+    response = client.post("/api/v1/reactions/scrape", json={
+        "post_url": "https://www.facebook.com/tests/posts/parquet", "delay": 1, "cookies": cookies
+    })
+    job_id = response.json()["job_id"]
+    assert wait_for(client, f"/api/v1/reactions/status/{job_id}")["status"] == "completed"
+
+    download = client.get(f"/api/v1/reactions/download/{job_id}", params={"format": "parquet"})
+    if not is_parquet_enabled():
+        assert download.status_code == 404
+        return
+
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+
+    assert download.status_code == 200
+    table = pyarrow.parquet.read_table(pyarrow.BufferReader(download.content))
+    assert table.num_rows == MOCK_PAGES * MOCK_PAGE_SIZE
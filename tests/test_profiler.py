@@ -0,0 +1,47 @@
+"""
+Job profiler: one profiled job at a time, nothing left running when profiling cannot start
+"""
+import os
+import tracemalloc
+
+from app.core.profiler import JobProfiler, get_profile_paths
+
+
+def test_profile_is_saved_with_summary():
+    with JobProfiler("profile_test_saved", memory=True) as profiler:
+        sum(range(10000))
+
+    assert "phases" in profiler.summary and "memory" in profiler.summary
+    assert all(os.path.exists(path) for path in get_profile_paths("profile_test_saved"))
+    assert not tracemalloc.is_tracing()
+
+
+def test_second_profiled_job_runs_unprofiled():
+    with JobProfiler("profile_test_first") as first:
+        with JobProfiler("profile_test_second", memory=True) as second:
+            pass
+
+    assert second.summary == {"skipped": "another job is being profiled"}
+    assert "phases" in first.summary
+
+    # The lock is free again once the first job finished
+    with JobProfiler("profile_test_third") as third:
+        pass
+    assert "phases" in third.summary
+
+
+def test_enable_failure_undoes_tracemalloc_and_releases_the_lock():
+    profiler = JobProfiler("profile_test_failure", memory=True)
+
+    def busy():
+        raise ValueError("Another profiling tool is already active")
+    profiler.profiler.enable = busy
+
+    with profiler:
+        pass
+
+    assert profiler.summary == {"skipped": "Another profiling tool is already active"}
+    assert not tracemalloc.is_tracing()
+    with JobProfiler("profile_test_after_failure") as after:
+        pass
+    assert "phases" in after.summary
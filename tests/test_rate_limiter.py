@@ -0,0 +1,68 @@
+"""
+Per-account rate limiting: one bucket per account, shared by every job of it
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import rate_limiter as rate_limiter_module
+from app.core.rate_limiter import AccountRateLimiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Frozen monotonic clock, advanced by the sleeps of the limiter"""
+    now = [1000.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    async def async_sleep(seconds):
+        now[0] += seconds
+
+    # Only the limiter's view of time and asyncio is replaced, not the modules themselves
+    monkeypatch.setattr(rate_limiter_module, "time", SimpleNamespace(monotonic=lambda: now[0], sleep=sleep))
+    monkeypatch.setattr(rate_limiter_module, "asyncio", SimpleNamespace(sleep=async_sleep))
+    return now
+
+
+def test_burst_then_requests_are_spaced_by_the_rate(clock):
+    limiter = AccountRateLimiter(requests_per_minute=60, burst=3)
+    bucket = limiter.get_bucket("account")
+
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    # Concurrent callers each hold their own slot instead of waking up together
+    assert [round(bucket.reserve(), 6) for _ in range(3)] == [1.0, 2.0, 3.0]
+
+    clock[0] += 10
+    assert bucket.reserve() == 0.0
+
+
+def test_accounts_do_not_wait_on_each_other(clock):
+    limiter = AccountRateLimiter(requests_per_minute=60, burst=1, overrides={"fast": (600, 1)})
+
+    started = clock[0]
+    for _ in range(3):
+        limiter.acquire("slow")
+    assert clock[0] - started == pytest.approx(2.0)
+
+    started = clock[0]
+    limiter.acquire("other")
+    asyncio.run(limiter.acquire_async("fast"))
+    asyncio.run(limiter.acquire_async("fast"))
+    assert clock[0] - started == pytest.approx(0.1)
+
+    # Requests without an account are not limited
+    started = clock[0]
+    limiter.acquire(None)
+    assert clock[0] == started
+
+
+def test_batch_concurrency_follows_the_account_rate():
+    limiter = AccountRateLimiter(requests_per_minute=60, burst=5)
+
+    assert limiter.get_concurrency("account", delay=3, maximum=10) == 3
+    assert limiter.get_concurrency("account", delay=30, maximum=10) == 10
+    assert limiter.get_concurrency("account", delay=0.1, maximum=10) == 1
+    assert limiter.get_concurrency(None, delay=30, maximum=10) == 1
@@ -0,0 +1,67 @@
+"""
+Binary offset index: pages and filtered pages are read straight from the spool
+"""
+import json
+import os
+
+import pytest
+
+from conftest import MOCK_PAGE_SIZE
+
+
+def write_spool(job_id: str, comments, partial_line: bytes = b""):
+    from app.core.result_writer import get_spool_path
+
+    with open(get_spool_path(job_id, "comments"), "wb") as f:
+        for comment in comments:
+            f.write(json.dumps(comment, ensure_ascii=False).encode("utf-8") + b"\n")
+        f.write(partial_line)
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_pages_and_filters_match_the_spool(compact, monkeypatch):
+    from app.core import result_index
+    from app.core.result_index import ENTRY_SIZE, build_result_index, get_index_paths, read_result_page
+
+    monkeypatch.setattr(result_index, "SPOOL_BLOCK_SIZE", 512)
+    job_id = f"comments_20250101_000000_index{int(compact):03d}"
+    comments = [{"comment_id": f"c{i}", "author_id": str(i % 3), "text": f"تعليق {i}"}
+                for i in range(MOCK_PAGE_SIZE * 3)]
+    # A page still being written is not indexed
+    write_spool(job_id, comments, partial_line=b'{"comment_id": "c_partial"')
+
+    header = build_result_index(job_id, "comments", compact=compact)
+    index_path, _ = get_index_paths(job_id, "comments")
+    assert header["items"] == len(comments)
+    # Every item once in spool order, and once in the group of its author
+    assert os.path.getsize(index_path) == 2 * len(comments) * ENTRY_SIZE
+    if compact:
+        assert len(header["blocks"]) > 1
+    else:
+        assert "blocks" not in header
+
+    for offset, limit in [(0, 10), (7, 25), (len(comments) - 5, 10)]:
+        total, lines = read_result_page(job_id, "comments", offset, limit)
+        assert total == len(comments)
+        assert [json.loads(line) for line in lines] == comments[offset:offset + limit]
+
+    total, lines = read_result_page(job_id, "comments", 3, 5, "author_id", "1")
+    matching = [comment for comment in comments if comment["author_id"] == "1"]
+    assert total == len(matching)
+    assert [json.loads(line) for line in lines] == matching[3:8]
+
+    assert read_result_page(job_id, "comments", len(comments), 10) == (len(comments), [])
+    assert read_result_page(job_id, "comments", 0, 10, "author_id", "unknown") == (0, [])
+
+
+def test_index_is_built_on_first_query():
+    from app.core.result_index import get_index_paths, read_result_page
+
+    job_id = "comments_20250101_000000_indexlzy"
+    comments = [{"comment_id": f"c{i}", "author_id": "7", "text": "x"} for i in range(4)]
+    write_spool(job_id, comments)
+
+    assert not os.path.exists(get_index_paths(job_id, "comments")[1])
+    total, lines = read_result_page(job_id, "comments", 1, 2)
+    assert total == 4 and [json.loads(line) for line in lines] == comments[1:3]
+    assert read_result_page("comments_20250101_000000_nospool0", "comments", 0, 10) is None
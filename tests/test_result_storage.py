@@ -0,0 +1,45 @@
+"""
+Result storage: a finished job leaves the compressed document and compacted spools only
+"""
+import gzip
+import json
+import os
+
+from conftest import MOCK_PAGE_SIZE, MOCK_PAGES, wait_for
+
+
+def test_finished_job_keeps_no_uncompressed_copy(client, cookies, monkeypatch):
+    from app.config import settings
+    from app.core import result_index
+
+    # Small blocks so that pages span several of them
+    monkeypatch.setattr(result_index, "SPOOL_BLOCK_SIZE", 1024)
+
+    response = client.post("/api/v1/reactions/scrape", json={
+        "post_url": "https://www.facebook.com/tests/posts/storage", "delay": 1, "cookies": cookies
+    })
+    job_id = response.json()["job_id"]
+    assert wait_for(client, f"/api/v1/reactions/status/{job_id}")["status"] == "completed"
+
+    files = sorted(name[len(job_id):] for name in os.listdir(settings.RESULTS_DIR) if name.startswith(job_id))
+    expected = [".json.gz", ".reactions.idx", ".reactions.idx.json", ".reactions.ndjson.gz"]
+    if settings.RESULT_PARQUET and os.path.exists(os.path.join(settings.RESULTS_DIR, f"{job_id}.reactions.parquet")):
+        expected.append(".reactions.parquet")
+    assert files == sorted(expected)
+
+    with gzip.open(os.path.join(settings.RESULTS_DIR, f"{job_id}.json.gz"), "rt", encoding="utf-8") as f:
+        reactions = json.load(f)["reactions"]
+    assert len(reactions) == MOCK_PAGES * MOCK_PAGE_SIZE
+
+    # Readers of the spool work from the compacted copy
+    streamed = [json.loads(line) for line in client.get(f"/api/v1/reactions/stream/{job_id}").text.splitlines()]
+    assert streamed == reactions
+
+    page = client.get(f"/api/v1/reactions/results/{job_id}", params={"offset": 7, "limit": 25}).json()
+    assert page["total"] == len(reactions) and page["items"] == reactions[7:32]
+
+    reaction_type = reactions[0]["reaction_type"]
+    matching = [reaction for reaction in reactions if reaction["reaction_type"] == reaction_type]
+    page = client.get(f"/api/v1/reactions/results/{job_id}",
+                      params={"reaction_type": reaction_type, "limit": 1000}).json()
+    assert page["items"] == matching
@@ -0,0 +1,52 @@
+"""
+Checkpoints and resume: an interrupted job continues from its last page
+"""
+import pytest
+
+from conftest import MOCK_PAGE_SIZE, MOCK_PAGES, wait_for
+
+
+@pytest.mark.parametrize("engine", ["thread", "async"])
+def test_interrupted_job_resumes_from_its_checkpoint(client, cookies, monkeypatch, engine):
+    from app.scrapers.reactions_scraper import FacebookReactionsScraper
+
+    # Every page after the first one comes back invalid until the job gives up
+    pages = []
+    check_reactions_data = FacebookReactionsScraper.check_reactions_data
+    def fail_after_first_page(self, reactions_data):
+        pages.append(reactions_data)
+        return check_reactions_data(self, reactions_data if len(pages) == 1 else None)
+    monkeypatch.setattr(FacebookReactionsScraper, "check_reactions_data", fail_after_first_page)
+
+    response = client.post("/api/v1/reactions/scrape", json={
+        "post_url": f"https://www.facebook.com/tests/posts/resume{engine}", "delay": 1,
+        "engine": engine, "cookies": cookies
+    })
+    job_id = response.json()["job_id"]
+    result = wait_for(client, f"/api/v1/reactions/status/{job_id}")["result"]
+    assert result["resumable"] and result["interruption_reason"] == "invalid_response"
+    monkeypatch.undo()
+
+    response = client.post(f"/api/v1/reactions/resume/{job_id}", json={"engine": engine, "cookies": cookies})
+    assert response.status_code == 200, response.text
+    status = wait_for(client, f"/api/v1/reactions/status/{job_id}")
+    assert status["status"] == "completed" and not status["result"]["resumable"]
+
+    reactions = client.get(f"/api/v1/reactions/download/{job_id}").json()["reactions"]
+    assert len(reactions) == MOCK_PAGES * MOCK_PAGE_SIZE
+    assert len({reaction["user"]["id"] for reaction in reactions}) == len(reactions)
+
+
+@pytest.mark.parametrize("job_type, delay", [("reactions", 30), ("comments", 2)])
+def test_resume_delay_uses_the_limits_of_the_job_type(client, cookies, job_type, delay):
+    from app.core.checkpoints import checkpoint_store
+
+    job_id = f"{job_type}_20250101_000000_0000{delay:04d}"
+    checkpoint_store.save(job_id, {
+        "job_id": job_id, "job_type": job_type, "post_url": "https://www.facebook.com/tests/posts/delay",
+        "created_at": "2025-01-01T00:00:00", "params": {}, "sections": {}
+    })
+
+    response = client.post(f"/api/v1/{job_type}/resume/{job_id}", json={"delay": delay, "cookies": cookies})
+    assert response.status_code == 422
+    assert response.json()["detail"]["error"] == "invalid_resume_request"
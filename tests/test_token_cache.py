@@ -0,0 +1,57 @@
+"""
+Token cache: one fetch per account for concurrent jobs, and no leftovers per account
+"""
+import threading
+import time
+
+from app.core.token_cache import TokenCache
+
+
+def test_concurrent_jobs_of_an_account_fetch_tokens_once():
+    cache = TokenCache(ttl_seconds=60)
+    fetches = []
+    ready = threading.Barrier(8)
+
+    def fetch_tokens():
+        fetches.append(threading.get_ident())
+        time.sleep(0.2)
+        return {"fb_dtsg": f"token_{len(fetches)}", "lsd": "lsd"}
+
+    results = []
+
+    def job():
+        ready.wait()
+        results.append(cache.get_or_fetch("account", fetch_tokens))
+
+    threads = [threading.Thread(target=job) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(fetches) == 1
+    assert [tokens["fb_dtsg"] for tokens in results] == ["token_1"] * 8
+
+    # Stale tokens reported by a job are fetched again, once
+    cache.invalidate("account", stale_fb_dtsg="token_1")
+    assert cache.get_or_fetch("account", fetch_tokens)["fb_dtsg"] == "token_2"
+
+    # A job reporting an older token does not discard the fresh one
+    cache.invalidate("account", stale_fb_dtsg="token_1")
+    assert cache.get("account")["fb_dtsg"] == "token_2"
+
+
+def test_refresh_locks_and_expired_tokens_are_dropped():
+    cache = TokenCache(ttl_seconds=60)
+    for index in range(5):
+        assert cache.get_or_fetch(f"account_{index}", lambda: {"fb_dtsg": "token"})["fb_dtsg"] == "token"
+    assert cache.refresh_locks == {}
+
+    # Failed refreshes do not leave a lock behind either
+    assert cache.get_or_fetch("account_failed", lambda: None) is None
+    assert cache.refresh_locks == {}
+
+    for entry in cache.entries.values():
+        entry["expires_at"] = time.time() - 1
+    cache.put("account_new", {"fb_dtsg": "fresh"})
+    assert set(cache.entries) == {"account_new"}
@@ -0,0 +1,23 @@
+"""
+Transport pool: sessions in use are never evicted, idle ones are closed
+"""
+import time
+
+
+def test_session_in_use_is_not_evicted(mock_facebook):
+    from app.core.transport import TransportPool
+
+    pool = TransportPool(pool_size=2, idle_seconds=60, http2=False)
+    session = pool.get_session("account_a", {"c_user": "1"})
+
+    # A thread job holding the session since long ago, still sending requests
+    pool.entries["account_a"].last_used = time.time() - 120
+    session.get(f"{mock_facebook}/__stats", timeout=5)
+    pool.get_session("account_b", {"c_user": "2"})
+    assert pool.entries["account_a"].session is session
+
+    # No request since: the session is idle and gets closed
+    pool.entries["account_a"].last_used = time.time() - 120
+    pool.get_session("account_c", {"c_user": "3"})
+    assert "account_a" not in pool.entries
+    assert set(pool.entries) == {"account_b", "account_c"}